@@ -1,31 +1,269 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict, Any, List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 import sys
 from datetime import datetime, timedelta
 import os
 import json
 import subprocess
 from pathlib import Path
+from dataclasses import dataclass, asdict
+from collections import deque
+import heapq
 import uuid
 import threading
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import shutil
+import logging
+import math
+import time
 
 from ..models.simple import SimpleBacktestRequest, SimpleBacktestResult
 from ..services.backtest_engine import BacktestEngine
 from ..real_backtest_engine import run_real_backtest
 from ..futures_backtest_engine import run_futures_backtest
-from ..data_loader import get_data_info, data_loader, load_stock_data
+from ..data_loader import get_data_info, data_loader, load_stock_data, load_close_arrays_worker, prepare_close_arrays_worker
 from ..futures_data import get_futures_data
+from ..indicators.macd_numba import macd_last, macd_panel, macd_first_rise
+from ..indicators.trend_numba import trend_streaks
 import numpy as np
 import pandas as pd
 import csv
 
+# orjson 为可选依赖（更快的 JSON 解析），缺失时回退标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# 项目路径在模块加载时解析一次，避免每个请求重复 Path.resolve()（需要 stat 文件系统）
+# backtest.py 位于 backend/app/api/ 下，项目根目录为 parents[3]
+_THIS_FILE = Path(__file__).resolve()
+PROJECT_ROOT = _THIS_FILE.parents[3]
+DATA_DIR = PROJECT_ROOT / 'data'
+FEATURES_DIR = DATA_DIR / 'features'
+STOCKLIST_DIR = DATA_DIR / 'stockList'
 
 # 全局任务存储（内存版，适合单机）
 screening_tasks: Dict[str, Dict[str, Any]] = {}
 tasks_lock = threading.Lock()
 
+# 任务过期与容量控制：结束超过 TASK_TTL_SECONDS 的任务由后台定期清理，
+# 任务总数超过 MAX_TASKS 时按创建顺序淘汰最早的已结束任务（运行中的任务不会被清理）
+TASK_TTL_SECONDS = 3600
+TASK_SWEEP_INTERVAL = 300
+MAX_TASKS = 200
+
+# 年化系数（按每年252个交易日）
+_SQRT252 = math.sqrt(252)
+
+
+def _register_task(task_id: str, task: Dict[str, Any]) -> None:
+    """
+    登记新任务（记录创建时间），超出容量时淘汰最早的已结束任务
+
+    Args:
+        task_id: 任务ID
+        task: 任务状态字典
+    """
+    task["_created_ts"] = time.time()
+    with tasks_lock:
+        screening_tasks[task_id] = task
+        overflow = len(screening_tasks) - MAX_TASKS
+        if overflow > 0:
+            # dict 保持插入顺序，从头遍历即为从旧到新
+            evict = [k for k, v in screening_tasks.items() if v.get("status") != "running"][:overflow]
+            for k in evict:
+                del screening_tasks[k]
+
+
+def _sweep_tasks(now: Optional[float] = None) -> int:
+    """
+    清理已结束且超过 TASK_TTL_SECONDS 的任务
+
+    Returns:
+        int: 清理的任务数量
+    """
+    now = time.time() if now is None else now
+    with tasks_lock:
+        stale = [
+            k for k, v in screening_tasks.items()
+            if v.get("status") != "running" and now - v.get("_created_ts", now) > TASK_TTL_SECONDS
+        ]
+        for k in stale:
+            del screening_tasks[k]
+    if stale:
+        logger.debug("清理过期任务 %d 个，剩余 %d 个", len(stale), len(screening_tasks))
+    return len(stale)
+
+
+async def sweep_tasks_forever(interval: float = TASK_SWEEP_INTERVAL) -> None:
+    """后台循环：每隔 interval 秒清理一次过期任务（在应用 lifespan 中启动）"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            _sweep_tasks()
+        except Exception:
+            logger.warning("清理过期任务失败", exc_info=True)
+
+
+# 长时间运行的后台任务（最佳股票评分）在独立线程中执行，不占用 FastAPI 处理请求的线程池；
+# 逐只股票的评分与筛选任务的CSV解析分发到共享进程池（首次使用时创建，跨任务复用，应用关闭时释放）
+TASK_THREADS = 4
+_task_executor = ThreadPoolExecutor(max_workers=TASK_THREADS, thread_name_prefix="testback-task")
+_scoring_pool: Optional[ProcessPoolExecutor] = None
+_scoring_pool_lock = threading.Lock()
+# 进程池统一以 spawn 方式启动子进程：服务进程中已有任务线程与线程池，fork 会把其它线程持有的锁
+# （日志、任务状态、加载器缓存等）以已加锁状态复制到子进程中导致死锁；spawn 的子进程重新导入模块，
+# 提交到进程池的任务须为模块级函数（或其 functools.partial）
+_POOL_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _get_scoring_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    取得共享的进程池（进程数为CPU核数，最佳股票评分与筛选共用，spawn 启动子进程的开销只付一次），
+    单核或创建失败时返回 None（调用方在当前线程中串行计算）
+
+    Returns:
+        Optional[ProcessPoolExecutor]: 进程池
+    """
+    global _scoring_pool
+    max_workers = os.cpu_count() or 1
+    if max_workers <= 1:
+        return None
+    with _scoring_pool_lock:
+        if _scoring_pool is None:
+            try:
+                _scoring_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=_POOL_MP_CONTEXT)
+            except Exception:
+                logger.warning("创建评分进程池失败，改为串行计算", exc_info=True)
+                return None
+        return _scoring_pool
+
+
+def shutdown_task_executors() -> None:
+    """释放后台任务线程池与评分进程池（在应用 lifespan 结束时调用），未开始的任务直接取消"""
+    global _scoring_pool
+    _task_executor.shutdown(wait=False, cancel_futures=True)
+    with _scoring_pool_lock:
+        if _scoring_pool is not None:
+            _scoring_pool.shutdown(wait=False, cancel_futures=True)
+            _scoring_pool = None
+
+
+@dataclass
+class ScreeningProgress:
+    """筛选任务进度（工作线程本地维护，按批整体写回 screening_tasks）"""
+    processed: int = 0
+    total: int = 0
+    matched: int = 0
+    current: str = ""
+
+
+@dataclass
+class MacdSnapshot:
+    """单只股票单个周期的MACD末值快照（一次EMA递推得到，方向/柱状图/DIF等条件共用）"""
+    trend: str = 'neutral'  # bull: 柱子上升 | bear: 柱子下降 | neutral: 数据不足或持平
+    dif: Optional[float] = None  # 最后一根DIF（快线-慢线），数据不足时为 None
+    hist_last: Optional[float] = None  # 最后一根柱状图（DIF - DEA），数据不足时为 None
+    hist_prev: Optional[float] = None  # 倒数第二根柱状图，数据不足时为 None
+    first_rise_ok: Optional[bool] = None  # 是否满足第一次主升段（仅启用该条件时在日线上计算）
+
+# 股票名称映射缓存（按股票列表JSON的修改时间失效）
+_NAME_MAP_CACHE: Dict[str, Any] = {"path": None, "mtime": 0, "map": {}}
+_name_map_lock = threading.Lock()
+# /data/stocklist 返回的规范化列表缓存（同样按文件修改时间失效）
+_STOCK_LIST_CACHE: Dict[str, Any] = {"path": None, "mtime": 0, "list": None}
+
+
+def _load_json_file(path: Path) -> Any:
+    """
+    读取并解析 JSON 文件（优先 orjson 直接解析字节串，缺失时回退标准库 json）
+    
+    Args:
+        path: JSON 文件路径
+        
+    Returns:
+        Any: 解析结果
+    """
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def get_name_map() -> Dict[str, str]:
+    """
+    读取股票列表JSON得到 6位代码 -> 名称 的映射，文件未变化时直接返回缓存
+    
+    Returns:
+        Dict[str, str]: 名称映射（共享对象，调用方不要修改）
+    """
+    with_industry = STOCKLIST_DIR / 'all_stock_with_industry.json'
+    pure = STOCKLIST_DIR / 'all_pure_stock.json'
+    path = with_industry if with_industry.exists() else pure if pure.exists() else None
+    try:
+        mtime = path.stat().st_mtime_ns if path is not None else 0
+    except OSError:
+        path, mtime = None, 0
+    with _name_map_lock:
+        if _NAME_MAP_CACHE["path"] == path and _NAME_MAP_CACHE["mtime"] == mtime:
+            return _NAME_MAP_CACHE["map"]
+        name_map: Dict[str, str] = {}
+        try:
+            data: list = _load_json_file(path) if path is not None else []
+            for it in (data or []):
+                try:
+                    code_raw = str(it.get('code') or '')
+                    # 提取纯6位代码
+                    code = code_raw.split('.')[-1] if '.' in code_raw else code_raw
+                    nm = str(it.get('code_name') or it.get('name') or '')
+                    if code and nm:
+                        name_map[code] = nm
+                except Exception:
+                    continue
+        except Exception:
+            pass
+        _NAME_MAP_CACHE.update(path=path, mtime=mtime, map=name_map)
+        return name_map
+
+def _format_numbers(values: List[Any], spec: str = '.2f') -> List[str]:
+    """按格式批量格式化一列数值（None 输出空字符串），整列一次 np.char.mod 完成，不逐个分支"""
+    if not values:
+        return []
+    missing = np.array([v is None for v in values])
+    formatted = np.char.mod(f'%{spec}', np.array([0.0 if v is None else v for v in values], dtype=np.float64)).astype(object)
+    formatted[missing] = ''
+    return formatted.tolist()
+
+def _write_export_csv(filepath: Path, columns: Dict[str, List[Any]], fallback: Optional[Path] = None) -> Path:
+    """
+    按列写出导出CSV：表头为列名，数据行由各列按位置 zip 逐行流式生成，不构造中间行对象
+
+    目标文件以 O_EXCL 原子创建（不再先 exists() 再写入，避免竞态）；已存在时改写 fallback（覆盖）。
+    使用 utf-8-sig（Excel 可直接打开）与 1 MiB 写缓冲，None 写为空
+
+    Returns:
+        Path: 实际写入的文件路径
+    """
+    try:
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        if fallback is None:
+            raise
+        filepath = fallback
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns.keys())
+        writer.writerows(zip(*columns.values()))
+    return filepath
+
 def get_python_executable() -> str:
     """
     获取 Python 可执行文件路径（跨平台兼容）
@@ -54,8 +292,7 @@ async def list_futures_contracts() -> Dict[str, Any]:
     约定缓存文件：data/features/contracts.json 或 contracts.csv
     """
     try:
-        project_root = Path(__file__).resolve().parents[3]
-        data_dir = project_root / 'data' / 'features'
+        data_dir = FEATURES_DIR
         data_dir.mkdir(parents=True, exist_ok=True)
         json_path = data_dir / 'contracts.json'
         csv_path = data_dir / 'contracts.csv'
@@ -289,20 +526,24 @@ async def get_stock_list() -> Dict[str, Any]:
     2) data/stockList/all_pure_stock.json
     """
     try:
-        project_root = Path(__file__).resolve().parents[3]
-        with_industry = project_root / 'data' / 'stockList' / 'all_stock_with_industry.json'
-        pure = project_root / 'data' / 'stockList' / 'all_pure_stock.json'
+        with_industry = STOCKLIST_DIR / 'all_stock_with_industry.json'
+        pure = STOCKLIST_DIR / 'all_pure_stock.json'
 
-        data: list = []
         if with_industry.exists():
-            with open(with_industry, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            path = with_industry
         elif pure.exists():
-            with open(pure, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            path = pure
         else:
             raise HTTPException(status_code=404, detail="股票列表文件不存在")
 
+        # 文件未变化时直接返回上次规范化的结果（共享对象，只读）
+        mtime = path.stat().st_mtime_ns
+        with _name_map_lock:
+            if _STOCK_LIST_CACHE["path"] == path and _STOCK_LIST_CACHE["mtime"] == mtime:
+                return {"list": _STOCK_LIST_CACHE["list"]}
+
+        data: list = _load_json_file(path)
+
         # 确保字段存在，industry 若缺失则置为 ''
         normalized = []
         for it in (data or []):
@@ -312,7 +553,10 @@ async def get_stock_list() -> Dict[str, Any]:
                     'code_name': it.get('code_name') or it.get('name') or '',
                     'industry': it.get('industry') or it.get('industryClassification') or ''
                 })
-        return {"list": normalized or data}
+        stock_list = normalized or data
+        with _name_map_lock:
+            _STOCK_LIST_CACHE.update(path=path, mtime=mtime, list=stock_list)
+        return {"list": stock_list}
     except HTTPException:
         raise
     except Exception as e:
@@ -326,7 +570,7 @@ async def split_stocks_files_api() -> Dict[str, Any]:
     """
     try:
         # 定位脚本路径
-        here = Path(__file__).resolve()
+        here = _THIS_FILE
         candidate_roots = [
             here.parents[3] if len(here.parents) >= 4 else here.parent,
             here.parents[2] if len(here.parents) >= 3 else here.parent,
@@ -390,7 +634,7 @@ async def batch_fetch_daily_data(body: Dict[str, Any]) -> Dict[str, Any]:
         limit = body.get('limit')
         
         # 定位脚本路径
-        here = Path(__file__).resolve()
+        here = _THIS_FILE
         # 从当前文件向上查找项目根目录（包含 scripts 目录的目录）
         # backtest.py 在 backend/app/api/ 下，项目根目录应该是 here.parents[3]
         script_path = None
@@ -503,23 +747,18 @@ async def batch_fetch_daily_data(body: Dict[str, Any]) -> Dict[str, Any]:
                 detail=f"脚本执行失败 (返回码: {proc.returncode}): {error_preview}"
             )
         
-        # 解析 JSON 结果
-        lines = proc.stdout.strip().split('\n')
-        json_start = -1
-        for i, line in enumerate(lines):
-            if '=== JSON RESULT ===' in line:
-                json_start = i + 1
-                break
-        
+        # 解析 JSON 结果：标记位于输出末尾，从尾部查找并切片，避免按行拆分整个 stdout
         result = {'ok': 0, 'fail': 0, 'total': 0, 'errors': []}
-        if json_start >= 0 and json_start < len(lines):
+        marker_idx = proc.stdout.rfind('=== JSON RESULT ===')
+        json_nl = proc.stdout.find('\n', marker_idx) if marker_idx >= 0 else -1
+        if json_nl >= 0:
+            json_str = proc.stdout[json_nl + 1:].strip()
             try:
-                json_str = '\n'.join(lines[json_start:])
-                result = json.loads(json_str)
+                result = orjson.loads(json_str) if orjson is not None else json.loads(json_str)
                 print(f"[批量获取] 解析结果: {result}")
             except Exception as e:
                 print(f"[批量获取] JSON解析失败: {e}")
-                print(f"[批量获取] JSON内容: {json_str[:500] if 'json_str' in locals() else 'N/A'}")
+                print(f"[批量获取] JSON内容: {json_str[:500]}")
                 # 即使JSON解析失败，也尝试从stdout中提取信息
                 if '完成:' in proc.stdout:
                     # 尝试从输出中提取数字
@@ -533,9 +772,13 @@ async def batch_fetch_daily_data(body: Dict[str, Any]) -> Dict[str, Any]:
                             'errors': []
                         }
         
-        # 清缓存
+        # 清缓存：脚本报告了更新的股票时只失效这些股票，否则整体清空
         try:
-            data_loader.clear_cache()
+            updated = result.get('updated') if isinstance(result, dict) else None
+            if isinstance(updated, list):
+                data_loader.invalidate_many([str(c) for c in updated])
+            else:
+                data_loader.clear_cache()
         except Exception as e:
             print(f"[批量获取] 清缓存失败: {e}")
         
@@ -589,7 +832,7 @@ async def fetch_stock_data(body: Dict[str, Any]) -> Dict[str, Any]:
             raise HTTPException(status_code=400, detail="缺少有效的 codeFull，例如 sh.601360")
 
         # 更健壮地定位项目根与脚本路径
-        here = Path(__file__).resolve()
+        here = _THIS_FILE
         candidate_roots = [
             here.parents[3] if len(here.parents) >= 4 else here.parent,
             here.parents[2] if len(here.parents) >= 3 else here.parent,
@@ -637,9 +880,9 @@ async def fetch_stock_data(body: Dict[str, Any]) -> Dict[str, Any]:
                 resolved = cand[0]
         if not resolved:
             raise HTTPException(status_code=500, detail=f"脚本执行成功但未找到CSV：期望 {expected}；stdout: {proc.stdout[-500:]} ")
-        # 新数据生成后清空数据缓存，确保后续读取能命中新文件
+        # 新数据生成后失效该股票的缓存，确保后续读取能命中新文件（其它股票缓存保留）
         try:
-            data_loader.clear_cache()
+            data_loader.invalidate(code)
         except Exception:
             pass
         return {"ok": True, "stdout": proc.stdout, "csv": str(resolved), "code": code, "name": name}
@@ -665,9 +908,11 @@ async def fetch_futures_data(symbol: str, period: str = "5", startDate: str = No
         df = get_futures_data(symbol=symbol, period=base_period, start_date=startDate, end_date=endDate)
         # 清洗 NaN/Inf，并将时间戳转字符串，避免 JSON 序列化报错
         records: List[Dict[str, Any]] = []
+        total_count = 0
         if df is not None and not df.empty:
             # 统一列
-            expect_cols = ["timestamp","open","high","low","close","volume","amount"]
+            numeric_cols = ["open","high","low","close","volume","amount"]
+            expect_cols = ["timestamp"] + numeric_cols
             for c in expect_cols:
                 if c not in df.columns:
                     df[c] = np.nan
@@ -676,12 +921,15 @@ async def fetch_futures_data(symbol: str, period: str = "5", startDate: str = No
                 df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
             except Exception:
                 df['timestamp'] = df['timestamp'].astype(str)
-            # 数值列安全化
-            for col in ["open","high","low","close","volume","amount"]:
-                df[col] = pd.to_numeric(df[col], errors='coerce').replace([np.inf, -np.inf], np.nan).fillna(0.0)
+            # 数值列安全化：所有数值列一次性转为 float64 矩阵，原地将 NaN/Inf 置 0
+            values = df[numeric_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            np.nan_to_num(values, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            df[numeric_cols] = values
             # 只保留需要的列
             df = df[expect_cols]
-            records = df.to_dict(orient='records')
+            total_count = len(df)
+            # 仅序列化实际返回的前 5000 条
+            records = df.head(5000).to_dict(orient='records')
             try:
                 min_ts = str(df['timestamp'].iloc[0])
                 max_ts = str(df['timestamp'].iloc[-1])
@@ -692,8 +940,7 @@ async def fetch_futures_data(symbol: str, period: str = "5", startDate: str = No
 
         csv_path = None
         if save:
-            project_root = Path(__file__).resolve().parents[3]
-            data_dir = project_root / 'data' / 'features'
+            data_dir = FEATURES_DIR
             data_dir.mkdir(parents=True, exist_ok=True)
             safe_name = (name or '').strip()
             # 文件名：合约号_中文名.csv；若无中文名，仅合约号
@@ -711,7 +958,7 @@ async def fetch_futures_data(symbol: str, period: str = "5", startDate: str = No
                 partial = pd.to_datetime(min_ts) > pd.to_datetime(startDate)
             except Exception:
                 partial = False
-        return {"ok": True, "count": len(records), "data": records[:5000], "csv": csv_path, "range": {"requested": requested, "actual": actual, "partial": partial}}
+        return {"ok": True, "count": total_count, "data": records, "csv": csv_path, "range": {"requested": requested, "actual": actual, "partial": partial}}
     except HTTPException:
         raise
     except Exception as e:
@@ -752,9 +999,8 @@ async def screener_multi_macd(body: Dict[str, Any]) -> Dict[str, Any]:
         # 名称映射（可选）
         name_map: Dict[str, str] = {}
         try:
-            project_root = Path(__file__).resolve().parents[3]
-            with_industry = project_root / 'data' / 'stockList' / 'all_stock_with_industry.json'
-            pure = project_root / 'data' / 'stockList' / 'all_pure_stock.json'
+            with_industry = STOCKLIST_DIR / 'all_stock_with_industry.json'
+            pure = STOCKLIST_DIR / 'all_pure_stock.json'
             data: list = []
             if with_industry.exists():
                 data = json.loads(with_industry.read_text(encoding='utf-8'))
@@ -797,24 +1043,14 @@ async def screener_multi_macd(body: Dict[str, Any]) -> Dict[str, Any]:
             """
             if df is None or df.empty or 'close' not in df.columns:
                 return 'neutral'
-            closes = pd.to_numeric(df['close'], errors='coerce')
+            closes = pd.to_numeric(df['close'], errors='coerce').dropna().to_numpy(dtype=np.float64)
             if len(closes) < max(slow, signal) + 2:  # 至少需要slow+2根K线
                 return 'neutral'
             
-            ema_fast = closes.ewm(span=fast, adjust=False).mean()
-            ema_slow = closes.ewm(span=slow, adjust=False).mean()
-            dif = ema_fast - ema_slow
-            dea = dif.ewm(span=signal, adjust=False).mean()
-            hist = dif - dea  # MACD柱状图
-            
-            if len(hist) < 2:
-                return 'neutral'
-            
-            # 取最后两根柱子
-            last_hist = hist.iloc[-1]
-            prev_hist = hist.iloc[-2]
+            # 取最后两根柱子（MACD柱状图 = DIF - DEA）
+            last_hist, prev_hist, _ = macd_last(closes, fast, slow, signal)
             
-            if pd.isna(last_hist) or pd.isna(prev_hist):
+            if np.isnan(last_hist) or np.isnan(prev_hist):
                 return 'neutral'
             
             # 判断柱子变化方向
@@ -825,36 +1061,39 @@ async def screener_multi_macd(body: Dict[str, Any]) -> Dict[str, Any]:
             else:
                 return 'neutral'  # 持平
 
+        # 按K线数量从少到多排序周期（周线最短），任一周期不满足方向即可提前淘汰
+        tf_order = {'1M': 0, '1w': 1, '1d': 2, '4h': 3, '1h': 4, '30m': 5, '15m': 6, '5m': 7, '1m': 8}
+        eval_timeframes = sorted(timeframes, key=lambda t: tf_order.get(t, len(tf_order)))
+
         selected: List[Dict[str, Any]] = []
         errors: List[Dict[str, Any]] = []
         for sym in symbols:
             tf_results: Dict[str, str] = {}
             try:
-                for tf in timeframes:
+                keep = True
+                wanted = direction if direction in ('bull', 'bear') else None
+                for tf in eval_timeframes:
                     try:
                         df = load_stock_data(sym, tf, end_date=end_date)
                     except Exception as ee:
-                        tf_results[tf] = 'error'
-                        continue
-                    tf_results[tf] = macd_trend(df)
-                # 判定是否同向
-                signs = [s for s in tf_results.values() if s in ('bull', 'bear')]
-                if len(signs) != len(timeframes):
-                    continue
-                all_bull = all(s == 'bull' for s in signs)
-                all_bear = all(s == 'bear' for s in signs)
-                keep = False
-                if direction == 'bull':
-                    keep = all_bull
-                elif direction == 'bear':
-                    keep = all_bear
-                else:
-                    keep = (all_bull or all_bear)
+                        keep = False
+                        break
+                    trend = macd_trend(df)
+                    tf_results[tf] = trend
+                    if trend not in ('bull', 'bear'):
+                        keep = False
+                        break
+                    # direction=both 时以首个周期的方向作为共振方向
+                    if wanted is None:
+                        wanted = trend
+                    if trend != wanted:
+                        keep = False
+                        break
                 if keep:
                     selected.append({
                         "code": sym,
                         "name": name_map.get(sym) or sym,
-                        "trends": tf_results
+                        "trends": {tf: tf_results[tf] for tf in timeframes}
                     })
             except Exception as e:
                 errors.append({"symbol": sym, "error": str(e)})
@@ -883,15 +1122,14 @@ async def start_screening_task_async(body: Dict[str, Any], background_tasks: Bac
     try:
         task_id = str(uuid.uuid4())
         
-        with tasks_lock:
-            screening_tasks[task_id] = {
-                "status": "running",  # running | completed | error
-                "progress": {"processed": 0, "total": 0, "matched": 0, "current": ""},
-                "results": [],
-                "errors": [],
-                "params": body,
-                "created_at": datetime.now().isoformat()
-            }
+        _register_task(task_id, {
+            "status": "running",  # running | completed | error
+            "progress": {"processed": 0, "total": 0, "matched": 0, "current": ""},
+            "results": [],
+            "errors": [],
+            "params": body,
+            "created_at": datetime.now().isoformat()
+        })
         
         # 后台执行筛选任务
         background_tasks.add_task(_run_screening_task, task_id, body)
@@ -921,6 +1159,9 @@ async def get_screening_task_status(task_id: str) -> Dict[str, Any]:
         # 清理可能无法序列化的数据
         task_copy = {}
         for key, value in task.items():
+            if key.startswith("_"):
+                # 内部字段（如 _created_ts）不返回给前端
+                continue
             if key == "results" and isinstance(value, list):
                 # 清理results中的每个item，确保所有值都可以序列化
                 cleaned_results = []
@@ -954,6 +1195,8 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
     """
     后台执行筛选任务（同步函数，由BackgroundTasks调用）
     """
+    process_pool: Optional[ProcessPoolExecutor] = None  # 解析CSV的进程池（股票较多时使用）
+    owns_process_pool = False  # 进程池为本任务单独创建（结束时释放）
     try:
         # 确保任务开始时清空结果（防止之前的残留数据）
         with tasks_lock:
@@ -1031,8 +1274,14 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
         enable_golden_cross = bool(params.get('enableGoldenCross', False))  # 金叉筛选
         golden_cross_lookback = int(params.get('goldenCrossLookback') or 5)  # 金叉回看天数
         end_date = params.get('endDate')  # 数据截止日期（YYYY-MM-DD），None表示使用全部数据
+        enable_cache = bool(params.get('enableCache', True))  # 是否使用收盘价磁盘缓存（data/.cache/closes）
+        try:
+            end_dt_parsed = pd.to_datetime(end_date) if end_date else None
+        except Exception:
+            end_dt_parsed = None  # 截止日期无法解析时按未设置处理（使用全部数据）
         
         # 候选标的
+        entries: Optional[List[Dict[str, Any]]] = None  # 本地数据源列表（只扫描一次目录，兜底名称映射复用）
         if isinstance(params.get('symbols'), list) and params.get('symbols'):
             symbols = [str(x) for x in params['symbols'] if x]
         else:
@@ -1056,33 +1305,13 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
         with tasks_lock:
             screening_tasks[task_id]["progress"]["total"] = len(symbols)
         
-        # 名称映射
-        name_map: Dict[str, str] = {}
-        try:
-            project_root = Path(__file__).resolve().parents[3]
-            with_industry = project_root / 'data' / 'stockList' / 'all_stock_with_industry.json'
-            pure = project_root / 'data' / 'stockList' / 'all_pure_stock.json'
-            data: list = []
-            if with_industry.exists():
-                data = json.loads(with_industry.read_text(encoding='utf-8'))
-            elif pure.exists():
-                data = json.loads(pure.read_text(encoding='utf-8'))
-            for it in (data or []):
-                try:
-                    code_raw = str(it.get('code') or '')
-                    # 提取纯6位代码
-                    code = code_raw.split('.')[-1] if '.' in code_raw else code_raw
-                    nm = str(it.get('code_name') or it.get('name') or '')
-                    if code and nm:
-                        name_map[code] = nm
-                except Exception:
-                    continue
-        except Exception:
-            pass
+        # 名称映射（复制一份，下面的兜底补充不影响模块级缓存）
+        name_map: Dict[str, str] = dict(get_name_map())
         
         # 兜底：用本地CSV文件名
         try:
-            entries = data_loader.list_symbols()
+            if entries is None:
+                entries = data_loader.list_symbols()
             for e in (entries or []):
                 try:
                     if not isinstance(e, dict) or e.get('kind') != 'stock':
@@ -1096,88 +1325,64 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
         except Exception:
             pass
         
-        def macd_trend(df: pd.DataFrame) -> str:
+        # 为了确保EMA计算的准确性，使用全部数据而不是只取最后几根
+        # EMA需要足够的历史数据才能稳定，但为了性能，至少使用 slow*3 根
+        macd_tail_len = max(slow * 3, 100)
+        
+        def frame_closes(df: Optional[pd.DataFrame]) -> np.ndarray:
+            """提取DataFrame中有效的收盘价数组（float64）"""
+            if df is None or df.empty or 'close' not in df.columns:
+                return np.empty(0, dtype=np.float64)
+            return pd.to_numeric(df['close'], errors='coerce').dropna().to_numpy(dtype=np.float64)
+        
+        def compute_macd_panel(close_arrays: List[np.ndarray]) -> List[MacdSnapshot]:
             """
-            判断MACD柱状图是否上升/下降（动能方向）
+            批量计算一批股票的MACD末值：将各股票收盘价尾部右对齐堆叠为 (N, T) 面板（左侧NaN填充），
+            单次内核调用得到每只股票的 MacdSnapshot
+            """
+            tails = [closes[-macd_tail_len:] for closes in close_arrays]
+            lengths = [len(closes) for closes in close_arrays]
+            panel = np.full((len(tails), macd_tail_len), np.nan)
+            for i, tail in enumerate(tails):
+                if len(tail):
+                    panel[i, -len(tail):] = tail
+            hist_last, hist_prev, dif_last = macd_panel(panel, fast, slow, signal_period)
+            return [make_macd_snapshot(hist_last[i], hist_prev[i], dif_last[i], lengths[i]) for i in range(len(tails))]
+        
+        def make_macd_snapshot(last_hist: float, prev_hist: float, last_dif: float, length: int) -> MacdSnapshot:
+            """
+            由MACD末值与有效收盘价数量构造快照（数据不足或为NaN的字段置 None）
+            
+            trend 为MACD柱状图的动能方向：
             - bull: 柱子上升（hist[-1] > hist[-2]），动能增强
             - bear: 柱子下降（hist[-1] < hist[-2]），动能减弱
             - neutral: 数据不足或持平
             """
-            if df is None or df.empty or 'close' not in df.columns:
-                return 'neutral'
-            closes = pd.to_numeric(df['close'], errors='coerce').dropna()
-            if len(closes) < max(slow, signal_period) + 2:
-                return 'neutral'
-            
-            # 为了确保EMA计算的准确性，使用全部数据而不是只取最后几根
-            # EMA需要足够的历史数据才能稳定，但为了性能，至少使用 slow*3 根
-            min_len = max(slow * 3, 100)
-            if len(closes) > min_len:
-                # 如果数据足够多，只取最后部分计算（提高性能）
-                closes_tail = closes.iloc[-min_len:]
-            else:
-                # 如果数据不多，使用全部数据
-                closes_tail = closes
-            
-            ema_fast = closes_tail.ewm(span=fast, adjust=False).mean()
-            ema_slow = closes_tail.ewm(span=slow, adjust=False).mean()
-            dif = ema_fast - ema_slow
-            dea = dif.ewm(span=signal_period, adjust=False).mean()
-            hist = dif - dea  # MACD柱状图 = DIF - DEA
-            
-            if len(hist) < 2:
-                return 'neutral'
-            
-            # 取最后两根柱子进行比较
-            last_hist = hist.iloc[-1]
-            prev_hist = hist.iloc[-2]
-            
-            if pd.isna(last_hist) or pd.isna(prev_hist):
-                return 'neutral'
-            
-            # 判断柱子变化方向
-            if last_hist > prev_hist:
-                return 'bull'  # 柱子上升，动能增强
-            elif last_hist < prev_hist:
-                return 'bear'  # 柱子下降，动能减弱
-            else:
-                return 'neutral'  # 持平
-        
-        def get_macd_dif(df: pd.DataFrame) -> float:
-            """获取MACD的DIF值（快线-慢线），用于判断MACD>0"""
-            if df is None or df.empty or 'close' not in df.columns:
-                return None
-            closes = pd.to_numeric(df['close'], errors='coerce').dropna()
-            if len(closes) < max(slow, signal_period):
-                return None
-            
-            # 只取最后 slow*3 根K线计算，减少计算量
-            tail_len = min(len(closes), max(slow * 3, 100))
-            closes_tail = closes.iloc[-tail_len:]
-            
-            ema_fast = closes_tail.ewm(span=fast, adjust=False).mean()
-            ema_slow = closes_tail.ewm(span=slow, adjust=False).mean()
-            dif = ema_fast - ema_slow
-            
-            if len(dif) == 0:
-                return None
-            
-            last_dif = dif.iloc[-1]
-            return float(last_dif) if pd.notna(last_dif) else None
-        
-        def calculate_rsi(closes: pd.Series, period: int = 14) -> Optional[float]:
-            """计算RSI指标"""
+            min_len = max(slow, signal_period)
+            snap = MacdSnapshot()
+            if length >= min_len and not np.isnan(last_dif):
+                snap.dif = float(last_dif)
+            if length >= min_len + 1 and not np.isnan(last_hist):
+                snap.hist_last = float(last_hist)
+            if length >= min_len + 2 and snap.hist_last is not None and not np.isnan(prev_hist):
+                snap.hist_prev = float(prev_hist)
+                # 取最后两根柱子比较（MACD柱状图 = DIF - DEA）
+                if snap.hist_last > snap.hist_prev:
+                    snap.trend = 'bull'
+                elif snap.hist_last < snap.hist_prev:
+                    snap.trend = 'bear'
+            return snap
+        
+        def calculate_rsi(closes: np.ndarray, period: int = 14) -> Optional[float]:
+            """计算RSI指标（只需最后一根，直接对最近 period 个涨跌幅求均值，无需整条滚动序列）"""
             try:
                 if len(closes) < period + 1:
                     return None
-                delta = closes.diff()
-                gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-                loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-                
-                if len(gain) == 0 or len(loss) == 0:
-                    return None
+                delta = np.diff(closes[-(period + 1):])
+                gain = np.where(delta > 0, delta, 0.0).mean()
+                loss = np.where(delta < 0, -delta, 0.0).mean()
                 
-                rs = gain.iloc[-1] / loss.iloc[-1] if loss.iloc[-1] != 0 else None
+                rs = gain / loss if loss != 0 else None
                 if rs is None:
                     return None
                 
@@ -1186,6 +1391,15 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
             except Exception:
                 return None
         
+        def end_cutoff_index(df: pd.DataFrame, end_dt: pd.Timestamp) -> int:
+            """
+            截止日期在按时间排序的df中的切分位置：df.iloc[:idx] 即日期 <= end_dt 的全部行
+            （在 int64 纳秒时间戳上二分查找，无需逐行转换为 date 对象）
+            """
+            ts_int = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+            end_ns = (pd.Timestamp(end_dt).normalize() + pd.Timedelta(days=1)).value
+            return int(np.searchsorted(ts_int, end_ns, side='left'))
+        
         def check_golden_cross(df: pd.DataFrame, lookback_days: int = 5, end_date_str: str = None) -> bool:
             """
             检查从截止日期往前N个交易日内是否发生MACD金叉（DIF上穿DEA）
@@ -1205,19 +1419,18 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 return False
             
             # 先过滤截止日期之前的数据
-            df_work = df.copy()
-            df_work['date_parsed'] = pd.to_datetime(df_work['timestamp'])
+            df_work = df
             
             if end_date_str:
                 try:
                     end_dt = pd.to_datetime(end_date_str)
                     # 只使用截止日期及之前的数据
-                    df_work = df_work[df_work['date_parsed'].dt.date <= end_dt.date()]
+                    df_work = df.iloc[:end_cutoff_index(df, end_dt)]
                     if df_work.empty:
                         return False
                     
                     # 检查数据新鲜度：最新数据日期不应距离截止日期太远
-                    latest_data_date = df_work['date_parsed'].max()
+                    latest_data_date = pd.to_datetime(df_work['timestamp'].iloc[-1])
                     days_diff = (end_dt - latest_data_date).days
                     
                     # 如果最新数据距离截止日期超过 lookback_days+5 天（考虑周末），说明数据太旧
@@ -1260,123 +1473,180 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
             
             return False
         
-        def get_macd_hist(df: pd.DataFrame) -> float:
-            """获取MACD柱状图值（hist = DIF - DEA），用于判断MACD柱状图是否为红色（>0）"""
-            if df is None or df.empty or 'close' not in df.columns:
-                return None
-            closes = pd.to_numeric(df['close'], errors='coerce').dropna()
-            if len(closes) < max(slow, signal_period) + 1:
-                return None
-            
-            # 只取最后 slow*3 根K线计算，减少计算量
-            tail_len = min(len(closes), max(slow * 3, 100))
-            closes_tail = closes.iloc[-tail_len:]
-            
-            ema_fast = closes_tail.ewm(span=fast, adjust=False).mean()
-            ema_slow = closes_tail.ewm(span=slow, adjust=False).mean()
-            dif = ema_fast - ema_slow
-            dea = dif.ewm(span=signal_period, adjust=False).mean()
-            hist = dif - dea  # MACD柱状图
-            
-            if len(hist) == 0:
-                return None
-            
-            last_hist = hist.iloc[-1]
-            return float(last_hist) if pd.notna(last_hist) else None
-        
-        def check_first_rise_phase(df: pd.DataFrame) -> bool:
+        def check_first_rise_phase(closes: Optional[np.ndarray]) -> bool:
             """
             检查是否满足第一次主升段条件（修改版）：
             红色柱子向上突破零轴后，价格连续绝对值上涨（不看比率）
             要求：转红后，每个交易日的收盘价都必须 > 前一个交易日的收盘价（绝对值上涨）
             """
-            if df is None or df.empty or 'close' not in df.columns:
-                return False
-            
-            closes = pd.to_numeric(df['close'], errors='coerce').dropna()
-            if len(closes) < max(slow, signal_period) + 5:  # 至少需要足够的数据
-                return False
-            
-            # 计算MACD柱状图
-            ema_fast = closes.ewm(span=fast, adjust=False).mean()
-            ema_slow = closes.ewm(span=slow, adjust=False).mean()
-            dif = ema_fast - ema_slow
-            dea = dif.ewm(span=signal_period, adjust=False).mean()
-            hist = dif - dea  # MACD柱状图
-            
-            # 清理NaN值
-            hist = hist.dropna()
-            if len(hist) < 3:
-                return False
-            
-            # 从后往前找，找到最近一次从负转正的位置（绿转红，突破零轴）
-            # 需要找到：hist[i] <= 0 且 hist[i+1] > 0 的位置
-            turn_red_idx = None
-            for i in range(len(hist) - 2, -1, -1):
-                if hist.iloc[i] <= 0 and hist.iloc[i + 1] > 0:
-                    turn_red_idx = i + 1
-                    break
-            
-            # 如果没有找到绿转红的位置，不符合条件
-            if turn_red_idx is None:
+            if closes is None or len(closes) < max(slow, signal_period) + 5:  # 至少需要足够的数据
                 return False
             
-            # 检查转红后价格是否连续绝对值上涨（不看比率）
-            # 从转红位置对应的K线开始，到最新，每个交易日的收盘价都必须 > 前一个交易日的收盘价
-            
-            # 找到hist中turn_red_idx对应的原始closes索引
-            # 由于hist是dropna后的，我们需要找到对应的位置
-            # 简化处理：假设hist和closes在计算后索引对应（去掉前面的NaN）
-            hist_start_idx = len(closes) - len(hist)  # hist在closes中的起始索引
-            
-            # 转红位置在closes中的索引
-            price_start_idx = hist_start_idx + turn_red_idx
-            
-            # 检查从转红位置到最新的价格是否连续上涨
-            if price_start_idx >= len(closes) - 1:
-                return False  # 数据不足
+            # 单次递推同时跟踪最近一次绿转红（柱状图突破零轴）的位置与最近一次价格未上涨的位置
+            return bool(macd_first_rise(closes, fast, slow, signal_period))
+        
+        # 按批加载数据并批量计算MACD：chunk_macd[(sym, tf)] 为该周期的MACD末值（加载失败则不存在），
+        # chunk_frames[(sym, tf)] 为 DataFrame（加载失败为 None）。启用收盘价缓存时，MACD直接由
+        # 磁盘缓存（np.memmap 映射）的收盘价计算，完整K线仅在通过方向筛选后按需加载
+        chunk_size = 256
+        load_concurrency = 64
+        # 股票数超过一个批次时使用进程池（workers 参数可指定进程数，1 表示不使用）：默认进程数时复用共享进程池，
+        # 指定其它进程数时为本任务单独创建，任务结束时释放
+        cpu_workers = os.cpu_count() or 1
+        max_workers = int(params.get('workers') or 0) or cpu_workers
+        if enable_cache and max_workers > 1 and len(symbols) > chunk_size:
+            if max_workers == cpu_workers:
+                process_pool = _get_scoring_pool()
+            else:
+                try:
+                    process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=_POOL_MP_CONTEXT)
+                    owns_process_pool = True
+                except Exception:
+                    process_pool = None
+        chunk_frames: Dict[Tuple[str, str], Optional[pd.DataFrame]] = {}
+        chunk_macd: Dict[Tuple[str, str], MacdSnapshot] = {}
+        
+        async def load_chunk_async(pairs: List[Tuple[str, str]], loader, executor=None) -> List[Any]:
+            """并发读取一批 (股票, 周期) 的数据，信号量限制同时进行的读取数；指定 executor 时在进程池中执行"""
+            sem = asyncio.Semaphore(load_concurrency)
+            running_loop = asyncio.get_running_loop()
             
-            # 从转红位置的下一个交易日开始检查（因为转红当天可能还没上涨）
-            # 检查从转红位置到最新，每个价格都必须 > 前一个价格（绝对值上涨，不看比率）
-            for i in range(price_start_idx + 1, len(closes)):
-                current_price = closes.iloc[i]
-                prev_price = closes.iloc[i - 1]
-                
-                if pd.isna(current_price) or pd.isna(prev_price):
-                    return False
-                
-                # 要求绝对值上涨：当前价格必须 > 前一个价格（不看比率）
-                if current_price <= prev_price:
-                    return False
+            async def load_one(s: str, tf: str) -> Any:
+                async with sem:
+                    try:
+                        if executor is not None:
+                            return await running_loop.run_in_executor(executor, loader, s, tf, end_date)
+                        return await asyncio.to_thread(loader, s, tf, end_date)
+                    except Exception:
+                        return None
             
-            # 所有检查通过：转红后价格连续绝对值上涨
-            return True
+            return await asyncio.gather(*[load_one(s, tf) for s, tf in pairs])
+        
+        def load_pairs(pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], np.ndarray]:
+            """加载一批 (股票, 周期) 并批量计算MACD写入 chunk_macd，返回成功加载的收盘价数组"""
+            # 本函数运行在 BackgroundTasks 的工作线程中（无事件循环），用 asyncio.run 驱动并发读取
+            if not pairs:
+                return {}
+            if enable_cache and process_pool is not None:
+                # CSV解析与周期聚合为CPU密集型（受GIL限制），缓存未命中时在多个子进程中并行完成；
+                # 子进程写好磁盘缓存后只回传路径，主进程以 np.memmap 映射，数组不经进程间序列化复制
+                worker = functools.partial(prepare_close_arrays_worker, data_loader.data_dir)
+                loaded = asyncio.run(load_chunk_async(pairs, worker, process_pool))
+                for i, ((s, tf), arrays) in enumerate(zip(pairs, loaded)):
+                    if isinstance(arrays, str):
+                        try:
+                            loaded[i] = data_loader.open_close_cache(arrays, end_date) or data_loader.load_close_arrays(s, tf, end_date)
+                        except Exception:
+                            loaded[i] = None
+                close_arrays = [None if arrays is None else arrays['close'] for arrays in loaded]
+            elif enable_cache:
+                loaded = asyncio.run(load_chunk_async(pairs, data_loader.load_close_arrays))
+                close_arrays = [None if arrays is None else arrays['close'] for arrays in loaded]
+            else:
+                loaded = asyncio.run(load_chunk_async(pairs, load_stock_data))
+                for pair, df in zip(pairs, loaded):
+                    chunk_frames[pair] = df
+                close_arrays = [None if df is None else frame_closes(df) for df in loaded]
+            ok = {pair: closes for pair, closes in zip(pairs, close_arrays) if closes is not None}
+            for (pair, closes), macd in zip(ok.items(), compute_macd_panel(list(ok.values()))):
+                if enable_first_rise_phase and pair[1] == '1d':
+                    macd.first_rise_ok = check_first_rise_phase(closes)
+                chunk_macd[pair] = macd
+            return ok
+        
+        def daily_rejects(macd: Optional[MacdSnapshot]) -> bool:
+            """仅凭日线即可判定不满足条件（日线方向、日线MACD值、第一次主升段），无需再加载其它周期"""
+            if daily_direction != 'any':
+                daily_sign = macd.trend if macd is not None else 'error'
+                if (daily_direction == 'up' and daily_sign != 'bull') or (daily_direction == 'down' and daily_sign != 'bear'):
+                    return True
+            if daily_macd_condition != 'any':
+                daily_hist = macd.hist_last if macd is not None else None
+                if daily_hist is None:
+                    return True
+                if daily_macd_condition == 'positive' and daily_hist <= 0:
+                    return True
+                if daily_macd_condition == 'negative' and daily_hist >= 0:
+                    return True
+            if enable_first_rise_phase and not (macd is not None and macd.first_rise_ok):
+                return True
+            return False
+        
+        # 存在仅凭日线即可淘汰的条件时，先加载日线，被淘汰的股票不再加载周线等其它周期
+        early_reject = '1d' in timeframes and len(timeframes) > 1 and (
+            daily_direction != 'any' or daily_macd_condition != 'any' or enable_first_rise_phase
+        )
+        chunk_rejected: set = set()
+        
+        def prepare_chunk(chunk: List[str]) -> None:
+            chunk_frames.clear()
+            chunk_macd.clear()
+            chunk_rejected.clear()
+            if early_reject:
+                load_pairs([(s, '1d') for s in chunk])
+                for s in chunk:
+                    if daily_rejects(chunk_macd.get((s, '1d'))):
+                        chunk_rejected.add(s)
+                remaining = [s for s in chunk if s not in chunk_rejected]
+                load_pairs([(s, tf) for tf in timeframes if tf != '1d' for s in remaining])
+            else:
+                load_pairs([(s, tf) for tf in timeframes for s in chunk])
+        
+        def get_frame(s: str, tf: str) -> Optional[pd.DataFrame]:
+            """获取完整K线数据，未预加载时按需加载"""
+            if (s, tf) not in chunk_frames:
+                try:
+                    chunk_frames[(s, tf)] = load_stock_data(s, tf, end_date=end_date)
+                except Exception:
+                    chunk_frames[(s, tf)] = None
+            return chunk_frames[(s, tf)]
         
         # 逐只筛选
         selected: List[Dict[str, Any]] = []
         errors: List[Dict[str, Any]] = []
         processed = 0
         
-        for sym in symbols:
-            # 更新当前处理的股票
+        # 进度与新结果先记录在本地，每 progress_flush_every 只股票加锁写回一次
+        progress_flush_every = 32
+        progress = ScreeningProgress(total=len(symbols))
+        pending_results: deque = deque()
+        matched_codes: set = set()
+        
+        def flush_progress() -> None:
+            batch = list(pending_results)
+            pending_results.clear()
             with tasks_lock:
-                screening_tasks[task_id]["progress"]["current"] = sym
+                task = screening_tasks[task_id]
+                if batch:
+                    # 结果按code去重：同code的新结果替换旧结果并移到末尾
+                    latest: Dict[Any, Dict[str, Any]] = {}
+                    for item in batch:
+                        latest.pop(item.get("code"), None)
+                        latest[item.get("code")] = item
+                    current_results = [r for r in task["results"] if r.get("code") not in latest]
+                    current_results.extend(latest.values())
+                    task["results"] = current_results
+                task["progress"] = asdict(progress)
+        
+        for sym_idx, sym in enumerate(symbols):
+            if sym_idx % chunk_size == 0:
+                prepare_chunk(symbols[sym_idx:sym_idx + chunk_size])
+            
+            # 更新当前处理的股票
+            progress.current = sym
             
             tf_results: Dict[str, str] = {}
             daily_df = None  # 保存日线数据用于放量判断
             weekly_df = None  # 保存周线数据用于MACD值判断
             try:
+                if sym in chunk_rejected:
+                    continue  # 仅凭日线已被淘汰（未加载其它周期），进度在 finally 中更新
+                
                 for tf in timeframes:
-                    try:
-                        df = load_stock_data(sym, tf, end_date=end_date)
-                        if tf == '1d':
-                            daily_df = df  # 保存日线数据
-                        elif tf == '1w':
-                            weekly_df = df  # 保存周线数据
-                    except Exception:
+                    if (sym, tf) not in chunk_macd:
                         tf_results[tf] = 'error'
                         continue
-                    tf_results[tf] = macd_trend(df)
+                    tf_results[tf] = chunk_macd[(sym, tf)].trend
                 
                 # 获取日线和周线的方向
                 daily_sign = tf_results.get('1d', 'neutral')
@@ -1411,6 +1681,39 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 
                 keep = daily_ok and weekly_ok and resonance_ok
                 
+                # 通过方向筛选后才需要完整K线数据
+                if keep:
+                    if '1d' in timeframes:
+                        daily_df = get_frame(sym, '1d')  # 保存日线数据
+                    if '1w' in timeframes:
+                        weekly_df = get_frame(sym, '1w')  # 保存周线数据
+                
+                # 日线收盘价/成交量的 float64 数组（每只股票只解析一次，供下面各项筛选复用）
+                # daily_close_raw 与 daily_df 行一一对应（无法解析为NaN），daily_close_np/daily_volume_np 已去除NaN
+                daily_close_raw: Optional[np.ndarray] = None
+                daily_close_np: Optional[np.ndarray] = None
+                daily_volume_np: Optional[np.ndarray] = None
+                if daily_df is not None and not daily_df.empty:
+                    try:
+                        daily_close_raw = pd.to_numeric(daily_df['close'], errors='coerce').to_numpy(dtype=np.float64)
+                        daily_close_np = daily_close_raw[~np.isnan(daily_close_raw)]
+                    except Exception:
+                        daily_close_raw = None
+                        daily_close_np = None
+                    try:
+                        volumes_raw = pd.to_numeric(daily_df['volume'], errors='coerce').to_numpy(dtype=np.float64)
+                        daily_volume_np = volumes_raw[~np.isnan(volumes_raw)]
+                    except Exception:
+                        daily_volume_np = None
+                
+                # 截止日期在日线数据中的切分位置（每只股票只计算一次，供各项按日期过滤的判断复用）
+                daily_cutoff = None
+                if end_dt_parsed is not None and daily_df is not None and not daily_df.empty:
+                    try:
+                        daily_cutoff = end_cutoff_index(daily_df, end_dt_parsed)
+                    except Exception:
+                        daily_cutoff = None
+                
                 # MACD值筛选（日线和周线MACD值条件）
                 if keep:
                     # 检查日线MACD值条件
@@ -1418,7 +1721,8 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                         if daily_df is None or daily_df.empty:
                             keep = False
                         else:
-                            daily_hist = get_macd_hist(daily_df)
+                            daily_snap = chunk_macd.get((sym, '1d'))
+                            daily_hist = daily_snap.hist_last if daily_snap is not None else None
                             if daily_hist is None:
                                 keep = False
                             elif daily_macd_condition == 'positive' and daily_hist <= 0:
@@ -1431,7 +1735,8 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                         if weekly_df is None or weekly_df.empty:
                             keep = False
                         else:
-                            weekly_hist = get_macd_hist(weekly_df)
+                            weekly_snap = chunk_macd.get((sym, '1w'))
+                            weekly_hist = weekly_snap.hist_last if weekly_snap is not None else None
                             if weekly_hist is None:
                                 keep = False
                             elif weekly_macd_condition == 'positive' and weekly_hist <= 0:
@@ -1444,7 +1749,13 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                         if daily_df is None or daily_df.empty:
                             keep = False
                         else:
-                            if not check_first_rise_phase(daily_df):
+                            # 日线在批量加载阶段已算出结果时直接复用（timeframes 不含日线时才现算）
+                            daily_snap = chunk_macd.get((sym, '1d'))
+                            if daily_snap is not None and daily_snap.first_rise_ok is not None:
+                                first_rise_ok = daily_snap.first_rise_ok
+                            else:
+                                first_rise_ok = check_first_rise_phase(daily_close_np)
+                            if not first_rise_ok:
                                 keep = False
                 
                 # 放量筛选（仅在日线数据上判断）
@@ -1453,10 +1764,10 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 avg_volume = None
                 if keep and enable_volume and daily_df is not None and not daily_df.empty:
                     try:
-                        volumes = pd.to_numeric(daily_df['volume'], errors='coerce').dropna()
+                        volumes = daily_volume_np
                         if len(volumes) >= volume_period + 1:
-                            last_volume = volumes.iloc[-1]
-                            avg_volume = volumes.iloc[-(volume_period+1):-1].mean()
+                            last_volume = volumes[-1]
+                            avg_volume = volumes[-(volume_period+1):-1].mean()
                             if pd.notna(last_volume) and pd.notna(avg_volume) and avg_volume > 0:
                                 volume_ok = (last_volume >= avg_volume * volume_ratio)
                             else:
@@ -1472,7 +1783,7 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 ma_long_value = None
                 if keep and volume_ok and enable_ma and daily_df is not None and not daily_df.empty:
                     try:
-                        closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                        closes = pd.Series(daily_close_np)
                         max_ma = max(ma_short, ma_long)
                         if len(closes) >= max_ma:
                             # 计算均线
@@ -1501,36 +1812,29 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 price_above_ma_info = {}  # 记录价格与各MA的关系
                 if keep and volume_ok and ma_ok and enable_price_above_ma and daily_df is not None and not daily_df.empty:
                     try:
-                        closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                        closes = daily_close_np
                         max_ma_period = max(price_above_ma_periods) if price_above_ma_periods else 60
                         
                         if len(closes) >= max_ma_period:
                             # 找到截止日期对应的数据
-                            if end_date:
-                                try:
-                                    end_dt = pd.to_datetime(end_date)
-                                    daily_df['date'] = pd.to_datetime(daily_df['timestamp']).dt.date
-                                    end_date_only = end_dt.date()
-                                    # 找到截止日期及之前的最后一条记录
-                                    filtered_df = daily_df[daily_df['date'] <= end_date_only]
-                                    if not filtered_df.empty:
-                                        closes_for_ma = pd.to_numeric(filtered_df['close'], errors='coerce').dropna()
-                                        current_price = closes_for_ma.iloc[-1] if len(closes_for_ma) > 0 else None
-                                    else:
-                                        closes_for_ma = closes
-                                        current_price = closes.iloc[-1]
-                                except Exception:
+                            if daily_cutoff is not None:
+                                # 截止日期及之前的全部记录
+                                if daily_cutoff > 0:
+                                    closes_for_ma = daily_close_raw[:daily_cutoff]
+                                    closes_for_ma = closes_for_ma[~np.isnan(closes_for_ma)]
+                                    current_price = closes_for_ma[-1] if len(closes_for_ma) > 0 else None
+                                else:
                                     closes_for_ma = closes
-                                    current_price = closes.iloc[-1]
+                                    current_price = closes[-1]
                             else:
                                 closes_for_ma = closes
-                                current_price = closes.iloc[-1]
+                                current_price = closes[-1]
                             
                             if pd.notna(current_price) and len(closes_for_ma) >= max_ma_period:
                                 # 检查价格是否大于所有选中的MA周期
                                 for period in price_above_ma_periods:
                                     if len(closes_for_ma) >= period:
-                                        ma_value = closes_for_ma.iloc[-period:].mean()
+                                        ma_value = closes_for_ma[-period:].mean()
                                         if pd.notna(ma_value):
                                             is_above = current_price > ma_value
                                             price_above_ma_info[f'MA{period}'] = {
@@ -1558,10 +1862,10 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 max_price = None
                 if keep and volume_ok and ma_ok and price_above_ma_ok and enable_position and daily_df is not None and not daily_df.empty:
                     try:
-                        closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                        closes = daily_close_np
                         if len(closes) >= lookback_days + 1:
-                            recent_closes = closes.iloc[-lookback_days:]
-                            position_current_price = closes.iloc[-1]
+                            recent_closes = closes[-lookback_days:]
+                            position_current_price = closes[-1]
                             min_price = recent_closes.min()
                             max_price = recent_closes.max()
                             
@@ -1589,14 +1893,14 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 trend_strength_value = None
                 if keep and volume_ok and ma_ok and price_above_ma_ok and position_ok and enable_trend_strength and daily_df is not None and not daily_df.empty:
                     try:
-                        closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                        closes = daily_close_np
                         if len(closes) >= 20:
                             # 使用线性回归计算20日价格斜率
-                            x = np.arange(len(closes.tail(20)))
-                            y = closes.tail(20).values
+                            y = closes[-20:]
+                            x = np.arange(len(y))
                             if len(x) == len(y) and len(x) > 1:
                                 slope = np.polyfit(x, y, 1)[0]
-                                current_price = closes.iloc[-1]
+                                current_price = closes[-1]
                                 slope_pct = (slope / current_price * 100) if current_price > 0 else 0
                                 
                                 if slope_pct > 0.05:
@@ -1627,7 +1931,7 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 rsi_value = None
                 if keep and volume_ok and ma_ok and price_above_ma_ok and position_ok and golden_cross_ok and enable_rsi and daily_df is not None and not daily_df.empty:
                     try:
-                        closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                        closes = daily_close_np
                         if len(closes) >= rsi_period + 1:
                             rsi_value = calculate_rsi(closes, rsi_period)
                             if rsi_value is not None:
@@ -1655,14 +1959,15 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 if keep and volume_ok and ma_ok and price_above_ma_ok and position_ok and trend_strength_ok and golden_cross_ok and rsi_ok and enable_volatility and daily_df is not None and not daily_df.empty:
                     try:
                         if len(daily_df) >= 14:
-                            recent_data = daily_df.tail(14)
-                            highs = pd.to_numeric(recent_data['high'], errors='coerce').dropna()
-                            lows = pd.to_numeric(recent_data['low'], errors='coerce').dropna()
-                            closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                            highs = pd.to_numeric(daily_df['high'], errors='coerce').to_numpy(dtype=np.float64)[-14:]
+                            lows = pd.to_numeric(daily_df['low'], errors='coerce').to_numpy(dtype=np.float64)[-14:]
+                            closes = daily_close_np
                             
-                            if len(highs) > 0 and len(lows) > 0 and len(closes) > 0:
-                                atr_simple = (highs - lows).mean()
-                                current_price = closes.iloc[-1]
+                            if not np.isnan(highs).all() and not np.isnan(lows).all() and len(closes) > 0:
+                                ranges = highs - lows
+                                ranges = ranges[~np.isnan(ranges)]
+                                atr_simple = ranges.mean() if len(ranges) else np.nan
+                                current_price = closes[-1]
                                 volatility_pct = (atr_simple / current_price * 100) if current_price > 0 else 0
                                 
                                 if volatility_pct < 2:
@@ -1685,7 +1990,7 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                 ma_alignment_value = None
                 if keep and volume_ok and ma_ok and price_above_ma_ok and position_ok and trend_strength_ok and golden_cross_ok and volatility_ok and enable_ma_alignment and daily_df is not None and not daily_df.empty:
                     try:
-                        closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                        closes = pd.Series(daily_close_np)
                         if len(closes) >= 120:
                             # 计算各周期MA
                             ma5 = closes.rolling(window=5).mean().iloc[-1]
@@ -1722,32 +2027,27 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                     # 获取最新价格（截止日期当天的收盘价，如果没有截止日期则用最后一条）
                     if daily_df is not None and not daily_df.empty:
                         try:
-                            closes = pd.to_numeric(daily_df['close'], errors='coerce').dropna()
+                            closes = daily_close_np
                             if len(closes) > 0:
-                                if end_date:
-                                    try:
-                                        end_dt = pd.to_datetime(end_date)
-                                        daily_df['date'] = pd.to_datetime(daily_df['timestamp']).dt.date
-                                        end_date_only = end_dt.date()
-                                        filtered_df = daily_df[daily_df['date'] <= end_date_only]
-                                        if not filtered_df.empty:
-                                            latest_price = float(pd.to_numeric(filtered_df.iloc[-1]['close'], errors='coerce'))
-                                    except Exception:
-                                        latest_price = float(closes.iloc[-1])
+                                if daily_cutoff is not None:
+                                    if daily_cutoff > 0:
+                                        latest_price = float(daily_close_raw[daily_cutoff - 1])
                                 else:
-                                    latest_price = float(closes.iloc[-1])
+                                    latest_price = float(closes[-1])
                         except Exception:
                             pass
                     
                     # 计算日MACD值
                     if daily_df is not None and not daily_df.empty:
-                        daily_macd_value = get_macd_dif(daily_df)
+                        daily_snap = chunk_macd.get((sym, '1d'))
+                        daily_macd_value = daily_snap.dif if daily_snap is not None else None
                         if daily_macd_value is not None:
                             daily_macd_value = round(daily_macd_value, 4)
                     
                     # 计算周MACD值
                     if weekly_df is not None and not weekly_df.empty:
-                        weekly_macd_value = get_macd_dif(weekly_df)
+                        weekly_snap = chunk_macd.get((sym, '1w'))
+                        weekly_macd_value = weekly_snap.dif if weekly_snap is not None else None
                         if weekly_macd_value is not None:
                             weekly_macd_value = round(weekly_macd_value, 4)
                     
@@ -1796,116 +2096,62 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
                         } if enable_golden_cross else None
                     }
                     selected.append(result_item)
-                    # 实时更新结果（先去重，基于code字段）
-                    with tasks_lock:
-                        current_results = screening_tasks[task_id]["results"]
-                        # 移除同code的旧结果（如果存在）
-                        current_results = [r for r in current_results if r.get("code") != sym]
-                        # 添加新结果
-                        current_results.append(result_item)
-                        screening_tasks[task_id]["results"] = current_results
-                        screening_tasks[task_id]["progress"]["matched"] = len(current_results)
+                    # 结果随下一次进度写回一起发布（写回时按code去重）
+                    pending_results.append(result_item)
+                    matched_codes.add(sym)
+                    progress.matched = len(matched_codes)
             
             except Exception as e:
                 errors.append({"symbol": sym, "error": str(e)})
-            
-            processed += 1
-            # 更新进度
-            with tasks_lock:
-                screening_tasks[task_id]["progress"]["processed"] = processed
+            finally:
+                processed += 1
+                # 更新进度
+                progress.processed = processed
+                if processed % progress_flush_every == 0 or processed == len(symbols):
+                    flush_progress()
         
         # 计算每只股票第一到第五天的涨跌幅，并计算平均值
         summary_stats = None
         if selected and end_date:
             try:
-                end_dt = pd.to_datetime(end_date).normalize()
-                day_returns = {1: [], 2: [], 3: [], 4: [], 5: []}  # 存储每只股票各天的涨跌幅
-                day1_rise_count = 0  # 第一天涨的股票数量
-                day2_rise_count = 0  # 前两天都涨的股票数量
-                
-                for item in selected:
-                    sym = item.get('code')
-                    if not sym:
-                        continue
-                    
-                    try:
-                        # 加载日线数据（不限制截止日期，需要获取截止日期之后的数据）
-                        df_full = load_stock_data(sym, '1d', end_date=None)
-                        if df_full is None or df_full.empty:
-                            continue
-                        
-                        # 找到截止日期对应的K线位置
-                        df_full['date'] = pd.to_datetime(df_full['timestamp']).dt.date
-                        end_date_only = end_dt.date()
-                        
-                        # 找到截止日期及之前的最后一条记录作为基准
-                        base_df = df_full[df_full['date'] <= end_date_only]
-                        if base_df.empty:
-                            continue
-                        
-                        base_idx = base_df.index[-1]
-                        base_price = pd.to_numeric(base_df.iloc[-1]['close'], errors='coerce')
-                        if pd.isna(base_price) or base_price <= 0:
-                            continue
-                        
-                        # 计算第一到第五天的涨跌幅（截止日期的下一日当做第一天）
-                        # 统计第一天涨的股票数量、前两天涨的股票数量
-                        day1_rise = False
-                        day1_price = None
-                        day2_rise = False
-                        
-                        for day in range(1, 6):
-                            target_idx = base_idx + day
-                            if target_idx < len(df_full):
-                                target_row = df_full.iloc[target_idx]
-                                target_date = pd.to_datetime(target_row['timestamp']).date()
-                                # 确保目标日期在截止日期之后（下一日）
-                                if target_date > end_date_only:
-                                    target_price = pd.to_numeric(target_row['close'], errors='coerce')
-                                    if pd.notna(target_price) and target_price > 0:
-                                        pct_change = ((target_price - base_price) / base_price) * 100
-                                        day_returns[day].append(pct_change)
-                                        
-                                        # 统计第一天涨的股票
-                                        if day == 1:
-                                            day1_price = target_price
-                                            if pct_change > 0:
-                                                day1_rise = True
-                                        # 统计前两天涨的股票（第一天和第二天都涨）
-                                        elif day == 2 and day1_price is not None:
-                                            if pct_change > 0 and day1_rise:
-                                                day2_rise = True
-                        
-                        # 更新统计计数
-                        if day1_rise:
-                            day1_rise_count += 1
-                        if day2_rise:
-                            day2_rise_count += 1
-                    
-                    except Exception as e:
-                        # 单只股票计算失败，跳过
-                        continue
+                # 每只股票取 [基准, 第1天, ..., 第5天] 共6个收盘价组成 (N, 6) 面板，缺失为NaN；
+                # 由加载器一次批量读取（各股票并发），不再逐只调用
+                codes = [item.get('code') for item in selected]
+                windows = data_loader.load_close_windows(codes, end_date, width=6, use_cache=enable_cache)
+                
+                # 第一到第五天相对基准的涨跌幅（截止日期的下一日当做第一天），一次广播计算
+                base_prices = windows[:, :1]
+                target_prices = windows[:, 1:]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    pct_changes = ((target_prices - base_prices) / base_prices) * 100
+                # 基准价与目标价均需有效且为正（NaN比较结果为False）
+                valid = (base_prices > 0) & (target_prices > 0)
+                
+                # 统计第一天涨的股票数量、前两天都涨的股票数量
+                day1_rise = valid[:, 0] & (pct_changes[:, 0] > 0)
+                day2_rise = day1_rise & valid[:, 1] & (pct_changes[:, 1] > 0)
+                day1_rise_count = int(day1_rise.sum())
+                day2_rise_count = int(day2_rise.sum())
                 
                 # 计算平均值
                 avg_returns = {}
                 for day in range(1, 6):
-                    if day_returns[day]:
-                        avg_returns[f'day{day}'] = round(float(np.mean(day_returns[day])), 2)
+                    day_values = pct_changes[valid[:, day - 1], day - 1]
+                    if len(day_values):
+                        avg_returns[f'day{day}'] = round(float(np.mean(day_values)), 2)
                     else:
                         avg_returns[f'day{day}'] = None
                 
                 summary_stats = {
                     "avgReturns": avg_returns,
-                    "sampleCount": len(day_returns[1]) if day_returns[1] else 0,  # 有数据的股票数量
+                    "sampleCount": int(valid[:, 0].sum()),  # 有数据的股票数量
                     "day1RiseCount": day1_rise_count,  # 第一天涨的股票数量
                     "day2RiseCount": day2_rise_count   # 前两天都涨的股票数量
                 }
                 
             except Exception as e:
                 # 计算失败，不影响主流程
-                import traceback
-                print(f"[筛选统计] 计算涨跌幅失败: {e}")
-                print(traceback.format_exc())
+                logger.warning("[筛选统计] 计算涨跌幅失败: %s", e, exc_info=True)
         
         # 最终去重（确保没有重复的股票，基于code字段）
         seen_codes = {}
@@ -1932,14 +2178,17 @@ def _run_screening_task(task_id: str, params: Dict[str, Any]):
             screening_tasks[task_id]["errors"] = errors[:100]
             if summary_stats:
                 screening_tasks[task_id]["summary"] = summary_stats
-                print(f"[筛选统计] 已设置summary: {summary_stats}")
+                logger.debug("[筛选统计] 已设置summary: %s", summary_stats)
             else:
-                print(f"[筛选统计] 未生成summary，selected数量: {len(selected)}, end_date: {end_date}")
+                logger.debug("[筛选统计] 未生成summary，selected数量: %d, end_date: %s", len(selected), end_date)
     
     except Exception as e:
         with tasks_lock:
             screening_tasks[task_id]["status"] = "error"
             screening_tasks[task_id]["errors"] = [{"error": str(e)}]
+    finally:
+        if owns_process_pool:
+            process_pool.shutdown(wait=False, cancel_futures=True)
 
 @router.post("/screener/export-csv")
 async def export_screening_results_to_csv(body: Dict[str, Any]) -> Dict[str, Any]:
@@ -1975,12 +2224,8 @@ async def export_screening_results_to_csv(body: Dict[str, Any]) -> Dict[str, Any
         ma_long = body.get('maLong')  # 长期均线周期（可能为None）
         price_threshold = body.get('priceThreshold')  # 位置百分比阈值（可能为None）
         
-        # 定位项目根目录
-        here = Path(__file__).resolve()
-        project_root = here.parents[3] if len(here.parents) >= 4 else here.parent
-        
         # 创建筛选结果目录
-        output_dir = project_root / 'data' / 'screening_results'
+        output_dir = DATA_DIR / 'screening_results'
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # 生成文件名：日期_放量倍数_短均线_长均线_位置百分比_数量只.csv
@@ -2021,89 +2266,48 @@ async def export_screening_results_to_csv(body: Dict[str, Any]) -> Dict[str, Any
         else:
             price_str = '0'  # 未启用位置筛选
         
-        filename = f"{date_str}_{volume_str}_{ma_short_str}_{ma_long_str}_{price_str}_{count}只.csv"
-        filepath = output_dir / filename
-        
+        filepath = output_dir / f"{date_str}_{volume_str}_{ma_short_str}_{ma_long_str}_{price_str}_{count}只.csv"
         # 如果文件已存在，添加时间戳
-        if filepath.exists():
-            time_str = datetime.now().strftime('%H%M%S')
-            filename = f"{date_str}_{volume_str}_{ma_short_str}_{ma_long_str}_{price_str}_{count}只_{time_str}.csv"
-            filepath = output_dir / filename
-        
-        # 准备CSV数据
-        csv_rows = []
-        for r in results:
+        time_str = datetime.now().strftime('%H%M%S')
+        fallback_path = output_dir / f"{date_str}_{volume_str}_{ma_short_str}_{ma_long_str}_{price_str}_{count}只_{time_str}.csv"
+        
+        # 按列构建导出表（每列一次列表推导，数值列整列格式化），整表一次写出
+        def field(infos: List[Optional[Dict[str, Any]]], key: str) -> List[Any]:
+            return [info.get(key) if info else None for info in infos]
+        
+        vol_infos = [r.get('volumeInfo') or None for r in results]
+        ma_infos = [r.get('maInfo') or None for r in results]
+        pos_infos = [r.get('positionInfo') or None for r in results]
+        codes = [str(r.get('code', '')) for r in results]
+        columns = {
             # 股票代码使用等号格式，确保Excel将其识别为文本格式（保留前导0）
-            code = str(r.get('code', ''))
-            code_formatted = f'="{code}"' if code else ''
-            
-            row = {
-                '股票代码': code_formatted,
-                '股票名称': r.get('name', ''),
-                '日线MACD方向': r.get('directions', {}).get('1d', 'neutral'),
-                '周线MACD方向': r.get('directions', {}).get('1w', 'neutral'),
-            }
-            
-            # 添加放量信息
-            if r.get('volumeInfo'):
-                vol_info = r['volumeInfo']
-                ratio = vol_info.get('ratio')
-                row['放量倍数'] = f"{ratio:.2f}" if ratio is not None else ''
-                last = vol_info.get('last')
-                row['最后一天成交量'] = f"{last:.2f}" if last is not None else ''
-                avg = vol_info.get('avg')
-                row['均量'] = f"{avg:.2f}" if avg is not None else ''
-            else:
-                row['放量倍数'] = ''
-                row['最后一天成交量'] = ''
-                row['均量'] = ''
-            
-            # 添加均线信息
-            if r.get('maInfo'):
-                ma_info = r['maInfo']
-                row['短期均线周期'] = ma_info.get('short', '')
-                row['长期均线周期'] = ma_info.get('long', '')
-                ma_short_val = ma_info.get('maShort')
-                row['短期均线值'] = f"{ma_short_val:.2f}" if ma_short_val is not None else ''
-                ma_long_val = ma_info.get('maLong')
-                row['长期均线值'] = f"{ma_long_val:.2f}" if ma_long_val is not None else ''
-                row['均线关系'] = '上方' if ma_info.get('relation') == 'above' else '下方'
-            else:
-                row['短期均线周期'] = ''
-                row['长期均线周期'] = ''
-                row['短期均线值'] = ''
-                row['长期均线值'] = ''
-                row['均线关系'] = ''
-            
-            # 添加位置信息
-            if r.get('positionInfo'):
-                pos_info = r['positionInfo']
-                percentile = pos_info.get('percentile')
-                row['价格位置百分位'] = f"{percentile:.2f}" if percentile is not None else ''
-                current_price = pos_info.get('currentPrice')
-                row['当前价格'] = f"{current_price:.2f}" if current_price is not None else ''
-                min_price = pos_info.get('minPrice')
-                row['最低价'] = f"{min_price:.2f}" if min_price is not None else ''
-                max_price = pos_info.get('maxPrice')
-                row['最高价'] = f"{max_price:.2f}" if max_price is not None else ''
-            else:
-                row['价格位置百分位'] = ''
-                row['当前价格'] = ''
-                row['最低价'] = ''
-                row['最高价'] = ''
-            
-            csv_rows.append(row)
+            '股票代码': [f'="{code}"' if code else '' for code in codes],
+            '股票名称': [r.get('name', '') for r in results],
+            '日线MACD方向': [r.get('directions', {}).get('1d', 'neutral') for r in results],
+            '周线MACD方向': [r.get('directions', {}).get('1w', 'neutral') for r in results],
+            # 放量信息
+            '放量倍数': _format_numbers(field(vol_infos, 'ratio')),
+            '最后一天成交量': _format_numbers(field(vol_infos, 'last')),
+            '均量': _format_numbers(field(vol_infos, 'avg')),
+            # 均线信息
+            '短期均线周期': [m.get('short', '') if m else '' for m in ma_infos],
+            '长期均线周期': [m.get('long', '') if m else '' for m in ma_infos],
+            '短期均线值': _format_numbers(field(ma_infos, 'maShort')),
+            '长期均线值': _format_numbers(field(ma_infos, 'maLong')),
+            '均线关系': [('上方' if m.get('relation') == 'above' else '下方') if m else '' for m in ma_infos],
+            # 位置信息
+            '价格位置百分位': _format_numbers(field(pos_infos, 'percentile')),
+            '当前价格': _format_numbers(field(pos_infos, 'currentPrice')),
+            '最低价': _format_numbers(field(pos_infos, 'minPrice')),
+            '最高价': _format_numbers(field(pos_infos, 'maxPrice')),
+        }
         
-        # 写入CSV
-        if csv_rows:
-            fieldnames = list(csv_rows[0].keys())
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:  # utf-8-sig 支持Excel打开
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(csv_rows)
+        # 写入CSV（文件I/O放到工作线程，避免阻塞事件循环）
+        filepath = await asyncio.to_thread(_write_export_csv, filepath, columns, fallback_path)
+        filename = filepath.name
         
         # 返回相对路径（相对于项目根）
-        relative_path = filepath.relative_to(project_root)
+        relative_path = filepath.relative_to(PROJECT_ROOT)
         
         return {
             "ok": True,
@@ -2130,7 +2334,6 @@ async def export_best_stocks_to_csv(body: Dict[str, Any]) -> Dict[str, Any]:
     返回: { ok: bool, filepath: str, filename: str }
     """
     try:
-        import csv
         from pathlib import Path
         
         results = body.get('results', [])
@@ -2142,65 +2345,49 @@ async def export_best_stocks_to_csv(body: Dict[str, Any]) -> Dict[str, Any]:
         top_n = body.get('topN', 0)
         sort_method = body.get('sortMethod', 'return')
         
-        # 定位项目根目录
-        here = Path(__file__).resolve()
-        project_root = here.parents[3] if len(here.parents) >= 4 else here.parent
-        
         # 创建最佳股票排名导出目录
-        output_dir = project_root / 'data' / 'best_stocks_results'
+        output_dir = DATA_DIR / 'best_stocks_results'
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # 生成文件名：基准日期-数量-排名方式.csv
         # 例如：2024-01-01-20-return.csv 或 2024-01-01-20-score.csv
         date_str = start_date if start_date else 'unknown'
         sort_str = 'return' if sort_method == 'return' else 'score'
-        filename = f"{date_str}-{top_n}-{sort_str}.csv"
-        filepath = output_dir / filename
-        
+        filepath = output_dir / f"{date_str}-{top_n}-{sort_str}.csv"
         # 如果文件已存在，添加时间戳
-        if filepath.exists():
-            from datetime import datetime
-            timestamp = datetime.now().strftime('%H%M%S')
-            filename = f"{date_str}-{top_n}-{sort_str}-{timestamp}.csv"
-            filepath = output_dir / filename
+        timestamp = datetime.now().strftime('%H%M%S')
+        fallback_path = output_dir / f"{date_str}-{top_n}-{sort_str}-{timestamp}.csv"
         
         count = len(results)
         
-        # 准备CSV数据
-        csv_rows = []
-        for idx, r in enumerate(results, 1):
+        # 按列构建导出表（每列一次列表推导，数值列整列格式化），整表一次写出
+        def fmt(key: str, spec: str) -> List[str]:
+            return _format_numbers([r.get(key) for r in results], spec)
+        
+        codes = [str(r.get('symbol', '')) for r in results]
+        columns = {
+            '排名': list(range(1, count + 1)),
             # 股票代码使用等号格式，确保Excel将其识别为文本格式（保留前导0）
-            code = str(r.get('symbol', ''))
-            code_formatted = f'="{code}"' if code else ''
-            
-            row = {
-                '排名': idx,
-                '股票代码': code_formatted,
-                '股票名称': r.get('name', ''),
-                '综合评分': f"{r.get('score', 0):.4f}" if r.get('score') is not None else '',
-                '区间收益(%)': f"{r.get('return', 0):.2f}" if r.get('return') is not None else '',
-                '最大回撤(%)': f"{r.get('maxDrawdown', 0):.2f}" if r.get('maxDrawdown') is not None else '',
-                '波动率(%)': f"{r.get('volatility', 0):.2f}" if r.get('volatility') is not None else '',
-                'Sharpe比率': f"{r.get('sharpeRatio', 0):.4f}" if r.get('sharpeRatio') is not None else '',
-                '趋势斜率': f"{r.get('trendSlope', 0):.6f}" if r.get('trendSlope') is not None else '',
-                '成交量健康度': f"{r.get('volumeScore', 0):.4f}" if r.get('volumeScore') is not None else '',
-                '起始价格': f"{r.get('startPrice', 0):.2f}" if r.get('startPrice') is not None else '',
-                '结束价格': f"{r.get('endPrice', 0):.2f}" if r.get('endPrice') is not None else '',
-                '交易日数': r.get('days', 0)
-            }
-            
-            csv_rows.append(row)
+            '股票代码': [f'="{code}"' if code else '' for code in codes],
+            '股票名称': [r.get('name', '') for r in results],
+            '综合评分': fmt('score', '.4f'),
+            '区间收益(%)': fmt('return', '.2f'),
+            '最大回撤(%)': fmt('maxDrawdown', '.2f'),
+            '波动率(%)': fmt('volatility', '.2f'),
+            'Sharpe比率': fmt('sharpeRatio', '.4f'),
+            '趋势斜率': fmt('trendSlope', '.6f'),
+            '成交量健康度': fmt('volumeScore', '.4f'),
+            '起始价格': fmt('startPrice', '.2f'),
+            '结束价格': fmt('endPrice', '.2f'),
+            '交易日数': [r.get('days', 0) for r in results],
+        }
         
-        # 写入CSV
-        if csv_rows:
-            fieldnames = list(csv_rows[0].keys())
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:  # utf-8-sig 支持Excel打开
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(csv_rows)
+        # 写入CSV（文件I/O放到工作线程，避免阻塞事件循环）
+        filepath = await asyncio.to_thread(_write_export_csv, filepath, columns, fallback_path)
+        filename = filepath.name
         
         # 返回相对路径（相对于项目根）
-        relative_path = filepath.relative_to(project_root)
+        relative_path = filepath.relative_to(PROJECT_ROOT)
         
         return {
             "ok": True,
@@ -2272,8 +2459,7 @@ async def analyze_price_trend(body: Dict[str, Any]) -> Dict[str, Any]:
         # 如果提供了CSV文件，从中读取股票代码
         if csv_file:
             try:
-                project_root = Path(__file__).resolve().parents[3]
-                csv_path = project_root / csv_file
+                csv_path = PROJECT_ROOT / csv_file
                 
                 if not csv_path.exists():
                     raise HTTPException(status_code=404, detail=f"CSV文件不存在: {csv_file}")
@@ -2287,160 +2473,119 @@ async def analyze_price_trend(body: Dict[str, Any]) -> Dict[str, Any]:
                         code = row.get('股票代码') or row.get('code') or row.get('Code') or ''
                         # 移除可能的等号格式
                         code = code.strip().lstrip('="').rstrip('"')
-                        if code and code not in csv_symbols:
+                        if code:
                             csv_symbols.append(code)
-                    symbols.extend(csv_symbols)
+                    symbols = list(symbols) + csv_symbols
             except Exception as e:
                 raise HTTPException(status_code=400, detail=f"读取CSV文件失败: {str(e)}")
         
         if not symbols or len(symbols) == 0:
             raise HTTPException(status_code=400, detail="未提供股票代码")
         
-        # 去重
-        symbols = list(set(symbols))
+        # 去重（dict 保持首次出现的顺序，整体 O(N)）
+        symbols = list(dict.fromkeys(symbols))
         
         results = []
         errors = []
+        # 与 results 一一对应的 (总体涨跌幅, 当天涨跌幅) 数组，缺失为 NaN，汇总时直接堆叠为矩阵
+        trend_rows = []
+        
+        # 股票名称映射：列表只扫描一次（同一代码出现多次时取第一条）
+        symbol_names: Dict[str, Any] = {}
+        try:
+            for e in data_loader.list_symbols():
+                if isinstance(e, dict) and e.get('symbol') is not None and e['symbol'] not in symbol_names:
+                    symbol_names[e['symbol']] = e.get('name', e['symbol'])
+        except Exception:
+            pass
         
         for symbol in symbols:
             try:
-                # 加载股票数据（日线）
-                df = load_stock_data(symbol, '1d')
+                # 加载日线收盘价与时间戳（与条件选股共用按源文件修改时间失效的列式缓存，只取需要的两列）
+                arrays = data_loader.load_close_arrays(symbol, '1d')
                 
-                if df is None or df.empty:
+                all_closes = arrays['close']
+                ts_ns = arrays['timestamp']
+                
+                if len(all_closes) == 0:
                     errors.append({"symbol": symbol, "error": "数据为空"})
                     continue
                 
-                # 确保数据按时间排序（最新的在前）
-                time_col = 'timestamp' if 'timestamp' in df.columns else ('datetime' if 'datetime' in df.columns else None)
-                if time_col:
-                    # 转换时间列为datetime类型
-                    df[time_col] = pd.to_datetime(df[time_col], errors='coerce')
-                    df = df.sort_values(time_col, ascending=False).reset_index(drop=True)
-                    
-                    # 根据日期范围筛选数据
-                    # 筛选结束日期及之前的数据
-                    df_filtered = df[df[time_col] <= pd.Timestamp(end_date)].copy()
-                    # 筛选开始日期及之后的数据
-                    df_filtered = df_filtered[df_filtered[time_col] >= pd.Timestamp(start_date)].copy()
-                    
-                    if df_filtered.empty:
-                        errors.append({"symbol": symbol, "error": f"在日期范围 {start_date_str} 至 {end_date_str} 内没有数据"})
-                        continue
-                    
-                    # 获取基准价格（开始日期前一天的价格）
-                    from datetime import timedelta
-                    base_date = start_date - timedelta(days=1)
-                    base_df = df[df[time_col] <= pd.Timestamp(base_date)].copy()
-                    
-                    if base_df.empty:
-                        errors.append({"symbol": symbol, "error": f"无法获取基准价格（{base_date.strftime('%Y-%m-%d')}及之前的数据）"})
-                        continue
-                    
-                    # 获取基准价格（最接近基准日期的数据）
-                    base_price = float(base_df.iloc[0]['close']) if pd.notna(base_df.iloc[0]['close']) else None
-                    
-                    if base_price is None:
-                        errors.append({"symbol": symbol, "error": "无法获取基准价格"})
-                        continue
-                    
-                    # 使用筛选后的数据，按时间正序排列（从旧到新）
-                    range_days = df_filtered.sort_values(time_col, ascending=True).reset_index(drop=True)
-                else:
-                    # 如果没有时间列，假设数据已经是倒序的，使用前N天数据
-                    # 计算需要的天数
-                    days_diff = (end_date - start_date).days + 1
-                    if len(df) < days_diff + 1:
-                        errors.append({"symbol": symbol, "error": f"数据不足，需要至少 {days_diff + 1} 天数据（{days_diff} 天走势 + 1 天基准），只有 {len(df)} 天"})
-                        continue
-                    
-                    # 获取指定天数的数据
-                    range_days = df.head(days_diff).copy()
-                    
-                    # 获取基准价格（第days_diff行的收盘价，作为基准）
-                    base_price = float(df.iloc[days_diff]['close']) if pd.notna(df.iloc[days_diff]['close']) else None
-                    
-                    if base_price is None:
-                        errors.append({"symbol": symbol, "error": "无法获取基准价格"})
-                        continue
-                    
-                    # 反转顺序（从旧到新）
-                    range_days = range_days.iloc[::-1].reset_index(drop=True)
+                # 缓存数组已按时间升序排列（从旧到新），直接在纳秒时间戳上二分查找区间 [开始日期, 结束日期]，无需排序或复制
+                range_start = int(np.searchsorted(ts_ns, pd.Timestamp(start_date).value, side='left'))
+                range_end = int(np.searchsorted(ts_ns, pd.Timestamp(end_date).value, side='right'))
+                
+                if range_end <= range_start:
+                    errors.append({"symbol": symbol, "error": f"在日期范围 {start_date_str} 至 {end_date_str} 内没有数据"})
+                    continue
+                
+                # 获取基准价格（开始日期前一天及之前最接近的一条数据）
+                from datetime import timedelta
+                base_date = start_date - timedelta(days=1)
+                base_idx = int(np.searchsorted(ts_ns, pd.Timestamp(base_date).value, side='right')) - 1
+                
+                if base_idx < 0:
+                    errors.append({"symbol": symbol, "error": f"无法获取基准价格（{base_date.strftime('%Y-%m-%d')}及之前的数据）"})
+                    continue
+                
+                base_close = all_closes[base_idx]
+                base_price = float(base_close) if not np.isnan(base_close) else None
+                
+                if base_price is None:
+                    errors.append({"symbol": symbol, "error": "无法获取基准价格"})
+                    continue
                 
                 # 构建每日数据（从旧到新：第1天是最旧的，第N天是最新的）
-                # range_days是按时间正序的：iloc[0]是最旧（第1天），iloc[-1]是最新（第N天）
+                # 区间切片按时间正序：下标0是最旧（第1天），最后一个是最新（第N天）
+                # 差值/涨跌幅对整段收盘价一次性计算（NaN 表示缺失），逐日只做取整与组装
+                closes = all_closes[range_start:range_end]
+                # 总体涨跌：相对基准价格；百分比基于取整后的差值
+                change = np.array([round(x, 2) for x in (closes - base_price).tolist()])
+                # 当天涨跌：相对前一天（第1天与基准价格对比）
+                prev_closes = np.concatenate(([base_price], closes[:-1]))
+                daily_change = np.array([round(x, 2) for x in (closes - prev_closes).tolist()])
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    # 价格 <= 0 时百分比按 0 处理（下面组装时判断），这里的除零结果不会被使用
+                    change_pct = change / base_price * 100
+                    daily_change_pct = daily_change / prev_closes * 100
+                
+                # 缓存时间戳为 datetime64[ns]，截断到日即得到 YYYY-MM-DD 字符串，无需逐个 strftime
+                dates = ts_ns[range_start:range_end].view('datetime64[ns]').astype('datetime64[D]').astype(str).tolist()
+                
                 days_data = []
-                for idx in range(len(range_days)):
-                    # idx=0是最旧的（第1天），idx=-1是最新的（第N天）
-                    row = range_days.iloc[idx]
-                    # day_num：idx=0对应第1天（最旧），idx=-1对应第N天（最新）
-                    day_num = idx + 1  # 第1天到第N天（第1天最旧，第N天最新）
-                    close_price = float(row['close']) if pd.notna(row['close']) else None
-                    
-                    if close_price is None:
+                for idx, close_price in enumerate(closes.tolist()):
+                    if np.isnan(close_price):
                         continue
-                    
-                    # 计算与基准价格的差值（总体涨跌）
-                    change = round(close_price - base_price, 2)
-                    change_percent = round((change / base_price * 100), 2) if base_price > 0 else 0
-                    
-                    # 计算当天涨跌（相对于前一天）
-                    daily_change = None
-                    daily_change_percent = None
-                    if idx > 0:
-                        # 有前一天数据（idx-1对应更早的日期，即前一天）
-                        prev_close = float(range_days.iloc[idx - 1]['close']) if pd.notna(range_days.iloc[idx - 1]['close']) else None
-                        if prev_close is not None:
-                            daily_change = round(close_price - prev_close, 2)
-                            daily_change_percent = round((daily_change / prev_close * 100), 2) if prev_close > 0 else 0
+                    prev_close = prev_closes[idx]
+                    if np.isnan(prev_close):
+                        daily_change_value = None
+                        daily_change_percent = None
                     else:
-                        # 第1天（最旧，idx=0），与基准价格（第0天）对比
-                        daily_change = round(close_price - base_price, 2)
-                        daily_change_percent = round((daily_change / base_price * 100), 2) if base_price > 0 else 0
-                    
-                    # 获取日期
-                    date_str = ''
-                    if time_col and time_col in row:
-                        ts = row[time_col]
-                        if isinstance(ts, pd.Timestamp):
-                            date_str = ts.strftime('%Y-%m-%d')
-                        else:
-                            date_str = str(ts).split()[0] if ' ' in str(ts) else str(ts)
-                    elif 'timestamp' in row:
-                        ts = row['timestamp']
-                        if isinstance(ts, pd.Timestamp):
-                            date_str = ts.strftime('%Y-%m-%d')
-                        else:
-                            date_str = str(ts).split()[0] if ' ' in str(ts) else str(ts)
-                    elif 'datetime' in row:
-                        dt_val = row['datetime']
-                        if isinstance(dt_val, pd.Timestamp):
-                            date_str = dt_val.strftime('%Y-%m-%d')
-                        else:
-                            date_str = str(dt_val).split()[0] if ' ' in str(dt_val) else str(dt_val)
-                    
+                        daily_change_value = float(daily_change[idx])
+                        daily_change_percent = round(float(daily_change_pct[idx]), 2) if prev_close > 0 else 0
                     days_data.append({
-                        "day": day_num,
-                        "date": date_str,
+                        "day": idx + 1,  # 第1天到第N天（第1天最旧，第N天最新）
+                        "date": dates[idx],
                         "close": round(close_price, 2),
-                        "change": change,
-                        "changePercent": change_percent,
-                        "dailyChange": daily_change,
+                        "change": float(change[idx]),
+                        "changePercent": round(float(change_pct[idx]), 2) if base_price > 0 else 0,
+                        "dailyChange": daily_change_value,
                         "dailyChangePercent": daily_change_percent
                     })
                 
                 # days_data已经是按时间正序的（第1天最旧，第N天最新），不需要反转
                 
+                # 汇总用的整行涨跌幅（取值与 days_data 中的 changePercent / dailyChangePercent 相同）
+                if base_price > 0:
+                    cp_row = np.array([round(x, 2) for x in change_pct.tolist()])
+                else:
+                    cp_row = np.zeros(len(closes))
+                cp_row[np.isnan(closes)] = np.nan
+                dcp_row = np.where(prev_closes > 0, [round(x, 2) for x in daily_change_pct.tolist()], 0.0)
+                dcp_row[np.isnan(closes) | np.isnan(prev_closes)] = np.nan
+                
                 # 获取股票名称
-                stock_name = symbol
-                try:
-                    entries = data_loader.list_symbols()
-                    for e in entries:
-                        if isinstance(e, dict) and e.get('symbol') == symbol:
-                            stock_name = e.get('name', symbol)
-                            break
-                except Exception:
-                    pass
+                stock_name = symbol_names.get(symbol, symbol)
                 
                 results.append({
                     "symbol": symbol,
@@ -2448,6 +2593,7 @@ async def analyze_price_trend(body: Dict[str, Any]) -> Dict[str, Any]:
                     "days": days_data,
                     "basePrice": round(base_price, 2)
                 })
+                trend_rows.append((cp_row, dcp_row))
                 
             except FileNotFoundError:
                 errors.append({"symbol": symbol, "error": "数据文件不存在"})
@@ -2458,119 +2604,72 @@ async def analyze_price_trend(body: Dict[str, Any]) -> Dict[str, Any]:
         summary = None
         if len(results) > 0:
             # 动态收集所有股票每天的涨跌幅（根据实际天数）
-            max_days = 0
-            for result in results:
-                days = result.get('days', [])
-                if len(days) > max_days:
-                    max_days = len(days)
+            max_days = max(len(result.get('days', [])) for result in results)
             
-            # 初始化天数字典
-            day_returns = {i: [] for i in range(1, max_days + 1)}
-            day_rise_counts = {i: 0 for i in range(1, max_days + 1)}  # 每天上涨的股票数量
-            day_fall_counts = {i: 0 for i in range(1, max_days + 1)}  # 每天下跌的股票数量
-            consecutive_rise_counts = {i: 0 for i in range(1, max_days + 1)}  # 连续上涨N天的股票数量
-            best_hold_days = []  # 每只股票的最佳持仓天数（收益最高的天数）
-            hold_day_returns = {i: [] for i in range(1, max_days + 1)}  # 持仓N天的收益列表
+            # 打包为 (股票数, 天数) 矩阵：cp 为相对基准的总体涨跌，dcp 为相对前一天的当天涨跌，缺失为NaN；
+            # 直接按行写入采集阶段得到的数组（超出 max_days 的天数截断），不再逐日遍历 days 字典
+            cp = np.full((len(results), max_days), np.nan)
+            dcp = np.full((len(results), max_days), np.nan)
+            for i, (cp_row, dcp_row) in enumerate(trend_rows):
+                width = min(len(cp_row), max_days)
+                cp[i, :width] = cp_row[:width]
+                dcp[i, :width] = dcp_row[:width]
             
-            for result in results:
-                days = result.get('days', [])
-                if len(days) == 0:
-                    continue
-                
-                day1_rise = False
-                day2_rise = False
-                max_return_day = 1  # 收益最高的天数
-                max_return = days[0].get('changePercent', 0) if days else 0
-                max_consecutive_rise = 0  # 最大连续上涨天数（基于当天涨跌）
-                current_consecutive_rise = 0  # 当前连续上涨天数（基于当天涨跌）
-                
-                for day_data in days:
-                    day_num = day_data.get('day')
-                    change_percent = day_data.get('changePercent', 0)  # 总体涨跌（相对于基准）
-                    daily_change_percent = day_data.get('dailyChangePercent', 0)  # 当天涨跌（相对于前一天）
-                    
-                    if day_num in day_returns:
-                        day_returns[day_num].append(change_percent)
-                    
-                    # 统计每天上涨/下跌的股票数量（基于总体涨跌）
-                    if change_percent > 0:
-                        if day_num in day_rise_counts:
-                            day_rise_counts[day_num] += 1
-                    elif change_percent < 0:
-                        if day_num in day_fall_counts:
-                            day_fall_counts[day_num] += 1
-                    
-                    # 统计连续上涨（基于当天涨跌，相对于前一天）
-                    if daily_change_percent is not None:
-                        if daily_change_percent > 0:
-                            current_consecutive_rise += 1
-                            if current_consecutive_rise > max_consecutive_rise:
-                                max_consecutive_rise = current_consecutive_rise
-                        elif daily_change_percent < 0:
-                            current_consecutive_rise = 0
-                        else:
-                            current_consecutive_rise = 0
-                    
-                    # 记录最佳持仓天数（收益最高的天数）
-                    if change_percent > max_return:
-                        max_return = change_percent
-                        max_return_day = day_num
-                    
-                    # 统计第一天涨的股票
-                    if day_num == 1:
-                        if change_percent > 0:
-                            day1_rise = True
-                    
-                    # 统计前两天都涨的股票（第1天和第2天都涨）
-                    if day_num == 2:
-                        if change_percent > 0 and day1_rise:
-                            day2_rise = True
-                    
-                    # 记录持仓不同天数的收益
-                    if day_num in hold_day_returns:
-                        hold_day_returns[day_num].append(change_percent)
-                
-                # 记录最佳持仓天数
-                best_hold_days.append(max_return_day)
-                
-                # 统计连续上涨N天的股票（只记录最大连续上涨天数）
-                if max_consecutive_rise > 0 and max_consecutive_rise <= max_days:
-                    if max_consecutive_rise in consecutive_rise_counts:
-                        consecutive_rise_counts[max_consecutive_rise] += 1
+            # 逐日统计按列归约（沿 axis=0 按股票顺序累加，与逐只股票求和结果一致）
+            valid = ~np.isnan(cp)
+            rise_arr = (cp > 0).sum(axis=0)
+            fall_arr = (cp < 0).sum(axis=0)
+            count_arr = valid.sum(axis=0)
+            sum_arr = np.nansum(cp, axis=0)
+            # 每只股票的最佳持仓天数与最大连续上涨天数依赖逐日顺序，由内核逐行递推
+            best_days_arr, consec_arr = trend_streaks(cp, dcp)
+            
+            day_rise_counts = {i: int(rise_arr[i - 1]) for i in range(1, max_days + 1)}  # 每天上涨的股票数量
+            day_fall_counts = {i: int(fall_arr[i - 1]) for i in range(1, max_days + 1)}  # 每天下跌的股票数量
+            # 连续上涨N天的股票数量（只记录最大连续上涨天数）：bincount 一次计数，不再逐天扫描全部股票
+            consec_counts = np.bincount(consec_arr, minlength=max_days + 1)
+            consecutive_rise_counts = {i: int(consec_counts[i]) for i in range(1, max_days + 1)}
             
             # 计算每天上涨的股票数量（使用day_rise_counts）
             day1_rise_count = day_rise_counts.get(1, 0)
             day2_rise_count = consecutive_rise_counts.get(2, 0)  # 连续2天上涨的数量
             
-            # 计算各种统计指标（动态天数）
+            # 计算各种统计指标（动态天数）：均值、极值、中位数、标准差均对整个矩阵按列一次归约，逐日只取值
+            with np.errstate(invalid='ignore', divide='ignore'):
+                avg_arr = sum_arr / count_arr
+                max_arr = np.where(valid, cp, -np.inf).max(axis=0)
+                min_arr = np.where(valid, cp, np.inf).min(axis=0)
+                # 方差：缺失位置偏差记为0，沿 axis=0 按股票顺序累加
+                variance_arr = (np.where(valid, cp - avg_arr, 0.0) ** 2).sum(axis=0) / count_arr
+            # 中位数（偶数个时取中间两个的平均）只对有数据的列计算，避免全NaN列的告警
+            median_arr = np.zeros(max_days)
+            has_data = count_arr > 0
+            if has_data.any():
+                median_arr[has_data] = np.nanmedian(cp[:, has_data], axis=0)
+            
             day_stats = {}
-            for day_num in sorted(day_returns.keys()):
-                returns = day_returns[day_num]
-                if len(returns) > 0:
+            for day_num in range(1, max_days + 1):
+                col = day_num - 1
+                count = int(count_arr[col])
+                if count > 0:
                     # 平均值
-                    avg_return = sum(returns) / len(returns)
+                    avg_return = float(avg_arr[col])
                     
                     # 上涨和下跌数量
-                    rise_count = sum(1 for r in returns if r > 0)
-                    fall_count = sum(1 for r in returns if r < 0)
-                    flat_count = len(returns) - rise_count - fall_count
+                    rise_count = int(rise_arr[col])
+                    fall_count = int(fall_arr[col])
+                    flat_count = count - rise_count - fall_count
                     
                     # 上涨比例
-                    rise_ratio = (rise_count / len(returns) * 100) if len(returns) > 0 else 0
+                    rise_ratio = rise_count / count * 100
                     
-                    # 最大涨幅和最大跌幅
-                    max_return = max(returns) if returns else 0
-                    min_return = min(returns) if returns else 0
-                    
-                    # 中位数
-                    sorted_returns = sorted(returns)
-                    median_return = sorted_returns[len(sorted_returns) // 2] if sorted_returns else 0
-                    if len(sorted_returns) % 2 == 0 and len(sorted_returns) > 0:
-                        median_return = (sorted_returns[len(sorted_returns) // 2 - 1] + sorted_returns[len(sorted_returns) // 2]) / 2
+                    # 最大涨幅和最大跌幅、中位数
+                    max_return = float(max_arr[col])
+                    min_return = float(min_arr[col])
+                    median_return = float(median_arr[col])
                     
                     # 标准差（波动性）
-                    variance = sum((r - avg_return) ** 2 for r in returns) / len(returns) if len(returns) > 0 else 0
-                    std_dev = variance ** 0.5
+                    std_dev = float(variance_arr[col]) ** 0.5
                     
                     day_stats[f"day{day_num}"] = {
                         "avg": round(avg_return, 2),
@@ -2596,21 +2695,16 @@ async def analyze_price_trend(body: Dict[str, Any]) -> Dict[str, Any]:
                         "stdDev": 0.0
                     }
             
-            # 计算最佳持仓天数统计
-            best_hold_day_stats = {}
-            if best_hold_days:
-                for day in range(1, max_days + 1):
-                    count = best_hold_days.count(day)
-                    if count > 0:
-                        best_hold_day_stats[day] = count
+            # 计算最佳持仓天数统计（收益最高的天数）：bincount 一次计数（0 表示无数据，不计入）
+            best_day_counts = np.bincount(best_days_arr, minlength=max_days + 1)
+            best_hold_day_stats = {day: int(best_day_counts[day]) for day in range(1, max_days + 1) if best_day_counts[day] > 0}
             
             # 计算持仓不同天数的平均收益
             hold_day_avg_returns = {}
             for day_num in range(1, max_days + 1):
-                returns = hold_day_returns.get(day_num, [])
-                if returns:
-                    avg_return = sum(returns) / len(returns)
-                    hold_day_avg_returns[day_num] = round(avg_return, 2)
+                count = int(count_arr[day_num - 1])
+                if count > 0:
+                    hold_day_avg_returns[day_num] = round(float(sum_arr[day_num - 1]) / count, 2)
             
             summary = {
                 "dayStats": day_stats,
@@ -2639,8 +2733,42 @@ async def analyze_price_trend(body: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析价格走势失败: {str(e)}")
 
+def _date_range_bounds(ts_ns: np.ndarray, start_dt: pd.Timestamp, end_dt: pd.Timestamp) -> Tuple[int, int]:
+    """
+    在升序纳秒时间戳上二分查找 [开始日期, 结束日期] 区间，返回切片位置 (lo, hi)
+    
+    Args:
+        ts_ns: int64 纳秒时间戳数组（升序，来自收盘价缓存）
+        start_dt: 开始日期
+        end_dt: 结束日期
+        
+    Returns:
+        (lo, hi)：区间为 [lo, hi)，无数据时 hi <= lo
+    """
+    lo = int(np.searchsorted(ts_ns, start_dt.value, side='left'))
+    hi = int(np.searchsorted(ts_ns, end_dt.value, side='right'))
+    return lo, hi
+
+def _trend_slope(closes: np.ndarray) -> float:
+    """
+    收盘价对交易日序号 0..n-1 的最小二乘斜率（闭式解，无需构造设计矩阵）
+    
+    x 为等差序列，均值与离差平方和为常数：x̄ = (n-1)/2，Σ(x-x̄)² = n(n²-1)/12，
+    斜率 = Σ(x-x̄)·y / Σ(x-x̄)²（中心化形式，避免大数相减的精度损失）
+    
+    Args:
+        closes: 收盘价数组（长度 >= 2）
+        
+    Returns:
+        float: 斜率（每个交易日的价格变化）
+    """
+    n = len(closes)
+    x_mean = (n - 1) / 2
+    sxx = n * (n * n - 1) / 12
+    return float(np.dot(np.arange(n) - x_mean, closes)) / sxx
+
 @router.post("/best-stocks/score-async")
-async def calculate_best_stocks_async(body: Dict[str, Any], background_tasks: BackgroundTasks) -> Dict[str, Any]:
+async def calculate_best_stocks_async(body: Dict[str, Any]) -> Dict[str, Any]:
     """
     异步计算一段时间内表现最好的N只股票（带进度）
     
@@ -2678,20 +2806,19 @@ async def calculate_best_stocks_async(body: Dict[str, Any], background_tasks: Ba
         task_id = str(uuid.uuid4())
         
         # 初始化任务状态
-        with tasks_lock:
-            screening_tasks[task_id] = {
-                "status": "running",
-                "progress": {
-                    "processed": 0,
-                    "total": 0,
-                    "current": ""
-                },
-                "results": [],
-                "errors": []
-            }
-        
-        # 启动后台任务
-        background_tasks.add_task(
+        _register_task(task_id, {
+            "status": "running",
+            "progress": {
+                "processed": 0,
+                "total": 0,
+                "current": ""
+            },
+            "results": [],
+            "errors": []
+        })
+        
+        # 启动后台任务（独立任务线程，评分在共享进程池中并行）
+        _task_executor.submit(
             _run_best_stocks_task,
             task_id,
             startDate,
@@ -2708,19 +2835,73 @@ async def calculate_best_stocks_async(body: Dict[str, Any], background_tasks: Ba
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"启动任务失败: {str(e)}")
 
+def _best_stocks_task_view(task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    在锁内复制任务状态：评分线程会原地更新 progress 等字段，内部字段（如 _created_ts）不返回给前端
+    
+    Returns:
+        Optional[Dict]: 任务状态副本，任务不存在时为 None
+    """
+    with tasks_lock:
+        task = screening_tasks.get(task_id)
+        if not task:
+            return None
+        return {
+            key: (dict(value) if isinstance(value, dict) else value)
+            for key, value in task.items() if not key.startswith("_")
+        }
+
 @router.get("/best-stocks/status/{task_id}")
 async def get_best_stocks_status(task_id: str) -> Dict[str, Any]:
     """
     获取最佳股票计算任务状态与进度
     返回: { ok: true, task: {status, progress, results, errors} }
     """
-    with tasks_lock:
-        task = screening_tasks.get(task_id)
-    
-    if not task:
+    task_copy = _best_stocks_task_view(task_id)
+    if not task_copy:
         raise HTTPException(status_code=404, detail="任务不存在或已过期")
     
-    return {"ok": True, "task": task}
+    return {"ok": True, "task": task_copy}
+
+async def _best_stocks_progress_events(task_id: str, interval: float = 0.5) -> AsyncIterator[str]:
+    """
+    异步生成器：按间隔读取任务状态快照（只在复制时短暂持锁），内容有变化时输出一条 SSE 事件，
+    任务结束（完成/失败）后输出最终状态并结束；任务被清理时输出 error 事件
+    
+    Args:
+        task_id: 任务ID
+        interval: 读取快照的间隔（秒）
+        
+    Yields:
+        str: "data: {task JSON}\n\n" 格式的事件，task 与 status 接口返回的相同
+    """
+    last_payload = None
+    while True:
+        task = _best_stocks_task_view(task_id)
+        if task is None:
+            yield f"event: error\ndata: {json.dumps({'detail': '任务不存在或已过期'}, ensure_ascii=False)}\n\n"
+            return
+        payload = json.dumps(task, ensure_ascii=False, default=str)
+        if payload != last_payload:
+            last_payload = payload
+            yield f"data: {payload}\n\n"
+        if task.get("status") != "running":
+            return
+        await asyncio.sleep(interval)
+
+@router.get("/best-stocks/stream/{task_id}")
+async def stream_best_stocks_progress(task_id: str) -> StreamingResponse:
+    """
+    以 Server-Sent Events 推送最佳股票计算任务的进度（可替代轮询 /best-stocks/status）
+    每条事件的 data 为任务状态 JSON（同 status 接口的 task），任务结束后连接关闭
+    """
+    if _best_stocks_task_view(task_id) is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return StreamingResponse(
+        _best_stocks_progress_events(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 @router.post("/best-stocks/score")
 async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
@@ -2752,39 +2933,15 @@ async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
         
         if topN < 1:
             raise HTTPException(status_code=400, detail="返回前N只必须大于0")
-        # 尝试导入scipy，如果没有则使用numpy实现线性回归
-        try:
-            from scipy import stats
-            has_scipy = True
-        except ImportError:
-            has_scipy = False
-        
         # 获取股票列表
-        project_root = Path(__file__).resolve().parents[3]
-        with_industry = project_root / 'data' / 'stockList' / 'all_stock_with_industry.json'
-        pure = project_root / 'data' / 'stockList' / 'all_pure_stock.json'
+        with_industry = STOCKLIST_DIR / 'all_stock_with_industry.json'
+        pure = STOCKLIST_DIR / 'all_pure_stock.json'
         
-        stock_list: list = []
-        if with_industry.exists():
-            with open(with_industry, 'r', encoding='utf-8') as f:
-                stock_list = json.load(f)
-        elif pure.exists():
-            with open(pure, 'r', encoding='utf-8') as f:
-                stock_list = json.load(f)
-        else:
+        if not with_industry.exists() and not pure.exists():
             raise HTTPException(status_code=404, detail="股票列表文件不存在")
         
-        # 构建名称映射
-        name_map: Dict[str, str] = {}
-        for it in (stock_list or []):
-            try:
-                code_raw = str(it.get('code') or '')
-                code = code_raw.split('.')[-1] if '.' in code_raw else code_raw
-                nm = str(it.get('code_name') or it.get('name') or '')
-                if code and nm:
-                    name_map[code] = nm
-            except Exception:
-                continue
+        # 名称映射（按股票列表JSON的修改时间缓存，只读）
+        name_map = get_name_map()
         
         # 获取所有可用的股票代码（从CSV文件）
         entries = data_loader.list_symbols()
@@ -2816,25 +2973,25 @@ async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
         
         results = []
         errors = []
+        # 已计算结果中收益率最高的topN个（最小堆，堆顶为第N名的收益率）：排序优先按收益率，
+        # 收益率严格低于第N名的股票不可能进入前N只，只计入总数，不再计算其余指标
+        top_returns: List[float] = []
+        skipped = 0
         
         # 计算所有股票的评分
         for symbol in available_symbols:
             try:
-                # 加载股票数据
-                df = load_stock_data(symbol, timeframe='1d')
-                if df is None or df.empty:
-                    continue
+                # 加载日线收盘价/成交量/时间戳（磁盘缓存，按源文件修改时间失效，跨请求复用无需重新解析CSV）
+                arrays = data_loader.load_close_arrays(symbol, '1d')
                 
-                # 过滤日期范围
-                df = df[(df['timestamp'] >= start_dt) & (df['timestamp'] <= end_dt)]
-                if df.empty or len(df) < 2:
+                # 过滤日期范围（缓存数组按时间升序，二分查找后切片）
+                lo, hi = _date_range_bounds(arrays['timestamp'], start_dt, end_dt)
+                if hi - lo < 2:
                     continue
                 
-                df = df.sort_values('timestamp').reset_index(drop=True)
-                
                 # 获取价格和成交量数据
-                closes = df['close'].values
-                volumes = df['volume'].values
+                closes = arrays['close'][lo:hi]
+                volumes = arrays['volume'][lo:hi]
                 
                 if len(closes) < 2:
                     continue
@@ -2843,38 +3000,34 @@ async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
                 start_price = closes[0]
                 end_price = closes[-1]
                 return_pct = (end_price - start_price) / start_price if start_price > 0 else 0
+                return_rank = round(return_pct * 100, 2)
+                if len(top_returns) >= topN and return_rank < top_returns[0]:
+                    skipped += 1
+                    continue
                 
                 # 2. 计算最大回撤 MaxDrawdown（权重 0.20，回撤越小越好）
-                peak = start_price
-                max_drawdown = 0
-                for price in closes:
-                    if price > peak:
-                        peak = price
-                    drawdown = (peak - price) / peak if peak > 0 else 0
-                    max_drawdown = max(max_drawdown, drawdown)
+                # 以累计最高价为峰值（首个峰值即起始价），峰值 <= 0 时回撤记为0
+                peaks = np.maximum.accumulate(closes)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    drawdowns = np.where(peaks > 0, (peaks - closes) / peaks, 0.0)
+                max_drawdown = float(drawdowns.max())
                 
                 # 3. 计算波动率 Volatility（权重 0.15，越小越好）
                 daily_returns = np.diff(closes) / closes[:-1]
-                volatility = np.std(daily_returns) * np.sqrt(252) if len(daily_returns) > 0 else 0
+                # 日收益率的标准差只算一次，波动率与Sharpe比率共用
+                mean_return = np.mean(daily_returns)
+                std_return = np.std(daily_returns)
+                volatility = std_return * _SQRT252
                 
                 # 4. 计算Sharpe比率（权重 0.20）
-                if len(daily_returns) > 0 and np.std(daily_returns) > 0:
-                    mean_return = np.mean(daily_returns)
-                    sharpe_ratio = (mean_return / np.std(daily_returns)) * np.sqrt(252) if np.std(daily_returns) > 0 else 0
+                if std_return > 0:
+                    sharpe_ratio = (mean_return / std_return) * _SQRT252
                 else:
                     sharpe_ratio = 0
                 
                 # 5. 计算趋势斜率 TrendSlope，使用线性回归（权重 0.10）
-                x = np.arange(len(closes))
                 if len(closes) > 1:
-                    # 使用scipy的linregress或numpy实现
-                    if has_scipy:
-                        slope, intercept, r_value, p_value, std_err = stats.linregress(x, closes)
-                    else:
-                        # 使用numpy实现最小二乘法线性回归
-                        A = np.vstack([x, np.ones(len(x))]).T
-                        slope, intercept = np.linalg.lstsq(A, closes, rcond=None)[0]
-                    trend_slope = slope / start_price if start_price > 0 else 0  # 归一化斜率
+                    trend_slope = _trend_slope(closes) / start_price if start_price > 0 else 0  # 归一化斜率
                 else:
                     trend_slope = 0
                 
@@ -2882,24 +3035,24 @@ async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
                 # 成交量健康度：上涨时放量，下跌时缩量
                 volume_score = 0
                 if len(volumes) > 1 and len(daily_returns) > 0:
-                    volume_changes = np.diff(volumes) / volumes[:-1]
-                    # 计算价格变化与成交量变化的相关性
                     # 正相关（上涨放量、下跌缩量）得分高
-                    if len(volume_changes) > 0:
-                        # 简化计算：上涨日平均成交量 / 下跌日平均成交量
-                        up_days = daily_returns > 0
-                        down_days = daily_returns < 0
-                        if np.sum(up_days) > 0 and np.sum(down_days) > 0:
-                            avg_vol_up = np.mean(volumes[1:][up_days])
-                            avg_vol_down = np.mean(volumes[1:][down_days])
-                            if avg_vol_down > 0:
-                                volume_ratio = avg_vol_up / avg_vol_down
-                                # 归一化到0-1范围（假设合理范围是0.5-2.0）
-                                volume_score = min(max((volume_ratio - 0.5) / 1.5, 0), 1)
-                        elif np.sum(up_days) > 0:
-                            volume_score = 0.5  # 只有上涨日，给中等分数
-                        else:
-                            volume_score = 0.2  # 只有下跌日，给低分
+                    # 简化计算：上涨日平均成交量 / 下跌日平均成交量（掩码加权求和，不生成按掩码取出的临时数组）
+                    day_volumes = volumes[1:]
+                    up_days = daily_returns > 0
+                    down_days = daily_returns < 0
+                    n_up = int(up_days.sum())
+                    n_down = int(down_days.sum())
+                    if n_up > 0 and n_down > 0:
+                        avg_vol_up = np.dot(day_volumes, up_days) / n_up
+                        avg_vol_down = np.dot(day_volumes, down_days) / n_down
+                        if avg_vol_down > 0:
+                            volume_ratio = avg_vol_up / avg_vol_down
+                            # 归一化到0-1范围（假设合理范围是0.5-2.0）
+                            volume_score = min(max((volume_ratio - 0.5) / 1.5, 0), 1)
+                    elif n_up > 0:
+                        volume_score = 0.5  # 只有上涨日，给中等分数
+                    else:
+                        volume_score = 0.2  # 只有下跌日，给低分
                 
                 # 归一化各项指标到0-1范围（用于评分）
                 # 收益：直接使用（已经是百分比）
@@ -2949,8 +3102,11 @@ async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
                     "volumeScore": round(volume_score, 4),
                     "startPrice": round(start_price, 2),
                     "endPrice": round(end_price, 2),
-                    "days": len(df)
+                    "days": len(closes)
                 })
+                heapq.heappush(top_returns, return_rank)
+                if len(top_returns) > topN:
+                    heapq.heappop(top_returns)
                 
             except Exception as e:
                 errors.append({
@@ -2968,7 +3124,7 @@ async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
         return {
             "ok": True,
             "results": top_results,
-            "total": len(results),
+            "total": len(results) + skipped,
             "sampleSize": sample_size if sample_size > 0 else len(available_symbols),
             "errors": errors[:10] if errors else [],  # 只返回前10个错误
             "params": {
@@ -2986,6 +3142,145 @@ async def calculate_best_stocks(body: Dict[str, Any]) -> Dict[str, Any]:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"计算最佳股票失败: {str(e)}")
 
+def _score_stock_worker(data_dir: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, symbol: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    进程池任务：加载一只股票的日线，计算区间内的各项指标与综合评分
+    
+    各股票相互独立，由最佳股票后台任务分发到进程池中并行计算（CPU密集，避开GIL）
+    
+    Args:
+        data_dir: 数据目录（与主进程的加载器一致）
+        start_dt: 开始日期
+        end_dt: 结束日期
+        symbol: 股票代码
+        
+    Returns:
+        (指标字典, 错误信息)：无数据时均为 None；计算失败时指标为 None 并返回错误信息
+    """
+    try:
+        # 加载日线收盘价/成交量/时间戳（磁盘缓存，按源文件修改时间失效，跨请求、跨子进程复用无需重新解析CSV）
+        arrays = load_close_arrays_worker(data_dir, symbol, '1d')
+        
+        # 过滤日期范围（缓存数组按时间升序，二分查找后切片）；至少需要1天数据（开始和结束价格）
+        lo, hi = _date_range_bounds(arrays['timestamp'], start_dt, end_dt)
+        if hi <= lo:
+            return None, None
+        
+        # 获取价格和成交量数据
+        closes = arrays['close'][lo:hi]
+        volumes = arrays['volume'][lo:hi]
+        
+        # 1. 计算区间收益 Return（权重 0.30）
+        start_price = closes[0]
+        end_price = closes[-1]
+        return_pct = (end_price - start_price) / start_price if start_price > 0 else 0
+        
+        # 如果只有1天数据，使用默认值
+        if len(closes) < 2:
+            # 单日数据，无法计算其他指标，使用默认值
+            max_drawdown = 0
+            volatility = 0
+            sharpe_ratio = 0
+            trend_slope = 0
+            volume_score = 0.5
+        else:
+            # 2. 计算最大回撤 MaxDrawdown（权重 0.20，回撤越小越好）
+            # 以累计最高价为峰值（首个峰值即起始价），峰值 <= 0 时回撤记为0
+            peaks = np.maximum.accumulate(closes)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                drawdowns = np.where(peaks > 0, (peaks - closes) / peaks, 0.0)
+            max_drawdown = float(drawdowns.max())
+            
+            # 3. 计算波动率 Volatility（权重 0.15，越小越好）
+            daily_returns = np.diff(closes) / closes[:-1]
+            # 日收益率的标准差只算一次，波动率与Sharpe比率共用
+            mean_return = np.mean(daily_returns)
+            std_return = np.std(daily_returns)
+            volatility = std_return * _SQRT252
+            
+            # 4. 计算Sharpe比率（权重 0.20）
+            if std_return > 0:
+                sharpe_ratio = (mean_return / std_return) * _SQRT252
+            else:
+                sharpe_ratio = 0
+            
+            # 5. 计算趋势斜率 TrendSlope，使用线性回归（权重 0.10）
+            if len(closes) > 1:
+                trend_slope = _trend_slope(closes) / start_price if start_price > 0 else 0  # 归一化斜率
+            else:
+                trend_slope = 0
+            
+            # 6. 计算成交量健康度 VolumeScore（权重 0.05）
+            # 成交量健康度：上涨时放量，下跌时缩量
+            volume_score = 0
+            if len(volumes) > 1 and len(daily_returns) > 0:
+                # 正相关（上涨放量、下跌缩量）得分高
+                # 简化计算：上涨日平均成交量 / 下跌日平均成交量（掩码加权求和，不生成按掩码取出的临时数组）
+                day_volumes = volumes[1:]
+                up_days = daily_returns > 0
+                down_days = daily_returns < 0
+                n_up = int(up_days.sum())
+                n_down = int(down_days.sum())
+                if n_up > 0 and n_down > 0:
+                    avg_vol_up = np.dot(day_volumes, up_days) / n_up
+                    avg_vol_down = np.dot(day_volumes, down_days) / n_down
+                    if avg_vol_down > 0:
+                        volume_ratio = avg_vol_up / avg_vol_down
+                        # 归一化到0-1范围（假设合理范围是0.5-2.0）
+                        volume_score = min(max((volume_ratio - 0.5) / 1.5, 0), 1)
+                elif n_up > 0:
+                    volume_score = 0.5  # 只有上涨日，给中等分数
+                else:
+                    volume_score = 0.2  # 只有下跌日，给低分
+        
+        # 归一化各项指标到0-1范围（用于评分）
+        # 收益：直接使用（已经是百分比）
+        normalized_return = min(max(return_pct, -1), 1)  # 限制在-100%到100%
+        normalized_return = (normalized_return + 1) / 2  # 转换到0-1范围
+        
+        # 最大回撤：越小越好，所以用1减去
+        normalized_drawdown = 1 - min(max_drawdown, 1)
+        
+        # 波动率：越小越好，需要反向归一化
+        # 假设波动率范围是0-1（年化），超过1的视为1
+        normalized_volatility = 1 - min(volatility, 1)
+        
+        # Sharpe比率：越大越好，需要归一化
+        # 假设Sharpe比率范围是-2到2，超过的视为边界值
+        normalized_sharpe = (min(max(sharpe_ratio, -2), 2) + 2) / 4
+        
+        # 趋势斜率：越大越好，需要归一化
+        # 假设斜率范围是-0.1到0.1（归一化后）
+        normalized_trend = (min(max(trend_slope, -0.1), 0.1) + 0.1) / 0.2
+        
+        # 成交量健康度：已经在0-1范围
+        normalized_volume = volume_score
+        
+        # 计算综合评分
+        score = (
+            0.30 * normalized_return +
+            0.20 * normalized_drawdown +
+            0.15 * normalized_volatility +
+            0.20 * normalized_sharpe +
+            0.10 * normalized_trend +
+            0.05 * normalized_volume
+        )
+        
+        return {
+            "score": round(score, 4),
+            "return": round(return_pct * 100, 2),  # 转换为百分比
+            "maxDrawdown": round(max_drawdown * 100, 2),  # 转换为百分比
+            "volatility": round(volatility * 100, 2),  # 转换为百分比
+            "sharpeRatio": round(sharpe_ratio, 4),
+            "trendSlope": round(trend_slope, 6),
+            "volumeScore": round(volume_score, 4),
+            "startPrice": round(start_price, 2),
+            "endPrice": round(end_price, 2),
+            "days": len(closes)
+        }, None
+    except Exception as e:
+        return None, str(e)
+
 def _run_best_stocks_task(task_id: str, startDate: str, endDate: str, sample_size: int, topN: int, sort_method: str = 'return'):
     """
     后台任务：计算最佳股票评分
@@ -2994,42 +3289,18 @@ def _run_best_stocks_task(task_id: str, startDate: str, endDate: str, sample_siz
         sort_method: 排序方式，'score' 按综合评分，'return' 按区间收益，默认'return'
     """
     try:
-        # 尝试导入scipy，如果没有则使用numpy实现线性回归
-        try:
-            from scipy import stats
-            has_scipy = True
-        except ImportError:
-            has_scipy = False
-        
         # 获取股票列表
-        project_root = Path(__file__).resolve().parents[3]
-        with_industry = project_root / 'data' / 'stockList' / 'all_stock_with_industry.json'
-        pure = project_root / 'data' / 'stockList' / 'all_pure_stock.json'
+        with_industry = STOCKLIST_DIR / 'all_stock_with_industry.json'
+        pure = STOCKLIST_DIR / 'all_pure_stock.json'
         
-        stock_list: list = []
-        if with_industry.exists():
-            with open(with_industry, 'r', encoding='utf-8') as f:
-                stock_list = json.load(f)
-        elif pure.exists():
-            with open(pure, 'r', encoding='utf-8') as f:
-                stock_list = json.load(f)
-        else:
+        if not with_industry.exists() and not pure.exists():
             with tasks_lock:
                 screening_tasks[task_id]["status"] = "error"
                 screening_tasks[task_id]["errors"] = [{"error": "股票列表文件不存在"}]
             return
         
-        # 构建名称映射
-        name_map: Dict[str, str] = {}
-        for it in (stock_list or []):
-            try:
-                code_raw = str(it.get('code') or '')
-                code = code_raw.split('.')[-1] if '.' in code_raw else code_raw
-                nm = str(it.get('code_name') or it.get('name') or '')
-                if code and nm:
-                    name_map[code] = nm
-            except Exception:
-                continue
+        # 名称映射（按股票列表JSON的修改时间缓存，只读）
+        name_map = get_name_map()
         
         # 获取所有可用的股票代码（从CSV文件）
         entries = data_loader.list_symbols()
@@ -3069,224 +3340,86 @@ def _run_best_stocks_task(task_id: str, startDate: str, endDate: str, sample_siz
                 screening_tasks[task_id]["errors"] = [{"error": "开始日期必须早于结束日期"}]
             return
         
-        results = []
+        # 已计算的结果按股票代码去重（同一股票以最新结果为准，dict 保持首次出现的顺序）
+        results_by_symbol: Dict[str, Dict[str, Any]] = {}
         errors = []
         processed = 0
-        
-        # 计算所有股票的评分
-        for symbol in available_symbols:
-            try:
-                # 更新当前处理的股票（包含名称和代码）
+        # 当前前N只：大小不超过topN的最小堆，元素为 (排序键, -序号, 结果)，堆顶即前N只中排名最后的一只；
+        # 排序键相同时先处理的排在前面（与稳定排序一致），序号唯一，不会比较到结果字典
+        if sort_method == 'return':
+            rank_key = lambda x: (x['return'], x['score'])
+        else:
+            rank_key = lambda x: (x['score'], x['return'])
+        top_heap: List[Tuple[Tuple[float, float], int, Dict[str, Any]]] = []
+        heap_symbols = set()
+        # 任务状态按批写回（每 flush_every 只或间隔 flush_interval 秒，以及最后一只），一次加锁同时写进度与结果；
+        # 前N只有变化时才重新生成结果快照
+        flush_every = 25
+        flush_interval = 0.25
+        last_flush_processed = 0
+        last_flush_ts = time.monotonic()
+        top_changed = False
+        
+        # 计算所有股票的评分：各股票相互独立，在共享进程池中并行计算（按提交顺序返回，结果与串行一致）
+        process_pool = _get_scoring_pool() if len(available_symbols) > 1 else None
+        scorer = functools.partial(_score_stock_worker, data_loader.data_dir, start_dt, end_dt)
+        if process_pool is not None:
+            scored = process_pool.map(scorer, available_symbols, chunksize=16)
+        else:
+            scored = map(scorer, available_symbols)
+        try:
+            for symbol, (metrics, error) in zip(available_symbols, scored):
                 stock_name = name_map.get(symbol, symbol)
-                current_info = f"{stock_name}--{symbol}"
-                with tasks_lock:
-                    screening_tasks[task_id]["progress"]["current"] = current_info
-                
-                # 加载股票数据
-                df = load_stock_data(symbol, timeframe='1d')
-                if df is None or df.empty:
-                    processed += 1
-                    with tasks_lock:
-                        screening_tasks[task_id]["progress"]["processed"] = processed
-                    continue
                 
-                # 过滤日期范围
-                df = df[(df['timestamp'] >= start_dt) & (df['timestamp'] <= end_dt)]
-                # 至少需要1天数据（开始和结束价格）
-                if df.empty or len(df) < 1:
-                    processed += 1
-                    with tasks_lock:
-                        screening_tasks[task_id]["progress"]["processed"] = processed
-                    continue
-                
-                df = df.sort_values('timestamp').reset_index(drop=True)
-                
-                # 获取价格和成交量数据
-                closes = df['close'].values
-                volumes = df['volume'].values
-                
-                # 1. 计算区间收益 Return（权重 0.30）
-                start_price = closes[0]
-                end_price = closes[-1]
-                return_pct = (end_price - start_price) / start_price if start_price > 0 else 0
-                
-                # 如果只有1天数据，使用默认值
-                if len(closes) < 2:
-                    # 单日数据，无法计算其他指标，使用默认值
-                    max_drawdown = 0
-                    volatility = 0
-                    sharpe_ratio = 0
-                    trend_slope = 0
-                    volume_score = 0.5
-                else:
-                    # 2. 计算最大回撤 MaxDrawdown（权重 0.20，回撤越小越好）
-                    peak = start_price
-                    max_drawdown = 0
-                    for price in closes:
-                        if price > peak:
-                            peak = price
-                        drawdown = (peak - price) / peak if peak > 0 else 0
-                        max_drawdown = max(max_drawdown, drawdown)
-                    
-                    # 3. 计算波动率 Volatility（权重 0.15，越小越好）
-                    daily_returns = np.diff(closes) / closes[:-1]
-                    volatility = np.std(daily_returns) * np.sqrt(252) if len(daily_returns) > 0 else 0
-                    
-                    # 4. 计算Sharpe比率（权重 0.20）
-                    if len(daily_returns) > 0 and np.std(daily_returns) > 0:
-                        mean_return = np.mean(daily_returns)
-                        sharpe_ratio = (mean_return / np.std(daily_returns)) * np.sqrt(252) if np.std(daily_returns) > 0 else 0
-                    else:
-                        sharpe_ratio = 0
+                if error is not None:
+                    errors.append({
+                        "symbol": symbol,
+                        "error": error
+                    })
+                elif metrics is not None:
+                    stock_result = {"symbol": symbol, "name": stock_name}
+                    stock_result.update(metrics)
                     
-                    # 5. 计算趋势斜率 TrendSlope，使用线性回归（权重 0.10）
-                    x = np.arange(len(closes))
-                    if len(closes) > 1:
-                        # 使用scipy的linregress或numpy实现
-                        if has_scipy:
-                            slope, intercept, r_value, p_value, std_err = stats.linregress(x, closes)
-                        else:
-                            # 使用numpy实现最小二乘法线性回归
-                            A = np.vstack([x, np.ones(len(x))]).T
-                            slope, intercept = np.linalg.lstsq(A, closes, rcond=None)[0]
-                        trend_slope = slope / start_price if start_price > 0 else 0  # 归一化斜率
-                    else:
-                        trend_slope = 0
+                    results_by_symbol[symbol] = stock_result
                     
-                    # 6. 计算成交量健康度 VolumeScore（权重 0.05）
-                    # 成交量健康度：上涨时放量，下跌时缩量
-                    volume_score = 0
-                    if len(volumes) > 1 and len(daily_returns) > 0:
-                        volume_changes = np.diff(volumes) / volumes[:-1]
-                        # 计算价格变化与成交量变化的相关性
-                        # 正相关（上涨放量、下跌缩量）得分高
-                        if len(volume_changes) > 0:
-                            # 简化计算：上涨日平均成交量 / 下跌日平均成交量
-                            up_days = daily_returns > 0
-                            down_days = daily_returns < 0
-                            if np.sum(up_days) > 0 and np.sum(down_days) > 0:
-                                avg_vol_up = np.mean(volumes[1:][up_days])
-                                avg_vol_down = np.mean(volumes[1:][down_days])
-                                if avg_vol_down > 0:
-                                    volume_ratio = avg_vol_up / avg_vol_down
-                                    # 归一化到0-1范围（假设合理范围是0.5-2.0）
-                                    volume_score = min(max((volume_ratio - 0.5) / 1.5, 0), 1)
-                            elif np.sum(up_days) > 0:
-                                volume_score = 0.5  # 只有上涨日，给中等分数
-                            else:
-                                volume_score = 0.2  # 只有下跌日，给低分
-                
-                # 归一化各项指标到0-1范围（用于评分）
-                # 收益：直接使用（已经是百分比）
-                normalized_return = min(max(return_pct, -1), 1)  # 限制在-100%到100%
-                normalized_return = (normalized_return + 1) / 2  # 转换到0-1范围
-                
-                # 最大回撤：越小越好，所以用1减去
-                normalized_drawdown = 1 - min(max_drawdown, 1)
-                
-                # 波动率：越小越好，需要反向归一化
-                # 假设波动率范围是0-1（年化），超过1的视为1
-                normalized_volatility = 1 - min(volatility, 1)
-                
-                # Sharpe比率：越大越好，需要归一化
-                # 假设Sharpe比率范围是-2到2，超过的视为边界值
-                normalized_sharpe = (min(max(sharpe_ratio, -2), 2) + 2) / 4
-                
-                # 趋势斜率：越大越好，需要归一化
-                # 假设斜率范围是-0.1到0.1（归一化后）
-                normalized_trend = (min(max(trend_slope, -0.1), 0.1) + 0.1) / 0.2
-                
-                # 成交量健康度：已经在0-1范围
-                normalized_volume = volume_score
-                
-                # 计算综合评分
-                score = (
-                    0.30 * normalized_return +
-                    0.20 * normalized_drawdown +
-                    0.15 * normalized_volatility +
-                    0.20 * normalized_sharpe +
-                    0.10 * normalized_trend +
-                    0.05 * normalized_volume
-                )
-                
-                # 获取股票名称
-                stock_name_result = name_map.get(symbol, symbol)
-                
-                stock_result = {
-                    "symbol": symbol,
-                    "name": stock_name_result,
-                    "score": round(score, 4),
-                    "return": round(return_pct * 100, 2),  # 转换为百分比
-                    "maxDrawdown": round(max_drawdown * 100, 2),  # 转换为百分比
-                    "volatility": round(volatility * 100, 2),  # 转换为百分比
-                    "sharpeRatio": round(sharpe_ratio, 4),
-                    "trendSlope": round(trend_slope, 6),
-                    "volumeScore": round(volume_score, 4),
-                    "startPrice": round(start_price, 2),
-                    "endPrice": round(end_price, 2),
-                    "days": len(df)
-                }
-                
-                results.append(stock_result)
-                
-                # 实时更新结果：每次计算完一只股票后，立即排序并更新前N只
-                # 先去重（基于symbol），保留最新的结果（使用字典更高效）
-                seen_symbols = {}
-                deduplicated_results = []
-                for r in reversed(results):  # 从后往前遍历，保留最新的
-                    sym = r.get('symbol')
-                    if sym and sym not in seen_symbols:
-                        seen_symbols[sym] = True
-                        deduplicated_results.insert(0, r)  # 插入到开头，保持顺序
-                
-                results = deduplicated_results
-                
-                # 按指定方式排序
-                if sort_method == 'return':
-                    results.sort(key=lambda x: (x['return'], x['score']), reverse=True)
-                else:
-                    results.sort(key=lambda x: (x['score'], x['return']), reverse=True)
-                
-                # 只保留前topN只
-                current_top_results = results[:topN] if len(results) >= topN else results
-                
-                # 实时更新任务状态中的结果
-                with tasks_lock:
-                    screening_tasks[task_id]["results"] = current_top_results.copy()
-                
-            except Exception as e:
-                errors.append({
-                    "symbol": symbol,
-                    "error": str(e)
-                })
-            
-            processed += 1
-            # 更新进度
-            with tasks_lock:
-                screening_tasks[task_id]["progress"]["processed"] = processed
-        
-        # 最终去重（确保没有重复的股票）
-        seen_symbols = {}
-        deduplicated_results = []
-        for r in results:
-            sym = r.get('symbol')
-            if sym and sym not in seen_symbols:
-                seen_symbols[sym] = True
-                deduplicated_results.append(r)
-        
-        results = deduplicated_results
-        
-        # 最终排序（确保结果正确）
-        # 注意：在循环中已经实时排序和更新了，这里再做一次最终确认
-        if sort_method == 'return':
-            # 按收益率排序，如果收益率相同再按综合评分排序
-            results.sort(key=lambda x: (x['return'], x['score']), reverse=True)
-        else:
-            # 按综合评分排序，如果评分相同再按收益率排序
-            results.sort(key=lambda x: (x['score'], x['return']), reverse=True)
-        
-        # 确保返回至少topN个结果，如果结果不足则返回全部
-        top_results = results[:topN] if len(results) >= topN else results
+                    # 更新前N只：同一股票重复出现时以最新结果为准，先移出旧结果
+                    replaced = symbol in heap_symbols
+                    if replaced:
+                        top_heap = [entry for entry in top_heap if entry[2]['symbol'] != symbol]
+                        heapq.heapify(top_heap)
+                    heapq.heappush(top_heap, (rank_key(stock_result), -processed, stock_result))
+                    heap_symbols.add(symbol)
+                    entered = True
+                    if len(top_heap) > topN:
+                        evicted = heapq.heappop(top_heap)[2]
+                        heap_symbols.discard(evicted['symbol'])
+                        # 新结果直接被淘汰说明未进入前N只
+                        entered = evicted is not stock_result
+                    if entered or replaced:
+                        top_changed = True
+                
+                processed += 1
+                now = time.monotonic()
+                if (processed - last_flush_processed >= flush_every or now - last_flush_ts >= flush_interval
+                        or processed == len(available_symbols)):
+                    # 只保留前topN只（按指定方式从高到低，只对堆内不超过topN个元素排序）
+                    current_top_results = [entry[2] for entry in sorted(top_heap, reverse=True)] if top_changed else None
+                    # 实时更新任务状态：当前处理的股票（包含名称和代码）、进度与前N只
+                    with tasks_lock:
+                        screening_tasks[task_id]["progress"]["current"] = f"{stock_name}--{symbol}"
+                        screening_tasks[task_id]["progress"]["processed"] = processed
+                        if current_top_results is not None:
+                            screening_tasks[task_id]["results"] = current_top_results
+                    last_flush_processed = processed
+                    last_flush_ts = now
+                    top_changed = False
+        finally:
+            if process_pool is not None:
+                # 任务中途失败时取消本任务尚未开始的评分（进程池为共享，不关闭）
+                scored.close()
+        
+        # 最终前N只直接取自堆（按指定方式从高到低）
+        top_results = [entry[2] for entry in sorted(top_heap, reverse=True)]
         
         # 如果结果数量不足topN，记录警告信息
         if len(top_results) < topN:
@@ -3301,7 +3434,7 @@ def _run_best_stocks_task(task_id: str, startDate: str, endDate: str, sample_siz
             screening_tasks[task_id]["progress"]["current"] = ""
             # 记录最终统计信息
             screening_tasks[task_id]["progress"]["totalProcessed"] = processed
-            screening_tasks[task_id]["progress"]["totalResults"] = len(results)
+            screening_tasks[task_id]["progress"]["totalResults"] = len(results_by_symbol)
             screening_tasks[task_id]["progress"]["finalTopN"] = len(top_results)
         
     except Exception as e:
@@ -6,24 +6,149 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any, Union
+import functools
 import os
 import sys
+import json
+import threading
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# pyarrow 为可选依赖：安装后使用 pandas 的 pyarrow CSV 引擎（多线程解析，通常快一倍以上），
+# 收盘价数组的缓存未命中路径直接用 pyarrow.csv 解析为数组，不经过 DataFrame
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    _HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pacsv = None
+    _HAS_PYARROW = False
+
+_NS_PER_DAY = 86_400_000_000_000
+
+# DataFrame 磁盘缓存的格式版本：缓存中保存的是已校验的预处理/聚合结果，
+# 修改 _preprocess_data、_validate_data 或周期聚合逻辑时递增，使旧缓存失效
+_FRAME_CACHE_VERSION = 2
+
+# 收盘价数组磁盘缓存（data/.cache/closes/）的格式版本：文件布局或数组的计算逻辑变更时递增，使旧缓存失效
+_CLOSE_CACHE_VERSION = 1
+
+# K线不跨自然日、时间戳取组内最后一根的周期：按截止日期（自然日）截断与聚合可以交换顺序，
+# 由完整数据的聚合结果二分截断即可。周线/月线以及右闭右标签的分钟重采样不满足（截止日期所在的K线
+# 只能包含截止日期及之前的数据），必须先截断再聚合
+_END_CUT_TIMEFRAMES = frozenset({"1d", "1h", "4h"})
+
+# 其余按 resample 聚合的周期（1d/1w/1h/4h 使用组内最后时间戳的分组聚合）
+_RESAMPLE_RULES = {
+    "1m": "T",
+    "5m": "5T",
+    "15m": "15T",
+    "30m": "30T",
+    "1M": "M",
+}
+
+# 价格列固定按 float64 解析（成交量/成交额可能为整数，仍按推断类型）
+_PRICE_CONVERT_OPTIONS = (
+    pacsv.ConvertOptions(column_types={c: pa.float64() for c in ('open', 'high', 'low', 'close')})
+    if _HAS_PYARROW else None
+)
+
+class _FrameLRUCache(OrderedDict):
+    """
+    按内存占用限额的 LRU 缓存（键 -> DataFrame）
+    
+    读取命中时移到末尾，写入后从最久未使用的一端淘汰，直到总字节数与条目数都不超过限额（至少保留最新一条）
+    """
+    
+    def __init__(self, max_bytes: int, max_entries: int = 0):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries  # 0 表示不限条目数，仅按字节限额
+        self.total_bytes = 0
+        self._sizes: Dict[Any, int] = {}
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        return 0
+    
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                return default
+            return self.__getitem__(key)
+    
+    def __setitem__(self, key, value) -> None:
+        size = self._size_of(value)
+        with self._lock:
+            if key in self:
+                self.__delitem__(key)
+            super().__setitem__(key, value)
+            self._sizes[key] = size
+            self.total_bytes += size
+            while len(self) > 1 and (
+                self.total_bytes > self.max_bytes
+                or (self.max_entries and len(self) > self.max_entries)
+            ):
+                oldest = next(iter(self))
+                self.__delitem__(oldest)
+    
+    def __delitem__(self, key) -> None:
+        with self._lock:
+            super().__delitem__(key)
+            self.total_bytes -= self._sizes.pop(key, 0)
+    
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+    
+    def invalidate_prefix(self, prefixes) -> int:
+        """
+        在锁内删除键以指定前缀开头的全部条目（遍历与删除之间不会被并发读写打断）
+        
+        Args:
+            prefixes: 单个前缀或前缀元组
+            
+        Returns:
+            int: 被删除的条目数
+        """
+        with self._lock:
+            stale = [k for k in self.keys() if isinstance(k, str) and k.startswith(prefixes)]
+            for k in stale:
+                self.__delitem__(k)
+            return len(stale)
+
+
 class StockDataLoader:
     """股票数据加载器"""
     
-    def __init__(self, data_dir: Optional[str] = None):
+    def __init__(self, data_dir: Optional[str] = None, cache_mb: int = 512,
+                 cache_max_entries: Optional[int] = None):
         """
         初始化数据加载器
         
         Args:
             data_dir: 数据文件目录
+            cache_mb: 内存数据缓存的上限（MB），超出后淘汰最久未使用的数据
+            cache_max_entries: 内存数据缓存的条目数上限；None 时读取环境变量
+                TESTBACK_CACHE_MAX_ENTRIES（未设置或为 0 表示不限条目数）
         """
         if data_dir is None:
             # 优先使用项目根目录下的 data 目录（跨平台兼容）
@@ -51,7 +176,28 @@ class StockDataLoader:
             self.data_dir = preferred_dir if preferred_dir and os.path.isdir(preferred_dir) else fallback_dir
         else:
             self.data_dir = data_dir
-        self.cache = {}  # 数据缓存
+        if cache_max_entries is None:
+            try:
+                cache_max_entries = int(os.environ.get('TESTBACK_CACHE_MAX_ENTRIES', '0'))
+            except ValueError:
+                logger.warning("TESTBACK_CACHE_MAX_ENTRIES 不是整数，忽略条目数上限")
+                cache_max_entries = 0
+        # 数据缓存（LRU，按内存占用与条目数限额）
+        self.cache = _FrameLRUCache(cache_mb * 1024 * 1024, max(cache_max_entries, 0))
+        # 时间周期 -> 聚合函数（初始化时绑定一次，_filter_by_timeframe 只做查表）
+        self._tf_handlers: Dict[str, Callable[[pd.DataFrame], pd.DataFrame]] = {
+            "1d": self._agg_daily,
+            "1w": self._agg_weekly,
+            "1h": functools.partial(self._agg_hourly, freq='H'),
+            "4h": functools.partial(self._agg_hourly, freq='4H'),
+        }
+        for tf, rule in _RESAMPLE_RULES.items():
+            self._tf_handlers[tf] = functools.partial(self._resample_bars, rule=rule)
+        # CSV目录列表与 代码 -> 文件路径 的查找缓存（按目录修改时间失效）
+        self._index_lock = threading.Lock()
+        self._listing: List[Tuple[str, List[str]]] = []
+        self._listing_key: Optional[Tuple] = None
+        self._path_index: Dict[str, str] = {}
         
     def load_stock_data(self, symbol: str, timeframe: str = "5m", end_date: Optional[str] = None) -> pd.DataFrame:
         """
@@ -65,84 +211,597 @@ class StockDataLoader:
         Returns:
             DataFrame: 包含OHLCV数据的DataFrame
         """
-        # 构建文件路径
-        filename = f"{symbol}.csv"
-        filepath = os.path.join(self.data_dir, filename)
-        
         # 检查缓存（包含end_date的缓存键）
         cache_key = f"{symbol}_{timeframe}_{end_date or 'all'}"
-        if cache_key in self.cache:
-            logger.info(f"从缓存加载数据: {symbol}")
-            return self.cache[cache_key]
-        
-        # 扫描候选路径（支持期货 data/features 与批量日K data/stocks）
-        candidates = []
-        # 股票目录（根目录）
-        if os.path.isdir(self.data_dir):
-            for f in os.listdir(self.data_dir):
-                if f.lower().endswith('.csv') and symbol in f:
-                    candidates.append(os.path.join(self.data_dir, f))
-        # 批量日K目录（所有文件直接在 stocks/ 目录下）
-        stocks_dir = os.path.join(self.data_dir, 'stocks')
-        if os.path.isdir(stocks_dir):
-            # 只检查 stocks 目录下的直接文件
-            for f in os.listdir(stocks_dir):
-                if f.lower().endswith('.csv') and symbol in f:
-                    candidates.append(os.path.join(stocks_dir, f))
-        # 期货目录
-        futures_dir = os.path.join(self.data_dir, 'features')
-        if os.path.isdir(futures_dir):
-            for f in os.listdir(futures_dir):
-                if f.lower().endswith('.csv') and symbol in f:
-                    candidates.append(os.path.join(futures_dir, f))
-        
-        if candidates:
-            # 优先选择 features 目录中的文件
-            candidates.sort(key=lambda p: (0 if os.path.dirname(p).endswith('features') else 1, len(os.path.basename(p))))
-            filepath = candidates[0]
-            logger.info(f"找到匹配文件: {os.path.basename(filepath)}")
-        else:
-            # 仍按旧逻辑兜底
-            if not os.path.exists(filepath):
-                csv_files = [f for f in os.listdir(self.data_dir) if f.endswith('.csv')]
-                matching_files = [f for f in csv_files if symbol in f]
-                if matching_files:
-                    filepath = os.path.join(self.data_dir, matching_files[0])
-                    logger.info(f"找到匹配文件: {matching_files[0]}")
-                else:
-                    raise FileNotFoundError(f"未找到股票 {symbol} 的数据文件")
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.debug("从缓存加载数据: %s", symbol)
+            return cached
+        
+        if end_date and timeframe in _END_CUT_TIMEFRAMES:
+            # 日线/小时线的每根K线只含同一天的数据，先聚合完整数据再截断与先截断再聚合结果相同：
+            # 复用完整周期数据（内存/磁盘缓存），按时间戳二分截断，不为每个截止日期另存缓存
+            full = self.load_stock_data(symbol, timeframe)
+            cutoff = self._end_cutoff(end_date, full['timestamp'].dt.tz)
+            if cutoff is None:
+                return full
+            df = full.iloc[:int(full['timestamp'].searchsorted(cutoff, side='left'))]
+            logger.debug("已过滤截止日期 %s，剩余 %d 条数据", end_date, len(df))
+            return df
+        
+        filepath = self._resolve_filepath(symbol)
         
         try:
-            # 读取CSV文件
-            logger.info(f"正在加载数据文件: {filepath}")
-            df = pd.read_csv(filepath)
+            # 磁盘上的二级缓存：每个源文件与周期只保存一份完整数据的聚合结果（按源文件修改时间失效），进程重启后直接读取
+            mtime_ns = os.stat(filepath).st_mtime_ns
+            result_cache_base = None if end_date else self._frame_cache_base(filepath, timeframe)
+            if result_cache_base is not None:
+                df = self._read_frame_cache(result_cache_base, mtime_ns)
+                if df is not None:
+                    self.cache[cache_key] = df
+                    return df
             
-            # 数据预处理
-            df = self._preprocess_data(df)
+            # 读取预处理后的数据（优先 Parquet 列式缓存，未命中时解析CSV并预处理后写入缓存）
+            logger.debug("正在加载数据文件: %s", filepath)
+            df = self._load_preprocessed(filepath, mtime_ns)
             
-            # 在聚合前过滤截止日期（重要：必须在聚合前过滤，避免使用未来数据）
+            # 周线、月线与分钟重采样的K线跨越截止日期，必须在聚合前过滤（避免使用未来数据）；
+            # 预处理后时间列已升序，二分查找截断位置后按位置切片，不生成整列布尔掩码，也不复制
             if end_date:
-                try:
-                    end_dt = pd.to_datetime(end_date).normalize()  # 转换为日期，时间设为00:00:00
-                    # 只保留截止日期及之前的数据（timestamp的日期部分 <= end_date）
-                    df = df[df['timestamp'].dt.date <= end_dt.date()].copy()
-                    logger.info(f"已过滤截止日期 {end_date}，剩余 {len(df)} 条数据")
-                except Exception as e:
-                    logger.warning(f"截止日期过滤失败: {e}，使用全部数据")
+                cutoff = self._end_cutoff(end_date, df['timestamp'].dt.tz)
+                if cutoff is not None:
+                    df = df.iloc[:int(df['timestamp'].searchsorted(cutoff, side='left'))]
+                    logger.debug("已过滤截止日期 %s，剩余 %d 条数据", end_date, len(df))
             
             # 根据时间周期过滤数据（若基础为分钟线，可聚合为更大周期）
             df = self._filter_by_timeframe(df, timeframe)
             
-            # 缓存数据
+            # 缓存数据：完整数据写入内存与磁盘，带截止日期的结果只保留在内存 LRU 中
+            if result_cache_base is not None:
+                self._write_frame_cache(result_cache_base, mtime_ns, df)
             self.cache[cache_key] = df
             
-            logger.info(f"成功加载 {len(df)} 条数据记录")
+            logger.debug("成功加载 %d 条数据记录", len(df))
             return df
             
         except Exception as e:
             logger.error(f"加载数据失败: {str(e)}")
             raise
     
+    def _csv_listing(self) -> List[Tuple[str, List[str]]]:
+        """
+        数据目录、stocks/ 与 features/ 下的CSV文件名列表（保持 os.listdir 顺序）
+        
+        结果按三个目录的路径与修改时间缓存：目录内增删、重命名文件会更新目录修改时间，此时重新扫描，
+        同时清空代码到文件路径的查找缓存
+        
+        Returns:
+            List[Tuple[str, List[str]]]: [(目录路径, [CSV文件名, ...]), ...]，不存在的目录不包含在内
+        """
+        dirs = [
+            self.data_dir,
+            os.path.join(self.data_dir, 'stocks'),
+            os.path.join(self.data_dir, 'features'),
+        ]
+        stamps = []
+        for d in dirs:
+            try:
+                stamps.append(os.stat(d).st_mtime_ns if os.path.isdir(d) else None)
+            except OSError:
+                stamps.append(None)
+        key = (tuple(dirs), tuple(stamps))
+        with self._index_lock:
+            if self._listing_key == key:
+                return self._listing
+            listing = [
+                (d, [f for f in os.listdir(d) if f.lower().endswith('.csv')])
+                for d, stamp in zip(dirs, stamps) if stamp is not None
+            ]
+            # 按 list_symbols 的命名规则解析出的代码 -> 文件路径；同一代码有多个文件时
+            # features/ 优先，其次 stocks/，最后数据目录本身，同目录内取文件名较短者
+            dir_rank = {dirs[2]: 0, dirs[1]: 1, dirs[0]: 2}
+            ranked = sorted(
+                ((dir_rank[d], len(f), os.path.join(d, f), self._parse_csv_name(f)[0]) for d, files in listing for f in files),
+                key=lambda item: (item[0], item[1]),
+            )
+            path_index: Dict[str, str] = {}
+            for _, _, path, parsed in ranked:
+                path_index.setdefault(parsed, path)
+            self._listing = listing
+            self._listing_key = key
+            self._path_index = path_index
+            return listing
+    
+    @staticmethod
+    def _parse_csv_name(filename: str) -> Tuple[str, str]:
+        """
+        从CSV文件名解析代码与名称：股票为“中文名-代码”，期货为“合约_中文名”或仅合约
+        
+        Args:
+            filename: CSV文件名
+            
+        Returns:
+            Tuple[str, str]: (代码, 名称)
+        """
+        base = os.path.splitext(filename)[0]
+        if '-' in base:
+            # 股票命名：中文名-代码
+            parts = base.split('-')
+            symbol = parts[-1]
+            return symbol, '-'.join(parts[:-1]) or symbol
+        if '_' in base:
+            # 期货命名：合约_中文名
+            parts = base.split('_')
+            return parts[0], parts[1] if len(parts) > 1 else parts[0]
+        return base, base
+    
+    def _resolve_filepath(self, symbol: str) -> str:
+        """
+        查找股票对应的CSV文件路径：按文件名解析出的代码精确查找（哈希表，目录变化时自动重建）
+        
+        只接受完整代码，不按文件名包含代码匹配，避免 '001' 误取 '001000' 的数据文件
+        
+        Args:
+            symbol: 股票代码
+            
+        Returns:
+            str: CSV文件路径
+            
+        Raises:
+            FileNotFoundError: 没有文件名解析出的代码与之相同的CSV文件
+        """
+        self._csv_listing()
+        with self._index_lock:
+            filepath = self._path_index.get(symbol)
+        if filepath is None:
+            raise FileNotFoundError(f"未找到股票 {symbol} 的数据文件")
+        logger.debug("找到匹配文件: %s", os.path.basename(filepath))
+        return filepath
+    
+    def load_close_arrays(self, symbol: str, timeframe: str = "1d", end_date: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        加载收盘价/成交量/时间戳数组，完整序列持久化在 data/.cache/closes/ 下，重复筛选时无需再次解析CSV
+        
+        每个源文件与周期只缓存一份完整序列：原始二进制块 {key}.f64（3 行：close、volume、timestamp 的
+        int64 位模式）与 {key}.meta.json（长度、源CSV修改时间、格式版本、时区），命中时以 np.memmap 只读映射，
+        多个进程共享同一份系统页缓存。截止日期在读取时按时间戳二分截断（切片仍为映射视图），
+        不为每个截止日期另存缓存；周线等不能由完整序列截断得到的周期带截止日期时，由 load_stock_data
+        先截断再聚合，不写磁盘缓存
+        
+        Args:
+            symbol: 股票代码
+            timeframe: 时间周期
+            end_date: 截止日期（格式：YYYY-MM-DD），None表示不过滤
+            
+        Returns:
+            Dict: {'close': float64数组, 'volume': float64数组, 'timestamp': int64纳秒数组}（只读）
+        """
+        if end_date and timeframe not in _END_CUT_TIMEFRAMES:
+            return self._frame_close_arrays(self.load_stock_data(symbol, timeframe, end_date=end_date))
+        arrays, tz, _ = self._full_close_arrays(symbol, timeframe)
+        return self._cut_close_arrays(arrays, tz, end_date)
+    
+    def open_close_cache(self, cache_base: str, end_date: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        以 np.memmap 打开已写好的收盘价缓存（进程池任务返回的缓存路径），按截止日期截断
+        
+        Args:
+            cache_base: 缓存路径前缀（prepare_close_arrays_worker 的返回值）
+            end_date: 截止日期（格式：YYYY-MM-DD），None表示不过滤
+            
+        Returns:
+            Optional[Dict]: 同 load_close_arrays；缓存不存在或版本不符时返回 None
+        """
+        cached = self._read_close_cache(cache_base)
+        if cached is None:
+            return None
+        return self._cut_close_arrays(cached[0], cached[1], end_date)
+    
+    def _cut_close_arrays(self, arrays: Dict[str, np.ndarray], tz: Optional[str], end_date: Optional[str]) -> Dict[str, np.ndarray]:
+        """完整序列按截止日期二分截断（切片仍为原数组的视图）"""
+        if end_date:
+            cutoff = self._end_cutoff(end_date, tz)
+            if cutoff is not None:
+                cut = int(np.searchsorted(arrays['timestamp'], cutoff.value, side='left'))
+                arrays = {k: v[:cut] for k, v in arrays.items()}
+        return arrays
+    
+    def _read_close_cache(self, cache_base: str, mtime_ns: Optional[int] = None) -> Optional[Tuple[Dict[str, np.ndarray], Optional[str]]]:
+        """
+        读取收盘价缓存（{cache_base}.f64 与 {cache_base}.meta.json），以 np.memmap 只读映射
+        
+        Args:
+            cache_base: 缓存路径前缀
+            mtime_ns: 源CSV修改时间（纳秒），不一致时视为未命中；None 表示不检查（调用方刚确认过）
+            
+        Returns:
+            Optional[Tuple]: (数组字典, 时间戳时区)；未命中或读取失败时返回 None
+        """
+        meta_path = f"{cache_base}.meta.json"
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != _CLOSE_CACHE_VERSION or (mtime_ns is not None and meta.get('mtime_ns') != mtime_ns):
+                return None
+            n = int(meta['length'])
+            if n == 0:
+                block = np.empty((3, 0), dtype=np.float64)
+            else:
+                block = np.memmap(f"{cache_base}.f64", dtype=np.float64, mode='r', shape=(3, n))
+            return self._close_block_arrays(block), meta.get('tz')
+        except Exception as e:
+            logger.warning(f"收盘价缓存读取失败，重新生成: {e}")
+            return None
+    
+    def _full_close_arrays(self, symbol: str, timeframe: str) -> Tuple[Dict[str, np.ndarray], Optional[str], Optional[str]]:
+        """
+        完整序列的收盘价数组：命中磁盘缓存时以 np.memmap 映射，否则解析后写入缓存
+        
+        Args:
+            symbol: 股票代码
+            timeframe: 时间周期
+            
+        Returns:
+            (数组字典, 时间戳时区（无时区为 None）, 缓存路径前缀（写入失败时为 None）)
+        """
+        filepath = self._resolve_filepath(symbol)
+        mtime_ns = os.stat(filepath).st_mtime_ns
+        cache_base = self._frame_cache_base(filepath, timeframe, subdir='closes')
+        data_path = f"{cache_base}.f64"
+        meta_path = f"{cache_base}.meta.json"
+        
+        cached = self._read_close_cache(cache_base, mtime_ns)
+        if cached is not None:
+            return cached[0], cached[1], cache_base
+        
+        tz = None
+        arrays = self._read_close_arrays_fast(filepath, timeframe, None)
+        if arrays is None:
+            df = self.load_stock_data(symbol, timeframe)
+            if df['timestamp'].dt.tz is not None:
+                tz = str(df['timestamp'].dt.tz)
+            arrays = self._frame_close_arrays(df)
+        n = len(arrays['close'])
+        block = np.empty((3, n), dtype=np.float64)
+        block[0] = arrays['close']
+        block[1] = arrays['volume']
+        block[2] = arrays['timestamp'].view(np.float64)
+        try:
+            os.makedirs(os.path.dirname(cache_base), exist_ok=True)
+            # 先写临时文件再替换（数据块先于元数据），避免并发读取到写了一半的缓存
+            tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            block.tofile(data_path + tmp_suffix)
+            os.replace(data_path + tmp_suffix, data_path)
+            with open(meta_path + tmp_suffix, 'w', encoding='utf-8') as f:
+                json.dump({'length': n, 'mtime_ns': mtime_ns, 'version': _CLOSE_CACHE_VERSION, 'tz': tz}, f)
+            os.replace(meta_path + tmp_suffix, meta_path)
+        except Exception as e:
+            logger.warning(f"收盘价缓存写入失败: {e}")
+            cache_base = None
+        return self._close_block_arrays(block), tz, cache_base
+    
+    @staticmethod
+    def _close_block_arrays(block: np.ndarray) -> Dict[str, np.ndarray]:
+        """(3, n) 数据块按行拆分为数组字典（均为视图，timestamp 行按 int64 解释）"""
+        return {'close': block[0], 'volume': block[1], 'timestamp': block[2].view(np.int64)}
+    
+    @staticmethod
+    def _frame_close_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        由加载器输出的K线提取收盘价/成交量/时间戳数组
+        
+        Args:
+            df: load_stock_data 的结果（时间升序）
+            
+        Returns:
+            Dict: {'close': float64数组, 'volume': float64数组, 'timestamp': int64纳秒数组（带时区时为UTC）}
+        """
+        return {
+            'close': df['close'].to_numpy(dtype=np.float64),
+            'volume': df['volume'].to_numpy(dtype=np.float64),
+            'timestamp': df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+        }
+    
+    @staticmethod
+    def _end_cutoff(end_date: str, tz: Any = None) -> Optional[pd.Timestamp]:
+        """
+        截止日期次日零点：时间戳早于该时刻的记录即“日期 <= 截止日期”的数据
+        
+        Args:
+            end_date: 截止日期（格式：YYYY-MM-DD）
+            tz: 时间戳的时区（无时区为 None），截止时刻按当地时间计算
+            
+        Returns:
+            Optional[Timestamp]: 截止时刻；日期无法解析时记录警告并返回 None（不过滤）
+        """
+        try:
+            cutoff = pd.to_datetime(end_date).normalize() + pd.Timedelta(days=1)
+            if tz is not None:
+                cutoff = cutoff.tz_localize(tz)
+            return cutoff
+        except Exception as e:
+            logger.warning(f"截止日期过滤失败: {e}，使用全部数据")
+            return None
+    
+    def load_close_windows(self, symbols: List[Optional[str]], end_date: str, width: int = 6, use_cache: bool = True) -> np.ndarray:
+        """
+        批量读取多只股票自截止日期起的收盘价窗口：[截止日期及之前最后一根K线, 其后第1根, ..., 第 width-1 根]
+        
+        数据按股票分文件存放，无法一次扫描得到全部股票；这里在一次调用内用线程池并发读取各股票的日线
+        （命中磁盘缓存时为 np.memmap 缺页，只触及窗口所在的页），直接写入预分配的 (N, width) 面板
+        
+        Args:
+            symbols: 股票代码列表（空值对应的行保持 NaN）
+            end_date: 截止日期（格式：YYYY-MM-DD）
+            width: 每只股票的窗口长度（含基准）
+            use_cache: 是否使用收盘价磁盘缓存，否则每次解析CSV
+            
+        Returns:
+            np.ndarray: (N, width) float64 面板，数据不足或加载失败的位置为 NaN
+        """
+        # 截止日期次日零点（纳秒），其前一根K线即截止日期及之前的最后一条记录（基准）
+        end_cutoff_ns = pd.to_datetime(end_date).normalize().value + _NS_PER_DAY
+        panel = np.full((len(symbols), width), np.nan)
+        
+        def fill_row(i: int) -> None:
+            symbol = symbols[i]
+            if not symbol:
+                return
+            try:
+                # 不限制截止日期，需要获取截止日期之后的数据
+                if use_cache:
+                    arrays = self.load_close_arrays(symbol, '1d', None)
+                    closes, ts = arrays['close'], arrays['timestamp']
+                else:
+                    # 加载器输出的 close 已为数值列、timestamp 已为升序 datetime64，直接取底层数组
+                    df = self.load_stock_data(symbol, '1d', end_date=None)
+                    closes = df['close'].to_numpy(dtype=np.float64)
+                    ts = df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+                base_idx = int(np.searchsorted(ts, end_cutoff_ns, side='left')) - 1
+                if base_idx < 0:
+                    return
+                window = closes[base_idx:base_idx + width]
+                panel[i, :len(window)] = window
+            except Exception:
+                # 单只股票加载失败，跳过
+                return
+        
+        # 各行写入互不重叠，线程池中直接填充
+        workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(fill_row, range(len(symbols))))
+        return panel
+    
+    def load_many(self, symbols: List[str], timeframe: str = "1d", end_date: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        用线程池并发加载多只股票（CSV/Parquet 解析与数值预处理大部分在 pyarrow/numpy 中释放 GIL），
+        结果同时写入内存缓存，随后逐只调用 load_stock_data 直接命中
+        
+        Args:
+            symbols: 股票代码列表
+            timeframe: 时间周期
+            end_date: 截止日期（格式：YYYY-MM-DD），None表示不过滤
+            
+        Returns:
+            Dict[str, DataFrame]: 成功加载的 代码 -> 数据；加载失败的股票不包含在内（逐只加载时再报告错误）
+        """
+        unique = list(dict.fromkeys(s for s in symbols if s))
+        
+        def load_one(symbol: str) -> Optional[pd.DataFrame]:
+            try:
+                return self.load_stock_data(symbol, timeframe, end_date)
+            except Exception:
+                return None
+        
+        workers = min(16, (os.cpu_count() or 1) * 2, max(1, len(unique)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(load_one, unique))
+        return {symbol: df for symbol, df in zip(unique, frames) if df is not None}
+    
+    def _read_close_arrays_fast(self, filepath: str, timeframe: str, end_date: Optional[str]) -> Optional[Dict[str, np.ndarray]]:
+        """
+        不经过 pandas，直接用 pyarrow.csv 解析CSV并按日/周聚合出收盘价/成交量/时间戳数组
+        
+        语义与 load_stock_data 一致（整行去NaN、按时间排序、数据校验、截止日期过滤、组内取最后收盘价与成交量之和）；
+        pyarrow 不可用、非日线/周线、类型无法直接解析、存在重复时间戳或校验不通过等情况返回 None，
+        由调用方回退到 pandas 路径（包括报错与日志）
+        
+        Args:
+            filepath: CSV文件路径
+            timeframe: 时间周期（仅支持 "1d"、"1w"）
+            end_date: 截止日期（格式：YYYY-MM-DD），None表示不过滤
+            
+        Returns:
+            Optional[Dict]: {'close': float64数组, 'volume': float64数组, 'timestamp': int64纳秒数组}
+        """
+        if pacsv is None or timeframe not in ("1d", "1w"):
+            return None
+        try:
+            table = pacsv.read_csv(filepath)
+            names = ['timestamp' if c == 'timestamps' else c for c in table.column_names]
+            if len(set(names)) != len(names):
+                return None
+            table = table.rename_columns(names)
+            required = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+            if any(c not in names for c in required):
+                return None
+            ts_type = table.schema.field('timestamp').type
+            if not pa.types.is_timestamp(ts_type) or ts_type.tz is not None:
+                return None
+            
+            # 整行去NaN（与 _preprocess_data 的 dropna 一致，包含 amount 等其它列）
+            valid = np.ones(table.num_rows, dtype=bool)
+            cols: Dict[str, np.ndarray] = {}
+            for name in names:
+                col = table.column(name)
+                valid &= ~col.is_null().to_numpy(zero_copy_only=False)
+                if name == 'timestamp':
+                    continue
+                if not (pa.types.is_floating(col.type) or pa.types.is_integer(col.type) or pa.types.is_null(col.type)):
+                    return None
+                arr = col.cast(pa.float64()).to_numpy(zero_copy_only=False)
+                valid &= ~np.isnan(arr)
+                cols[name] = arr
+            ts = table.column('timestamp').cast(pa.timestamp('ns')).to_numpy(zero_copy_only=False).astype(np.int64)
+            
+            ts = ts[valid]
+            order = np.argsort(ts, kind='stable')
+            ts = ts[order]
+            if len(ts) > 1 and not (np.diff(ts) > 0).all():
+                return None  # 重复时间戳的组内顺序依赖 pandas 排序实现，交给 pandas 路径
+            o, h, l, c, v = (cols[k][valid][order] for k in ('open', 'high', 'low', 'close', 'volume'))
+            if (h < l).any() or (c > h).any() or (c < l).any() or (o > h).any() or (o < l).any() or (v < 0).any():
+                return None
+            
+            # 截止日期过滤：只保留日期 <= end_date 的记录（聚合前过滤）
+            if end_date:
+                end_ns = pd.to_datetime(end_date).normalize().value + _NS_PER_DAY
+                keep = ts < end_ns
+                ts, c, v = ts[keep], c[keep], v[keep]
+            if len(ts) == 0:
+                return None
+            
+            # 分组键：日线按自然日；周线按以周五收盘的自然周（W-FRI，1970-01-03 为周六）
+            day = ts // _NS_PER_DAY
+            key = day if timeframe == "1d" else (day - 2) // 7
+            starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+            ends = np.r_[starts[1:], len(ts)] - 1
+            return {
+                'close': c[ends],
+                'volume': np.add.reduceat(v, starts),
+                'timestamp': ts[ends],
+            }
+        except Exception as e:
+            logger.debug("pyarrow 快速解析失败，回退到 pandas: %s", e)
+            return None
+    
+    def _frame_cache_base(self, filepath: str, variant: str = '', subdir: str = 'frames') -> str:
+        """
+        磁盘缓存的路径前缀（data/.cache/<subdir>/ 下，不含扩展名）
+        
+        Args:
+            filepath: 源CSV文件路径（已解析的数据文件，不直接使用请求中的代码拼接路径）
+            variant: 附加标识（如周期 "1d"），为空表示预处理后的完整数据
+            subdir: 缓存子目录（frames 为 DataFrame，closes 为收盘价数组）
+            
+        Returns:
+            str: 缓存路径前缀
+        """
+        # 以相对数据目录的路径作为键，避免 stocks/ 与 features/ 下同名文件冲突
+        rel = os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.data_dir))
+        name = os.path.splitext(rel)[0].replace(os.sep, '__').replace('..', '_')
+        if variant:
+            # 小写字母与数字以外的字符转义为 ~十六进制码：不会出现路径分隔符，
+            # 在大小写不敏感的文件系统上 1M（月线）与 1m（分钟线）也不会冲突
+            safe = ''.join(c if c.isdigit() or ('a' <= c <= 'z') else f"~{ord(c):x}" for c in variant)
+            name = f"{name}@{safe}"
+        return os.path.join(self.data_dir, '.cache', subdir, name)
+    
+    def _read_frame_cache(self, cache_base: str, mtime_ns: int) -> Optional[pd.DataFrame]:
+        """
+        读取 Parquet 缓存（{cache_base}.parquet 与 {cache_base}.meta.json），源文件修改时间不一致或读取失败时返回 None
+        
+        Args:
+            cache_base: 缓存路径前缀
+            mtime_ns: 源CSV修改时间（纳秒）
+            
+        Returns:
+            Optional[DataFrame]: 缓存的数据
+        """
+        meta_path = f"{cache_base}.meta.json"
+        if not _HAS_PYARROW or not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # 缓存内容已在写入前完成预处理与数据校验，命中时不再重复校验；预处理/校验/聚合逻辑变更后版本号不同，视为未命中
+            if meta.get('mtime_ns') != mtime_ns or meta.get('version') != _FRAME_CACHE_VERSION:
+                return None
+            df = pd.read_parquet(f"{cache_base}.parquet", engine='pyarrow')
+            # 按记录的列类型还原（Parquet 往返可能改变时间戳精度等），与直接解析CSV的结果一致
+            for col, dtype in (meta.get('dtypes') or {}).items():
+                if col in df.columns and str(df[col].dtype) != dtype:
+                    df[col] = df[col].astype(dtype)
+            return df
+        except Exception as e:
+            logger.warning(f"数据缓存读取失败，重新解析CSV: {e}")
+            return None
+    
+    def _write_frame_cache(self, cache_base: str, mtime_ns: int, df: pd.DataFrame) -> None:
+        """
+        写入 Parquet 缓存：先写临时文件再替换（数据先于元数据），避免并发读取到写了一半的缓存
+        
+        Args:
+            cache_base: 缓存路径前缀
+            mtime_ns: 源CSV修改时间（纳秒）
+            df: 要缓存的数据
+        """
+        if not _HAS_PYARROW:
+            return
+        data_path = f"{cache_base}.parquet"
+        meta_path = f"{cache_base}.meta.json"
+        try:
+            os.makedirs(os.path.dirname(cache_base), exist_ok=True)
+            tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            df.to_parquet(data_path + tmp_suffix, engine='pyarrow', compression='zstd')
+            os.replace(data_path + tmp_suffix, data_path)
+            with open(meta_path + tmp_suffix, 'w', encoding='utf-8') as f:
+                json.dump({'mtime_ns': mtime_ns, 'version': _FRAME_CACHE_VERSION, 'dtypes': {str(c): str(t) for c, t in df.dtypes.items()}}, f)
+            os.replace(meta_path + tmp_suffix, meta_path)
+        except Exception as e:
+            logger.warning(f"数据缓存写入失败: {e}")
+    
+    def _load_preprocessed(self, filepath: str, mtime_ns: Optional[int] = None) -> pd.DataFrame:
+        """
+        读取预处理后的完整数据：优先 Parquet 缓存（跳过CSV解析与 _preprocess_data），未命中时解析后写入缓存
+        
+        Args:
+            filepath: CSV文件路径
+            mtime_ns: 源CSV修改时间（纳秒），None 时自行读取
+            
+        Returns:
+            DataFrame: 预处理后的DataFrame（按时间升序，已通过数据校验）
+        """
+        if mtime_ns is None:
+            mtime_ns = os.stat(filepath).st_mtime_ns
+        cache_base = self._frame_cache_base(filepath)
+        df = self._read_frame_cache(cache_base, mtime_ns)
+        if df is None:
+            df = self._preprocess_data(self._read_csv(filepath))
+            self._write_frame_cache(cache_base, mtime_ns, df)
+        return df
+    
+    def _read_csv(self, filepath: str) -> pd.DataFrame:
+        """
+        读取CSV文件：优先用 pyarrow.csv 多线程解析（价格列固定为 float64，不做类型推断），
+        不可用或解析失败（如价格列含非数值）时回退到默认C引擎
+        
+        Args:
+            filepath: CSV文件路径
+            
+        Returns:
+            DataFrame: 原始数据
+        """
+        if _HAS_PYARROW:
+            try:
+                table = pacsv.read_csv(
+                    filepath,
+                    read_options=pacsv.ReadOptions(block_size=8 << 20),
+                    convert_options=_PRICE_CONVERT_OPTIONS,
+                )
+                df = table.to_pandas(self_destruct=True)
+                # pyarrow 推断的时间列为秒级 datetime64[s]，统一为纳秒精度（与 pd.to_datetime 的结果一致），
+                # 原始分钟线及由其派生的列（如小时线的 grp）不会带出秒级精度
+                for col in df.columns:
+                    if pd.api.types.is_datetime64_any_dtype(df[col].dtype) and df[col].dt.unit != 'ns':
+                        df[col] = df[col].dt.as_unit('ns')
+                return df
+            except Exception as e:
+                logger.warning(f"pyarrow 解析失败，回退到C引擎: {e}")
+        return pd.read_csv(filepath, memory_map=True)
+    
     def _preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         数据预处理
@@ -164,27 +823,30 @@ class StockDataLoader:
             'amount': 'amount'
         }
         
-        # 重命名列
-        df = df.rename(columns=column_mapping)
+        # 重命名列（只改列标签，不复制数据）
+        df = df.rename(columns=column_mapping, copy=False)
         
         # 确保时间列存在
         if 'timestamp' not in df.columns:
             raise ValueError("数据文件必须包含 'timestamp' 列")
         
-        # 转换时间格式
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # 转换时间格式（pyarrow 解析的列已是 datetime64，跳过重复转换）
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
         
-        # 确保数值列为float类型
+        # 确保数值列为数值类型（已是数值类型的列跳过）
         numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'amount']
         for col in numeric_columns:
-            if col in df.columns:
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        # 删除包含NaN的行
-        df = df.dropna()
+        # 删除包含NaN的行（没有缺失值时不生成副本）
+        if df.isna().to_numpy().any():
+            df = df.dropna()
         
-        # 按时间排序
-        df = df.sort_values('timestamp').reset_index(drop=True)
+        # 按时间排序（时间戳已严格递增时跳过排序），重置为从0开始的行号索引
+        df = self._sorted_by_time(df)
+        df.index = pd.RangeIndex(len(df))
         
         # 验证数据完整性
         self._validate_data(df)
@@ -204,25 +866,33 @@ class StockDataLoader:
         if missing_columns:
             raise ValueError(f"缺少必要的列: {missing_columns}")
         
-        # 检查价格数据的合理性
-        if (df['high'] < df['low']).any():
-            raise ValueError("存在 high < low 的数据")
-        
-        if (df['close'] > df['high']).any() or (df['close'] < df['low']).any():
-            raise ValueError("存在 close 超出 [low, high] 范围的数据")
-        
-        if (df['open'] > df['high']).any() or (df['open'] < df['low']).any():
-            raise ValueError("存在 open 超出 [low, high] 范围的数据")
-        
-        # 检查成交量
-        if (df['volume'] < 0).any():
+        # 检查价格与成交量的合理性：各列只取一次底层数组，全部条件在同一个布尔掩码上原地合并，
+        # 数据正常时只做一次 any()；存在异常时才逐项判断以给出具体的错误信息
+        o = df['open'].to_numpy()
+        h = df['high'].to_numpy()
+        l = df['low'].to_numpy()
+        c = df['close'].to_numpy()
+        v = df['volume'].to_numpy()
+        bad = h < l
+        bad |= c > h
+        bad |= c < l
+        bad |= o > h
+        bad |= o < l
+        bad |= v < 0
+        if bad.any():
+            if (h < l).any():
+                raise ValueError("存在 high < low 的数据")
+            if (c > h).any() or (c < l).any():
+                raise ValueError("存在 close 超出 [low, high] 范围的数据")
+            if (o > h).any() or (o < l).any():
+                raise ValueError("存在 open 超出 [low, high] 范围的数据")
             raise ValueError("存在负成交量数据")
         
-        logger.info("数据验证通过")
+        logger.debug("数据验证通过")
     
     def _filter_by_timeframe(self, df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
         """
-        根据时间周期过滤数据
+        根据时间周期过滤数据（各周期的聚合函数在初始化时绑定到 _tf_handlers，这里只做一次查表）
         
         Args:
             df: DataFrame
@@ -231,88 +901,74 @@ class StockDataLoader:
         Returns:
             DataFrame: 过滤后的DataFrame
         """
-        # 对常见周期统一基于聚合，确保1w/1d等周期正确处理
-
-        # 日线与周线采用“组内最后一根K线的时间戳”，避免边界偏移
-        if timeframe in ("1d", "1w"):
-            dfx = df.copy().sort_values('timestamp')
-            if timeframe == "1d":
-                grp_key = dfx['timestamp'].dt.date
-            else:
-                # 使用以周五收盘为周期的分组
-                grp_key = dfx['timestamp'].dt.to_period('W-FRI')
-
-            def _agg(group):
-                out = {
-                    'timestamp': group['timestamp'].max(),
-                    'open': group['open'].iloc[0],
-                    'high': group['high'].max(),
-                    'low': group['low'].min(),
-                    'close': group['close'].iloc[-1],
-                    'volume': group['volume'].sum(),
-                }
-                if 'amount' in group.columns:
-                    out['amount'] = group['amount'].sum()
-                return pd.Series(out)
-
-            agg_df = dfx.groupby(grp_key, as_index=False).apply(_agg)
-            # 丢弃OHLC为NaN的行，避免amount缺失导致删除
-            agg_df = agg_df.dropna(subset=['open', 'high', 'low', 'close'])
-            # 确保类型正确
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                agg_df[col] = pd.to_numeric(agg_df[col], errors='coerce')
-            if 'amount' in agg_df.columns:
-                agg_df['amount'] = pd.to_numeric(agg_df['amount'], errors='coerce')
-            agg_df = agg_df.sort_values('timestamp').reset_index(drop=True)
-            return agg_df
-
-        # 小时与4小时采用floor分组并取组内最后一根K线时间戳（与旧逻辑一致）
-        if timeframe in ("1h", "4h"):
-            dfx = df.copy().sort_values('timestamp')
-            freq = 'H' if timeframe == '1h' else '4H'
-            dfx['grp'] = dfx['timestamp'].dt.floor(freq)
-
-            def _agg_h(group):
-                out = {
-                    'timestamp': group['timestamp'].max(),
-                    'open': group['open'].iloc[0],
-                    'high': group['high'].max(),
-                    'low': group['low'].min(),
-                    'close': group['close'].iloc[-1],
-                    'volume': group['volume'].sum(),
-                }
-                if 'amount' in group.columns:
-                    out['amount'] = group['amount'].sum()
-                return pd.Series(out)
-
-            agg_df = dfx.groupby('grp', as_index=False).apply(_agg_h)
-            agg_df = agg_df.dropna(subset=['open', 'high', 'low', 'close'])
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                agg_df[col] = pd.to_numeric(agg_df[col], errors='coerce')
-            if 'amount' in agg_df.columns:
-                agg_df['amount'] = pd.to_numeric(agg_df['amount'], errors='coerce')
-            agg_df = agg_df.sort_values('timestamp').reset_index(drop=True)
-            return agg_df
-
-        # 其它周期采用resample
-        rule_map = {
-            "1m": "T",
-            "5m": "5T",
-            "15m": "15T",
-            "30m": "30T",
-            "1h": "H",
-            "4h": "4H",
-            "1d": "D",
-            "1w": "W-FRI",
-            "1M": "M",
-        }
-
-        rule = rule_map.get(timeframe)
-        if not rule:
+        handler = self._tf_handlers.get(timeframe)
+        if handler is None:
             # 未知周期，保持原样
             return df
-
-        df_res = df.copy().sort_values('timestamp').set_index('timestamp')
+        return handler(df)
+    
+    def _agg_daily(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        日线聚合：按自然日分组，采用“组内最后一根K线的时间戳”，避免边界偏移
+        
+        Args:
+            df: DataFrame
+            
+        Returns:
+            DataFrame: 日线
+        """
+        dfx = self._sorted_by_time(df)
+        # 用 datetime64[D] 的整数天序号作为分组键，不生成逐行的 date 对象
+        # （带时区时先转为当地时间，与按 .dt.date 分组一致）
+        ts = dfx['timestamp']
+        if ts.dt.tz is not None:
+            ts = ts.dt.tz_localize(None)
+        grp_key = ts.to_numpy().astype('datetime64[D]').view(np.int64)
+        return self._finalize_bars(self._agg_segments(dfx, grp_key))
+    
+    def _agg_weekly(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        周线聚合：按以周五收盘为周期的自然周分组，采用“组内最后一根K线的时间戳”
+        
+        Args:
+            df: DataFrame
+            
+        Returns:
+            DataFrame: 周线
+        """
+        dfx = self._sorted_by_time(df)
+        # 周期序号（整数）作为分组键
+        grp_key = dfx['timestamp'].dt.to_period('W-FRI').array.asi8
+        return self._finalize_bars(self._agg_segments(dfx, grp_key))
+    
+    def _agg_hourly(self, df: pd.DataFrame, freq: str) -> pd.DataFrame:
+        """
+        小时与4小时聚合：floor 分组并取组内最后一根K线时间戳（与旧逻辑一致，保留分组列 grp）
+        
+        Args:
+            df: DataFrame
+            freq: floor 频率（"H" 或 "4H"）
+            
+        Returns:
+            DataFrame: 小时线
+        """
+        dfx = self._sorted_by_time(df)
+        grp = dfx['timestamp'].dt.floor(freq)
+        return self._finalize_bars(self._agg_segments(dfx, grp.array.asi8, grp=grp))
+    
+    def _resample_bars(self, df: pd.DataFrame, rule: str) -> pd.DataFrame:
+        """
+        其它周期采用 resample（右闭右标签）
+        
+        Args:
+            df: DataFrame
+            rule: resample 规则
+            
+        Returns:
+            DataFrame: 重采样后的K线
+        """
+        # set_index 本身返回新对象，不再先整表复制
+        df_res = self._sorted_by_time(df).set_index('timestamp')
         agg_dict = {
             'open': 'first',
             'high': 'max',
@@ -327,6 +983,97 @@ class StockDataLoader:
         out = out.dropna(subset=['open', 'high', 'low', 'close']).reset_index()
         return out
     
+    @staticmethod
+    def _sorted_by_time(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        按时间升序返回数据：_preprocess_data 的输出已按时间排序，时间戳严格递增时直接返回原对象（不复制），
+        否则（含重复时间戳）仍按 sort_values 排序，保持与原先一致的组内顺序
+        
+        Args:
+            df: DataFrame
+            
+        Returns:
+            DataFrame: 按时间升序的数据（可能与输入为同一对象，调用方不要原地修改）
+        """
+        ts = df['timestamp'].to_numpy()
+        if len(ts) < 2 or bool((ts[1:] > ts[:-1]).all()):
+            return df
+        return df.sort_values('timestamp')
+    
+    def _agg_segments(self, dfx: pd.DataFrame, key: np.ndarray, grp: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        按时间升序数据上单调不减的整数分组键聚合K线：同一组在数组中连续，由键变化的位置得到各组的起止下标，
+        开/收取首尾元素，高/低/量/额用 ufunc.reduceat 一次归约（整段数组只遍历一遍，不按组调用 Python）
+        
+        Args:
+            dfx: 按时间升序的DataFrame
+            key: 与 dfx 等长的分组键（int64，单调不减）
+            grp: 可选的分组值列（小时线保留为输出的第一列 grp）
+            
+        Returns:
+            DataFrame: 每组一行（timestamp 为组内最后一根K线的时间戳），空数据时按 groupby 聚合得到空结果
+        """
+        n = len(dfx)
+        if n == 0:
+            if grp is not None:
+                return dfx.assign(grp=grp).groupby('grp', as_index=False).agg(**self._bar_agg_spec(dfx))
+            return dfx.groupby(key).agg(**self._bar_agg_spec(dfx)).reset_index(drop=True)
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        ends = np.r_[starts[1:], n] - 1
+        cols: Dict[str, Any] = {}
+        if grp is not None:
+            cols['grp'] = grp.iloc[starts].reset_index(drop=True)
+        # 数据按时间升序，组内最后一根即最大时间戳
+        cols['timestamp'] = dfx['timestamp'].iloc[ends].reset_index(drop=True)
+        cols['open'] = dfx['open'].to_numpy()[starts]
+        cols['high'] = np.maximum.reduceat(dfx['high'].to_numpy(), starts)
+        cols['low'] = np.minimum.reduceat(dfx['low'].to_numpy(), starts)
+        cols['close'] = dfx['close'].to_numpy()[ends]
+        cols['volume'] = np.add.reduceat(dfx['volume'].to_numpy(), starts)
+        if 'amount' in dfx.columns:
+            cols['amount'] = np.add.reduceat(dfx['amount'].to_numpy(), starts)
+        return pd.DataFrame(cols)
+    
+    @staticmethod
+    def _bar_agg_spec(df: pd.DataFrame) -> Dict[str, Tuple[str, str]]:
+        """
+        K线聚合的命名聚合规则：组内最后时间戳、首开、最高、最低、尾收、量额求和
+        
+        以 groupby.agg 的内置归约一次完成全部分组，不再逐组调用 Python 函数构造 Series
+        
+        Args:
+            df: 按时间升序的DataFrame
+            
+        Returns:
+            Dict: 传给 groupby(...).agg(**spec) 的命名聚合
+        """
+        spec = {
+            'timestamp': ('timestamp', 'max'),
+            'open': ('open', 'first'),
+            'high': ('high', 'max'),
+            'low': ('low', 'min'),
+            'close': ('close', 'last'),
+            'volume': ('volume', 'sum'),
+        }
+        if 'amount' in df.columns:
+            spec['amount'] = ('amount', 'sum')
+        return spec
+    
+    @staticmethod
+    def _finalize_bars(agg_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        聚合后处理：时间戳统一为纳秒精度，丢弃OHLC为NaN的行（避免amount缺失导致删除），按时间排序
+        
+        Args:
+            agg_df: 聚合结果
+            
+        Returns:
+            DataFrame: 处理后的K线
+        """
+        agg_df['timestamp'] = agg_df['timestamp'].dt.as_unit('ns')
+        agg_df = agg_df.dropna(subset=['open', 'high', 'low', 'close'])
+        return agg_df.sort_values('timestamp').reset_index(drop=True)
+    
     def get_data_info(self, symbol: str) -> Dict[str, Any]:
         """
         获取数据信息
@@ -361,6 +1108,35 @@ class StockDataLoader:
         self.cache.clear()
         logger.info("数据缓存已清空")
 
+    def invalidate(self, symbol: str) -> int:
+        """
+        仅清除指定股票的缓存（所有周期与截止日期）
+        
+        Args:
+            symbol: 股票代码
+            
+        Returns:
+            int: 被清除的缓存条目数
+        """
+        return self.cache.invalidate_prefix(f"{symbol}_")
+
+    def invalidate_many(self, symbols: List[str]) -> int:
+        """
+        批量清除多只股票的缓存，其余股票的缓存保持不变
+        
+        Args:
+            symbols: 股票代码列表
+            
+        Returns:
+            int: 被清除的缓存条目数
+        """
+        prefixes = tuple(f"{s}_" for s in symbols if s)
+        if not prefixes:
+            return 0
+        removed = self.cache.invalidate_prefix(prefixes)
+        logger.info(f"已清除 {removed} 条缓存（{len(prefixes)} 只股票）")
+        return removed
+
     def list_symbols(self) -> List[Dict[str, Any]]:
         """
         列出 data 目录、data/stocks 及 data/features 下的可用CSV数据源
@@ -368,43 +1144,16 @@ class StockDataLoader:
         """
         entries: List[Dict[str, Any]] = []
         try:
-            stock_dir = self.data_dir
-            stocks_subdir = os.path.join(self.data_dir, 'stocks')
-            futures_dir = os.path.join(self.data_dir, 'features')
-
-            all_files: List[str] = []
-            if os.path.isdir(stock_dir):
-                all_files.extend([os.path.join(stock_dir, f) for f in os.listdir(stock_dir) if f.lower().endswith('.csv')])
-            if os.path.isdir(stocks_subdir):
-                # 只检查 stocks 目录下的直接文件（不再使用子目录）
-                all_files.extend([os.path.join(stocks_subdir, f) for f in os.listdir(stocks_subdir) if f.lower().endswith('.csv')])
-            if os.path.isdir(futures_dir):
-                all_files.extend([os.path.join(futures_dir, f) for f in os.listdir(futures_dir) if f.lower().endswith('.csv')])
+            # data 目录、stocks/ 与 features/ 下的直接文件（目录列表按修改时间缓存）
+            all_files: List[str] = [os.path.join(d, f) for d, files in self._csv_listing() for f in files]
 
             for fullpath in all_files:
                 f = os.path.basename(fullpath)
                 if not f.lower().endswith('.csv'):
                     continue
-                symbol = None
-                name = os.path.splitext(f)[0]
                 dir_name = os.path.basename(os.path.dirname(fullpath))
                 kind = 'futures' if dir_name == 'features' else 'stock'
-                base = os.path.splitext(f)[0]
-
-                if '-' in base:
-                    # 股票命名：中文名-代码
-                    parts = base.split('-')
-                    symbol = parts[-1]
-                    name = '-'.join(parts[:-1]) or symbol
-                else:
-                    # 期货命名：合约_中文名 或 仅合约
-                    if '_' in base:
-                        parts = base.split('_')
-                        symbol = parts[0]
-                        name = parts[1] if len(parts) > 1 else parts[0]
-                    else:
-                        symbol = base
-                        name = base
+                symbol, name = self._parse_csv_name(f)
 
                 entries.append({
                     'symbol': symbol,
@@ -434,6 +1183,67 @@ def load_stock_data(symbol: str, timeframe: str = "5m", end_date: Optional[str]
     """
     return data_loader.load_stock_data(symbol, timeframe, end_date)
 
+# 子进程内的数据加载器（按数据目录复用，供进程池任务使用）
+_worker_loaders: Dict[str, StockDataLoader] = {}
+
+def _get_worker_loader(data_dir: str) -> StockDataLoader:
+    """取得子进程内对应数据目录的加载器（首次调用时创建）"""
+    loader = _worker_loaders.get(data_dir)
+    if loader is None:
+        loader = _worker_loaders[data_dir] = StockDataLoader(data_dir)
+    return loader
+
+def load_close_arrays_worker(data_dir: str, symbol: str, timeframe: str = "1d", end_date: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    在子进程内加载收盘价数组（命中磁盘缓存或解析CSV并写入缓存），供在子进程内直接使用数组的任务调用
+    
+    返回值经进程池回传时会被序列化复制（memmap 切片同样如此），需要把数组交回主进程时
+    使用 prepare_close_arrays_worker
+    
+    Args:
+        data_dir: 数据目录（与主进程的加载器一致）
+        symbol: 股票代码
+        timeframe: 时间周期
+        end_date: 截止日期（格式：YYYY-MM-DD），None表示不过滤
+        
+    Returns:
+        Dict: 同 StockDataLoader.load_close_arrays
+    """
+    loader = _get_worker_loader(data_dir)
+    try:
+        return loader.load_close_arrays(symbol, timeframe, end_date)
+    finally:
+        # 子进程只需返回数组，不保留 DataFrame 内存缓存
+        loader.cache.clear()
+
+def prepare_close_arrays_worker(data_dir: str, symbol: str, timeframe: str = "1d",
+                                end_date: Optional[str] = None) -> Union[str, Dict[str, np.ndarray]]:
+    """
+    进程池任务：在子进程中完成CSV解析与周期聚合并写入收盘价缓存，只回传缓存路径，
+    主进程用 StockDataLoader.open_close_cache 以 np.memmap 映射同一文件，数组不经序列化复制
+    
+    该周期带截止日期无法由完整序列截断（不写磁盘缓存）或缓存写入失败时，回传数组本身
+    
+    Args:
+        data_dir: 数据目录（与主进程的加载器一致）
+        symbol: 股票代码
+        timeframe: 时间周期
+        end_date: 截止日期（格式：YYYY-MM-DD），None表示不过滤
+        
+    Returns:
+        Union[str, Dict]: 缓存路径前缀，或同 StockDataLoader.load_close_arrays 的数组字典
+    """
+    loader = _get_worker_loader(data_dir)
+    try:
+        if not end_date or timeframe in _END_CUT_TIMEFRAMES:
+            arrays, tz, cache_base = loader._full_close_arrays(symbol, timeframe)
+            if cache_base is not None:
+                return cache_base
+            return loader._cut_close_arrays(arrays, tz, end_date)
+        return loader.load_close_arrays(symbol, timeframe, end_date)
+    finally:
+        loader.cache.clear()
+
 def get_data_info(symbol: str) -> Dict[str, Any]:
     """
     便捷函数：获取数据信息
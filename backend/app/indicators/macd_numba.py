@@ -0,0 +1,233 @@
+"""
+MACD 标量递推内核
+单次遍历收盘价序列，以三个 EMA 状态变量递推得到筛选所需的 MACD 末值。
+递推式与 pandas ewm(span=..., adjust=False).mean() 逐位一致（相同的 alpha 与归一化步骤，
+首个 EMA 取首根收盘价），阈值比较的结果与 pandas 计算完全相同。
+安装 numba（见 requirements.txt）时使用 JIT 编译；缺失时单只股票改用 pandas ewm，
+面板改为按时间步对全部股票做向量递推（结果一致），不会退化为逐根K线的纯 Python 循环。
+"""
+
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+
+def _ewm_alpha(span: int) -> float:
+    """与 pandas 相同的平滑系数：com = (span - 1) / 2，alpha = 1 / (1 + com)"""
+    return 1.0 / (1.0 + (span - 1.0) / 2.0)
+
+
+def _ewm_update(prev: float, cur: float, alpha: float) -> float:
+    """
+    EMA 单步递推（与 pandas adjust=False 的实现相同：先加权再除以权重和，值不变时跳过）
+
+    不能化简为 prev + alpha * (cur - prev)，否则末位舍入与 pandas 不同
+    """
+    if prev != cur:
+        keep = 1.0 - alpha
+        prev = (keep * prev + alpha * cur) / (keep + alpha)
+    return prev
+
+
+def _macd_last_loop(close: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[float, float, float]:
+    """
+    计算 MACD 最后两根柱状图与最后一根 DIF
+
+    Args:
+        close: float64 收盘价数组（不含 NaN）
+        fast: 快线周期
+        slow: 慢线周期
+        signal: 信号线周期
+
+    Returns:
+        (hist_last, hist_prev, dif_last)；数组为空时均为 NaN，只有一根时 hist_prev 为 NaN
+    """
+    n = close.shape[0]
+    if n == 0:
+        return np.nan, np.nan, np.nan
+    alpha_f = _ewm_alpha(fast)
+    alpha_s = _ewm_alpha(slow)
+    alpha_g = _ewm_alpha(signal)
+    ef = close[0]
+    es = close[0]
+    dif = 0.0
+    dea = 0.0
+    prev_hist = np.nan
+    last_hist = 0.0
+    for i in range(1, n):
+        ef = _ewm_update(ef, close[i], alpha_f)
+        es = _ewm_update(es, close[i], alpha_s)
+        dif = ef - es
+        dea = _ewm_update(dea, dif, alpha_g)
+        prev_hist = last_hist
+        last_hist = dif - dea
+    return last_hist, prev_hist, dif
+
+
+def _macd_first_rise_loop(close: np.ndarray, fast: int, slow: int, signal: int) -> bool:
+    """
+    单次遍历判断“第一次主升段”：MACD 柱状图最近一次由 <=0 转为 >0（绿转红）之后，
+    每根K线收盘价都严格高于前一根，且转红之后至少还有一根K线
+
+    Returns:
+        是否满足条件
+    """
+    n = close.shape[0]
+    if n < 3:
+        return False
+    alpha_f = _ewm_alpha(fast)
+    alpha_s = _ewm_alpha(slow)
+    alpha_g = _ewm_alpha(signal)
+    ef = close[0]
+    es = close[0]
+    dea = 0.0
+    prev_hist = 0.0
+    last_cross = -1  # 最近一次转红的位置
+    last_drop = 0  # 最近一次收盘价未上涨（close[i] <= close[i-1]）的位置，0 表示没有
+    for i in range(1, n):
+        ef = _ewm_update(ef, close[i], alpha_f)
+        es = _ewm_update(es, close[i], alpha_s)
+        dif = ef - es
+        dea = _ewm_update(dea, dif, alpha_g)
+        hist = dif - dea
+        if prev_hist <= 0.0 and hist > 0.0:
+            last_cross = i
+        if close[i] <= close[i - 1]:
+            last_drop = i
+        prev_hist = hist
+    return last_cross >= 0 and last_cross < n - 1 and last_drop <= last_cross
+
+
+def _macd_panel_loop(panel: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    对 (N, T) 收盘价面板逐行计算 MACD 末值（各行之间并行）
+
+    每行为一只股票的收盘价，右对齐、左侧以 NaN 填充；每行从首个非 NaN 值开始递推，
+    结果与逐行调用 macd_last 一致。全为 NaN 的行输出 NaN。
+
+    Returns:
+        (hist_last, hist_prev, dif_last) 三个长度为 N 的 float64 数组
+    """
+    n_rows = panel.shape[0]
+    n_cols = panel.shape[1]
+    hist_last = np.full(n_rows, np.nan)
+    hist_prev = np.full(n_rows, np.nan)
+    dif_last = np.full(n_rows, np.nan)
+    alpha_f = _ewm_alpha(fast)
+    alpha_s = _ewm_alpha(slow)
+    alpha_g = _ewm_alpha(signal)
+    for r in prange(n_rows):
+        start = 0
+        while start < n_cols and np.isnan(panel[r, start]):
+            start += 1
+        if start >= n_cols:
+            continue
+        ef = panel[r, start]
+        es = panel[r, start]
+        dif = 0.0
+        dea = 0.0
+        prev_hist = np.nan
+        last_hist = 0.0
+        for i in range(start + 1, n_cols):
+            ef = _ewm_update(ef, panel[r, i], alpha_f)
+            es = _ewm_update(es, panel[r, i], alpha_s)
+            dif = ef - es
+            dea = _ewm_update(dea, dif, alpha_g)
+            prev_hist = last_hist
+            last_hist = dif - dea
+        hist_last[r] = last_hist
+        hist_prev[r] = prev_hist
+        dif_last[r] = dif
+    return hist_last, hist_prev, dif_last
+
+
+def _macd_hist_pandas(close: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    pandas ewm 向量化计算完整的 DIF 与柱状图序列（numba 缺失时的实现）
+
+    Returns:
+        (dif, hist) 两个与 close 等长的 float64 数组
+    """
+    closes = pd.Series(close, dtype=np.float64)
+    dif = closes.ewm(span=fast, adjust=False).mean() - closes.ewm(span=slow, adjust=False).mean()
+    dea = dif.ewm(span=signal, adjust=False).mean()
+    return dif.to_numpy(), (dif - dea).to_numpy()
+
+
+def _macd_last_pandas(close: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[float, float, float]:
+    """macd_last 的 pandas 实现（返回值约定相同）"""
+    n = close.shape[0]
+    if n == 0:
+        return np.nan, np.nan, np.nan
+    dif, hist = _macd_hist_pandas(close, fast, slow, signal)
+    return float(hist[-1]), (float(hist[-2]) if n > 1 else np.nan), float(dif[-1])
+
+
+def _macd_first_rise_pandas(close: np.ndarray, fast: int, slow: int, signal: int) -> bool:
+    """macd_first_rise 的 pandas/NumPy 实现：由整条柱状图序列一次比较找出最近的转红与未上涨位置"""
+    n = close.shape[0]
+    if n < 3:
+        return False
+    _, hist = _macd_hist_pandas(close, fast, slow, signal)
+    crosses = np.flatnonzero((hist[:-1] <= 0.0) & (hist[1:] > 0.0))
+    drops = np.flatnonzero(close[1:] <= close[:-1])
+    if len(crosses) == 0:
+        return False
+    last_cross = int(crosses[-1]) + 1
+    last_drop = int(drops[-1]) + 1 if len(drops) else 0
+    return last_cross < n - 1 and last_drop <= last_cross
+
+
+def _ewm_update_vec(prev: np.ndarray, cur: np.ndarray, alpha: float) -> np.ndarray:
+    """_ewm_update 的向量版本：prev 为 NaN（尚未开始递推）时取 cur，其余与标量递推逐位一致"""
+    keep = 1.0 - alpha
+    updated = (keep * prev + alpha * cur) / (keep + alpha)
+    return np.where(np.isnan(prev), cur, np.where(prev != cur, updated, prev))
+
+
+def _macd_panel_numpy(panel: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    macd_panel 的 NumPy 实现（返回值约定相同）：沿时间方向逐列递推，每一步对全部股票做一次向量运算，
+    循环次数为面板列数而非 股票数 x K线数
+    """
+    n_rows, n_cols = panel.shape
+    if n_cols == 0:
+        return np.full(n_rows, np.nan), np.full(n_rows, np.nan), np.full(n_rows, np.nan)
+    alpha_f = _ewm_alpha(fast)
+    alpha_s = _ewm_alpha(slow)
+    alpha_g = _ewm_alpha(signal)
+    ef = panel[:, 0].copy()
+    es = ef.copy()
+    dif = ef - es
+    dea = dif.copy()
+    hist_prev = np.full(n_rows, np.nan)
+    hist_last = dif - dea
+    for i in range(1, n_cols):
+        cur = panel[:, i]
+        ef = _ewm_update_vec(ef, cur, alpha_f)
+        es = _ewm_update_vec(es, cur, alpha_s)
+        dif = ef - es
+        dea = _ewm_update_vec(dea, dif, alpha_g)
+        hist_prev = hist_last
+        hist_last = dif - dea
+    return hist_last, hist_prev, dif
+
+
+if HAS_NUMBA:
+    # 递推函数在首次调用时编译，内核内部调用的 _ewm_alpha/_ewm_update 也需为 JIT 版本
+    _ewm_alpha = njit(cache=True)(_ewm_alpha)
+    _ewm_update = njit(cache=True)(_ewm_update)
+    macd_last = njit(cache=True)(_macd_last_loop)
+    macd_first_rise = njit(cache=True)(_macd_first_rise_loop)
+    macd_panel = njit(cache=True, parallel=True)(_macd_panel_loop)
+else:
+    macd_last = _macd_last_pandas
+    macd_first_rise = _macd_first_rise_pandas
+    macd_panel = _macd_panel_numpy
@@ -0,0 +1,69 @@
+"""
+价格走势汇总统计内核
+逐日涨跌数量、均值等按列的统计直接用 NumPy 归约完成；这里只保留依赖逐日顺序的部分：
+对 (股票数, 天数) 涨跌幅矩阵（缺失为 NaN）逐行递推每只股票的最佳持仓天数与最大连续上涨天数。
+安装 numba 时使用 JIT 编译并行执行，否则退化为纯 Python 循环（结果一致）。
+"""
+
+from typing import Tuple
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """numba 缺失时的空装饰器"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+
+@njit(cache=True, parallel=True)
+def trend_streaks(cp: np.ndarray, dcp: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    逐只股票计算最佳持仓天数与最大连续上涨天数（依赖逐日顺序的状态递推，无法用列归约表达）
+
+    Args:
+        cp: (N, D) float64，第 i 只股票第 d+1 天相对基准的涨跌幅，缺失为 NaN
+        dcp: (N, D) float64，第 i 只股票第 d+1 天相对前一天的涨跌幅，缺失为 NaN
+
+    Returns:
+        (best_days, max_consecutive)：best_days 为每只股票收益最高的天数（从1开始，持平取最早一天），
+        无数据为 0；max_consecutive 为每只股票的最大连续上涨天数（当天涨跌 <= 0 时清零）
+    """
+    n = cp.shape[0]
+    m = cp.shape[1]
+    best_days = np.zeros(n, dtype=np.int64)
+    max_consecutive = np.zeros(n, dtype=np.int64)
+    for i in prange(n):
+        best_day = 0
+        best_value = 0.0
+        current = 0
+        longest = 0
+        for d in range(m):
+            v = cp[i, d]
+            if np.isnan(v):
+                continue
+            if best_day == 0:
+                # 以第一条数据为初始最佳（对应天数按第1天计）
+                best_day = 1
+                best_value = v
+            elif v > best_value:
+                best_value = v
+                best_day = d + 1
+            dv = dcp[i, d]
+            if np.isnan(dv):
+                continue
+            if dv > 0.0:
+                current += 1
+                if current > longest:
+                    longest = current
+            else:
+                current = 0
+        best_days[i] = best_day
+        max_consecutive[i] = longest
+    return best_days, max_consecutive
@@ -1,16 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
-from .api.backtest import router as backtest_router
+from .api.backtest import router as backtest_router, sweep_tasks_forever, shutdown_task_executors
 from .api.common_features import router as common_features_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时执行
     print("TestBack API 启动中...")
+    # 后台定期清理过期的筛选任务，避免内存无限增长
+    sweeper = asyncio.create_task(sweep_tasks_forever())
     yield
     # 关闭时执行
+    sweeper.cancel()
+    # 释放最佳股票评分的任务线程与进程池
+    shutdown_task_executors()
     print("TestBack API 关闭中...")
 
 app = FastAPI(
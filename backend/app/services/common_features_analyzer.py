@@ -12,6 +12,20 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _rows_until(df: pd.DataFrame, cutoff: pd.Timestamp) -> pd.DataFrame:
+    """
+    取时间戳 <= cutoff 的行（df 按时间升序）：datetime64 上二分查找后按位置切片，不生成整列布尔掩码
+    
+    Args:
+        df: 按时间升序的K线数据
+        cutoff: 截止时间（含）
+        
+    Returns:
+        DataFrame: 前缀切片（保留原索引）
+    """
+    return df.iloc[:int(df['timestamp'].searchsorted(cutoff, side='right'))]
+
+
 class CommonFeaturesAnalyzer:
     """共同特征分析器"""
     
@@ -66,6 +80,10 @@ class CommonFeaturesAnalyzer:
         stock_features = []
         errors = []
         
+        # 先并发预加载各股票的日线/周线（写入加载器缓存），逐只分析时直接命中缓存
+        for timeframe in ('1d', '1w'):
+            self.data_loader.load_many(symbols, timeframe=timeframe, end_date=base_date_str)
+        
         for symbol in symbols:
             try:
                 features = self._analyze_single_stock(
@@ -140,11 +158,10 @@ class CommonFeaturesAnalyzer:
         if daily_df is None or daily_df.empty:
             return None
         
-        # 确保数据按时间排序
-        daily_df = daily_df.sort_values('timestamp').reset_index(drop=True)
+        # 加载器输出的日线/周线已按时间升序（时间戳唯一）且为从0开始的行号索引，直接使用，不再排序复制
         
         # 获取基准日的数据
-        base_data = daily_df[daily_df['timestamp'] <= base_date]
+        base_data = _rows_until(daily_df, base_date)
         if base_data.empty:
             return None
         
@@ -178,8 +195,7 @@ class CommonFeaturesAnalyzer:
         # 2. MACD周线分析
         weekly_df = self.data_loader.load_stock_data(symbol, timeframe='1w', end_date=base_date_str)
         if weekly_df is not None and not weekly_df.empty:
-            weekly_df = weekly_df.sort_values('timestamp').reset_index(drop=True)
-            weekly_data = weekly_df[weekly_df['timestamp'] <= base_date]
+            weekly_data = _rows_until(weekly_df, base_date)
             if not weekly_data.empty:
                 weekly_macd = self._calculate_macd(
                     weekly_data['close'],
@@ -281,7 +297,7 @@ class CommonFeaturesAnalyzer:
     ) -> Optional[Dict[str, Any]]:
         """分析价格与MA均线关系"""
         try:
-            data = df[df['timestamp'] <= base_date]
+            data = _rows_until(df, base_date)
             if len(data) < 120:  # 需要足够数据计算MA120
                 return None
             
@@ -350,7 +366,7 @@ class CommonFeaturesAnalyzer:
     ) -> Optional[Dict[str, Any]]:
         """分析价格位置"""
         try:
-            data = df[df['timestamp'] <= base_date]
+            data = _rows_until(df, base_date)
             if len(data) < lookback_days:
                 return None
             
@@ -405,7 +421,7 @@ class CommonFeaturesAnalyzer:
             if base_volume is None:
                 return None
             
-            data = df[df['timestamp'] <= base_date]
+            data = _rows_until(df, base_date)
             if len(data) < lookback_days:
                 return None
             
@@ -521,7 +537,7 @@ class CommonFeaturesAnalyzer:
     ) -> Optional[Dict[str, Any]]:
         """分析其他量价维度"""
         try:
-            data = df[df['timestamp'] <= base_date]
+            data = _rows_until(df, base_date)
             if len(data) < 20:  # 至少需要20天数据
                 return None
             
@@ -1422,17 +1438,18 @@ class CommonFeaturesAnalyzer:
             try:
                 daily_df = self.data_loader.load_stock_data(symbol, timeframe='1d', end_date=end_date)
                 if daily_df is not None and not daily_df.empty:
-                    daily_df = daily_df.sort_values('timestamp').reset_index(drop=True)
+                    # 加载器输出已按时间升序，无需再排序复制
                     start_dt = pd.to_datetime(start_date)
                     end_dt = pd.to_datetime(end_date)
                     
-                    # 找到开始日期和结束日期的数据
-                    start_data = daily_df[daily_df['timestamp'] >= start_dt]
-                    end_data = daily_df[daily_df['timestamp'] <= end_dt]
+                    # 找到开始日期（含）之后第一条与结束日期（含）之前最后一条数据：时间列升序，二分查找位置
+                    ts = daily_df['timestamp']
+                    start_pos = int(ts.searchsorted(start_dt, side='left'))
+                    end_pos = int(ts.searchsorted(end_dt, side='right')) - 1
                     
-                    if not start_data.empty and not end_data.empty:
-                        start_price = pd.to_numeric(start_data.iloc[0]['close'], errors='coerce')
-                        end_price = pd.to_numeric(end_data.iloc[-1]['close'], errors='coerce')
+                    if start_pos < len(daily_df) and end_pos >= 0:
+                        start_price = pd.to_numeric(daily_df['close'].iloc[start_pos], errors='coerce')
+                        end_price = pd.to_numeric(daily_df['close'].iloc[end_pos], errors='coerce')
                         
                         if pd.notna(start_price) and pd.notna(end_price) and start_price > 0:
                             stock_return = (end_price - start_price) / start_price * 100
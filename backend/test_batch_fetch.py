@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+测试批量获取日K接口对脚本输出的解析与缓存清理（用伪造的脚本输出，不需要启动服务、不联网）
+"""
+
+import sys
+sys.path.append('.')
+
+import asyncio
+import json
+import subprocess
+import tempfile
+from types import SimpleNamespace
+
+import pandas as pd
+
+from app.api import backtest
+from app.data_loader import StockDataLoader
+
+SYMBOLS = ('600000', '6000001', '000001')
+
+
+def _run(stdout: str, use_orjson: bool = True):
+    """
+    以给定 stdout 调用 batch_fetch_daily_data
+
+    Returns:
+        (接口返回值, 调用后仍在内存缓存中的键集合)
+    """
+    def fake_run(cmd, **kwargs):
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout.encode('utf-8'), stderr=b'')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        loader = StockDataLoader(data_dir=tmp)
+        for code in SYMBOLS:
+            for tf in ('1d', '1w'):
+                loader.cache[f'{code}_{tf}_all'] = pd.DataFrame({'close': [1.0]})
+        saved = backtest.subprocess, backtest.data_loader, backtest.orjson
+        backtest.subprocess = SimpleNamespace(run=fake_run, TimeoutExpired=subprocess.TimeoutExpired)
+        backtest.data_loader = loader
+        if not use_orjson:
+            backtest.orjson = None
+        try:
+            out = asyncio.run(backtest.batch_fetch_daily_data({'days': 30}))
+        finally:
+            backtest.subprocess, backtest.data_loader, backtest.orjson = saved
+        return out, set(loader.cache.keys())
+
+
+def test_no_marker_keeps_default_summary():
+    """输出中没有 JSON 标记：返回默认汇总，并整体清空缓存"""
+    print("🔍 测试无JSON标记...")
+    out, keys = _run("开始获取...\n完成\n")
+    assert out['ok'] is True
+    assert out['summary'] == {'ok': 0, 'fail': 0, 'total': 0, 'errors': []}
+    assert keys == set()
+    print("✅ 无JSON标记时返回默认汇总")
+
+
+def test_invalid_json_after_marker():
+    """标记之后不是合法 JSON：返回默认汇总；输出中有完成统计时从文本中提取"""
+    print("🔍 测试标记后JSON无效...")
+    for use_orjson in (True, False):
+        out, keys = _run("开始获取...\n=== JSON RESULT ===\n{'ok': 1,\n", use_orjson)
+        assert out['summary'] == {'ok': 0, 'fail': 0, 'total': 0, 'errors': []}
+        assert keys == set()
+        out, _ = _run("完成: 成功 3, 失败 1, 总计 4\n=== JSON RESULT ===\nnot json\n", use_orjson)
+        assert out['summary'] == {'ok': 3, 'fail': 1, 'total': 4, 'errors': []}
+    print("✅ 标记后JSON无效时回退正确")
+
+
+def test_updated_invalidates_only_listed_symbols():
+    """结果中的 updated 列表只清理这些股票的缓存（按完整代码，不误伤同前缀的代码）；取最后一个标记之后的 JSON"""
+    print("🔍 测试按 updated 清理缓存...")
+    result = {'ok': 1, 'fail': 0, 'total': 1, 'errors': [], 'updated': ['600000']}
+    stdout = ("=== JSON RESULT ===\n这一段是日志中的旧标记\n"
+              "完成: 成功 1, 失败 0, 总计 1\n"
+              f"=== JSON RESULT ===\n{json.dumps(result, ensure_ascii=False)}\n")
+    for use_orjson in (True, False):
+        out, keys = _run(stdout, use_orjson)
+        assert out['summary'] == result
+        assert keys == {f'{code}_{tf}_all' for code in ('6000001', '000001') for tf in ('1d', '1w')}
+        # updated 为空列表时不清理任何缓存
+        out, keys = _run("=== JSON RESULT ===\n" + json.dumps({**result, 'updated': []}), use_orjson)
+        assert len(keys) == 2 * len(SYMBOLS)
+    print("✅ 只清理 updated 中的股票")
+
+
+if __name__ == "__main__":
+    test_no_marker_keeps_default_summary()
+    test_invalid_json_after_marker()
+    test_updated_invalidates_only_listed_symbols()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+测试最佳股票评分（同步接口与后台任务）与原逐只股票实现的输出一致（合成数据，不需要启动服务）
+"""
+
+import sys
+sys.path.append('.')
+
+import asyncio
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.api import backtest
+from app.data_loader import StockDataLoader
+
+START, END = '2024-02-01', '2024-06-28'
+
+
+def _reference_metrics(df: pd.DataFrame, single_day_defaults: bool):
+    """
+    原实现的单只股票指标：逐根K线循环求最大回撤、np.linalg.lstsq 求趋势斜率（未安装 scipy 时的写法）
+
+    Args:
+        df: 区间内按时间升序的日线
+        single_day_defaults: 只有1天数据时是否按默认值计分（后台任务如此，同步接口直接跳过）
+
+    Returns:
+        指标字典；无法计分时为 None
+    """
+    closes = df['close'].values
+    volumes = df['volume'].values
+    if len(closes) < 2 and not single_day_defaults:
+        return None
+    start_price = closes[0]
+    end_price = closes[-1]
+    return_pct = (end_price - start_price) / start_price if start_price > 0 else 0
+    if len(closes) < 2:
+        max_drawdown, volatility, sharpe_ratio, trend_slope, volume_score = 0, 0, 0, 0, 0.5
+    else:
+        peak = start_price
+        max_drawdown = 0
+        for price in closes:
+            if price > peak:
+                peak = price
+            drawdown = (peak - price) / peak if peak > 0 else 0
+            max_drawdown = max(max_drawdown, drawdown)
+        daily_returns = np.diff(closes) / closes[:-1]
+        volatility = np.std(daily_returns) * np.sqrt(252)
+        if np.std(daily_returns) > 0:
+            sharpe_ratio = (np.mean(daily_returns) / np.std(daily_returns)) * np.sqrt(252)
+        else:
+            sharpe_ratio = 0
+        x = np.arange(len(closes))
+        A = np.vstack([x, np.ones(len(x))]).T
+        slope, _ = np.linalg.lstsq(A, closes, rcond=None)[0]
+        trend_slope = slope / start_price if start_price > 0 else 0
+        volume_score = 0
+        up_days = daily_returns > 0
+        down_days = daily_returns < 0
+        if np.sum(up_days) > 0 and np.sum(down_days) > 0:
+            avg_vol_up = np.mean(volumes[1:][up_days])
+            avg_vol_down = np.mean(volumes[1:][down_days])
+            if avg_vol_down > 0:
+                volume_score = min(max((avg_vol_up / avg_vol_down - 0.5) / 1.5, 0), 1)
+        elif np.sum(up_days) > 0:
+            volume_score = 0.5
+        else:
+            volume_score = 0.2
+    score = (
+        0.30 * (min(max(return_pct, -1), 1) + 1) / 2 +
+        0.20 * (1 - min(max_drawdown, 1)) +
+        0.15 * (1 - min(volatility, 1)) +
+        0.20 * (min(max(sharpe_ratio, -2), 2) + 2) / 4 +
+        0.10 * (min(max(trend_slope, -0.1), 0.1) + 0.1) / 0.2 +
+        0.05 * volume_score
+    )
+    return {
+        "score": round(score, 4),
+        "return": round(return_pct * 100, 2),
+        "maxDrawdown": round(max_drawdown * 100, 2),
+        "volatility": round(volatility * 100, 2),
+        "sharpeRatio": round(sharpe_ratio, 4),
+        "trendSlope": round(trend_slope, 6),
+        "volumeScore": round(volume_score, 4),
+        "startPrice": round(start_price, 2),
+        "endPrice": round(end_price, 2),
+        "days": len(df)
+    }
+
+
+def _reference_best_stocks(loader, names, top_n: int, sort_method: str, single_day_defaults: bool):
+    """
+    原实现的打分与排名：逐只加载完整日线并按日期筛选；每算完一只就去重并整体稳定排序（后台任务的写法），
+    排序键相同时先处理的股票排在前面
+
+    Returns:
+        (前N只, 有效结果总数)
+    """
+    start_dt, end_dt = pd.to_datetime(START), pd.to_datetime(END)
+    if sort_method == 'return':
+        key = lambda x: (x['return'], x['score'])
+    else:
+        key = lambda x: (x['score'], x['return'])
+    results = []
+    for e in loader.list_symbols():
+        if e.get('kind') != 'stock':
+            continue
+        symbol = e['symbol']
+        df = loader.load_stock_data(symbol, '1d')
+        df = df[(df['timestamp'] >= start_dt) & (df['timestamp'] <= end_dt)]
+        if df.empty:
+            continue
+        metrics = _reference_metrics(df.sort_values('timestamp').reset_index(drop=True), single_day_defaults)
+        if metrics is None:
+            continue
+        results.append({"symbol": symbol, "name": names.get(symbol, symbol), **metrics})
+        results.sort(key=key, reverse=True)
+    return results[:top_n], len(results)
+
+
+def _write_data(root: Path) -> dict:
+    """
+    生成股票日线CSV与股票列表JSON：含相同走势的两只股票（收益与评分完全相同）、价格不变、
+    区间内只有1天或没有数据的股票
+
+    Returns:
+        代码 -> 名称
+    """
+    rng = np.random.default_rng(0)
+    (root / 'stocks').mkdir()
+    (root / 'stockList').mkdir()
+    ts = pd.bdate_range('2024-01-02', '2024-07-31')
+    frames = {}
+    for i in range(36):
+        close = np.round(np.abs(10 + np.cumsum(rng.normal(0.01 * (i % 5 - 2), 0.2, len(ts)))) + 1, 2)
+        frames[f'{600000 + i:06d}'] = (ts, close)
+    frames['600100'] = frames['600003']
+    frames['600101'] = frames['600007']
+    frames['600102'] = (ts, np.full(len(ts), 8.0))
+    frames['600103'] = (pd.bdate_range('2024-06-28', periods=10), np.linspace(5, 6, 10).round(2))
+    frames['600104'] = (pd.bdate_range('2023-01-02', periods=40), np.linspace(5, 6, 40).round(2))
+    names = {}
+    for i, (code, (days, close)) in enumerate(frames.items()):
+        volume = rng.integers(1000, 5000, len(days)).astype(float)
+        pd.DataFrame({
+            'timestamps': days.strftime('%Y-%m-%d %H:%M:%S'),
+            'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+            'volume': volume, 'amount': volume * close,
+        }).to_csv(root / 'stocks' / f'股票{i}-{code}.csv', index=False)
+        names[code] = f'股票{i}'
+    stock_list = [{'code': f'sh.{code}', 'code_name': name} for code, name in names.items()]
+    (root / 'stockList' / 'all_pure_stock.json').write_text(json.dumps(stock_list, ensure_ascii=False), encoding='utf-8')
+    return names
+
+
+class _Patched:
+    """把接口使用的加载器与股票列表目录临时指向测试数据"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def __enter__(self):
+        self.saved = backtest.data_loader, backtest.STOCKLIST_DIR
+        backtest.data_loader = StockDataLoader(data_dir=str(self.root))
+        backtest.STOCKLIST_DIR = self.root / 'stockList'
+        return backtest.data_loader
+
+    def __exit__(self, *exc):
+        backtest.data_loader, backtest.STOCKLIST_DIR = self.saved
+
+
+def _run_task(top_n: int, sort_method: str):
+    """运行后台任务，返回任务状态"""
+    task_id = f'test-best-{top_n}-{sort_method}'
+    backtest.screening_tasks[task_id] = {"status": "running", "progress": {"processed": 0, "total": 0, "current": ""},
+                                         "results": [], "errors": []}
+    try:
+        backtest._run_best_stocks_task(task_id, START, END, 0, top_n, sort_method)
+        return backtest.screening_tasks[task_id]
+    finally:
+        backtest.screening_tasks.pop(task_id, None)
+
+
+def test_calculate_best_stocks_matches_reference():
+    """同步接口：前N只（含收益相同的并列、只有部分股票进入前N只而被提前跳过的情形）与总数与原实现相同"""
+    print("🔍 测试最佳股票同步接口...")
+    with tempfile.TemporaryDirectory() as tmp:
+        names = _write_data(Path(tmp))
+        with _Patched(Path(tmp)) as loader:
+            for top_n in (1, 5, 12, 100):
+                out = asyncio.run(backtest.calculate_best_stocks({'startDate': START, 'endDate': END, 'sampleSize': 0, 'topN': top_n}))
+                expected, total = _reference_best_stocks(loader, names, top_n, 'return', single_day_defaults=False)
+                assert out['results'] == expected, top_n
+                assert out['total'] == total
+                assert out['errors'] == []
+    print("✅ 同步接口与原实现一致")
+
+
+def test_best_stocks_task_matches_reference():
+    """后台任务：串行与进程池两种方式下，两种排序方式的前N只都与原实现相同"""
+    print("🔍 测试最佳股票后台任务...")
+    with tempfile.TemporaryDirectory() as tmp:
+        names = _write_data(Path(tmp))
+        with _Patched(Path(tmp)) as loader:
+            expected = {(top_n, sm): _reference_best_stocks(loader, names, top_n, sm, single_day_defaults=True)
+                        for top_n in (1, 5, 100) for sm in ('return', 'score')}
+            saved_pool = backtest._get_scoring_pool
+            pool = ProcessPoolExecutor(max_workers=2, mp_context=backtest._POOL_MP_CONTEXT)
+            try:
+                for get_pool in (lambda: None, lambda: pool):
+                    backtest._get_scoring_pool = get_pool
+                    for (top_n, sm), (top, total) in expected.items():
+                        task = _run_task(top_n, sm)
+                        assert task['status'] == 'completed', task['errors']
+                        assert task['results'] == top, (top_n, sm)
+                        assert task['errors'] == []
+                        assert task['progress']['totalResults'] == total
+            finally:
+                backtest._get_scoring_pool = saved_pool
+                pool.shutdown()
+    print("✅ 后台任务与原实现一致")
+
+
+if __name__ == "__main__":
+    test_calculate_best_stocks_matches_reference()
+    test_best_stocks_task_matches_reference()
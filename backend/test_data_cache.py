@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+测试数据加载器的缓存（不需要启动服务）
+"""
+
+import sys
+sys.path.append('.')
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app.data_loader import StockDataLoader
+
+
+def _write_minute_csv(path: str, seed: int, start: str = '2024-12-20 21:00', end: str = '2025-01-20 02:30') -> None:
+    """生成5分钟K线CSV（含跨零点的夜盘时段），列名与数据目录中的文件相同"""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range(start, end, freq='5min')
+    hour = ts.hour + ts.minute / 60
+    ts = ts[(hour >= 21) | (hour <= 2.5) | ((hour >= 9) & (hour <= 15))]
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.3, len(ts))), 2)
+    open_ = np.round(close + rng.normal(0, 0.1, len(ts)), 2)
+    pd.DataFrame({
+        'timestamps': ts.strftime('%Y-%m-%d %H:%M:%S'),
+        'open': open_,
+        'high': np.maximum(open_, close) + 0.05,
+        'low': np.minimum(open_, close) - 0.05,
+        'close': close,
+        'volume': rng.integers(1, 1000, len(ts)).astype(float),
+        'amount': rng.random(len(ts)) * 1e5,
+    }).to_csv(path, index=False)
+
+
+def _touch_later(path: str) -> None:
+    """把文件修改时间推后 10 秒（保证与缓存中记录的修改时间不同）"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+
+
+def test_cache_invalidated_on_source_mtime():
+    """源CSV修改后，磁盘上的预处理/聚合缓存与收盘价缓存都不再命中"""
+    print("🔍 测试源文件修改后缓存失效...")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'features'))
+        path = os.path.join(tmp, 'features', 'zz2505_测试.csv')
+        _write_minute_csv(path, seed=0)
+        loader = StockDataLoader(data_dir=tmp)
+        old_frame = loader.load_stock_data('zz2505', '1d')
+        old_closes = np.array(loader.load_close_arrays('zz2505', '1d')['close'])
+        # 新进程（新的加载器）命中磁盘缓存，结果不变
+        fresh = StockDataLoader(data_dir=tmp)
+        pd.testing.assert_frame_equal(fresh.load_stock_data('zz2505', '1d'), old_frame)
+        np.testing.assert_array_equal(fresh.load_close_arrays('zz2505', '1d')['close'], old_closes)
+
+        _write_minute_csv(path, seed=1)
+        _touch_later(path)
+        fresh = StockDataLoader(data_dir=tmp)
+        # 不经缓存直接解析新文件得到的期望结果
+        expected = fresh._filter_by_timeframe(fresh._preprocess_data(fresh._read_csv(path)), '1d')
+        assert not np.array_equal(expected['close'].to_numpy(), old_frame['close'].to_numpy())
+
+        pd.testing.assert_frame_equal(fresh.load_stock_data('zz2505', '1d'), expected)
+        np.testing.assert_array_equal(fresh.load_close_arrays('zz2505', '1d')['close'], expected['close'].to_numpy())
+        # 原加载器：收盘价缓存按修改时间检查；内存中的K线在 invalidate 后重新读取
+        np.testing.assert_array_equal(loader.load_close_arrays('zz2505', '1d')['close'], expected['close'].to_numpy())
+        loader.invalidate('zz2505')
+        np.testing.assert_array_equal(loader.load_stock_data('zz2505', '1d')['close'].to_numpy(), expected['close'].to_numpy())
+    print("✅ 源文件修改后缓存失效")
+
+
+def test_invalidate_scoped_to_symbol_prefix():
+    """invalidate('600000') 只清理 600000 的缓存，不影响代码以其为前缀的 6000001"""
+    print("🔍 测试按代码清理内存缓存...")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'stocks'))
+        for i, code in enumerate(('600000', '6000001', '600001')):
+            _write_minute_csv(os.path.join(tmp, 'stocks', f'股票{i}-{code}.csv'), seed=i)
+        loader = StockDataLoader(data_dir=tmp)
+        for code in ('600000', '6000001', '600001'):
+            for tf in ('1d', '1h'):
+                loader.load_stock_data(code, tf)
+        before = set(loader.cache.keys())
+        assert loader.invalidate('600000') == 2
+        assert set(loader.cache.keys()) == {k for k in before if not k.startswith('600000_')}
+        assert loader.invalidate_many(['6000001', 'nope']) == 2
+        assert set(loader.cache.keys()) == {'600001_1d_all', '600001_1h_all'}
+    print("✅ 按代码清理内存缓存")
+
+
+def test_end_date_cut_matches_cut_before_aggregation():
+    """日线/小时线由完整数据截断的结果与先按截止日期截断再聚合相同（含夜盘、截止日为周末或节假日）"""
+    print("🔍 测试截止日期截断...")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'features'))
+        path = os.path.join(tmp, 'features', 'zz2505_测试.csv')
+        _write_minute_csv(path, seed=3)
+        loader = StockDataLoader(data_dir=tmp)
+        full = loader._load_preprocessed(path)
+        for end_date in ('2024-12-23', '2024-12-31', '2025-01-01', '2025-01-04', '2025-01-10', '2025-01-20'):
+            cutoff = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+            cut = full[full['timestamp'] < cutoff]
+            for tf in ('1d', '1h', '4h', '1w', '30m'):
+                expected = loader._filter_by_timeframe(cut, tf)
+                pd.testing.assert_frame_equal(loader.load_stock_data('zz2505', tf, end_date).reset_index(drop=True), expected)
+                arrays = loader.load_close_arrays('zz2505', tf, end_date)
+                np.testing.assert_array_equal(arrays['close'], expected['close'].to_numpy())
+                np.testing.assert_array_equal(arrays['timestamp'], expected['timestamp'].to_numpy().view(np.int64))
+    print("✅ 截止日期截断与先截断再聚合一致")
+
+
+def test_resolve_requires_exact_symbol():
+    """按完整代码查找数据文件：'001' 不会取到文件名包含它的 001000；各目录的命名方式都能找到"""
+    print("🔍 测试按完整代码查找数据文件...")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'stocks'))
+        os.makedirs(os.path.join(tmp, 'features'))
+        _write_minute_csv(os.path.join(tmp, 'stocks', 'x-001000.csv'), seed=0)
+        _write_minute_csv(os.path.join(tmp, 'stocks', '股票0-600000.csv'), seed=1)
+        _write_minute_csv(os.path.join(tmp, 'features', 'zz2505_测试.csv'), seed=2)
+        _write_minute_csv(os.path.join(tmp, '分钟-002130.csv'), seed=3)
+        loader = StockDataLoader(data_dir=tmp)
+        for symbol in ('001', '00100', '600', 'zz25', '2130'):
+            try:
+                loader.load_stock_data(symbol, '1d')
+            except FileNotFoundError:
+                pass
+            else:
+                raise AssertionError(f"{symbol} 不应匹配到数据文件")
+            try:
+                loader.load_close_arrays(symbol, '1d')
+            except FileNotFoundError:
+                pass
+            else:
+                raise AssertionError(f"{symbol} 不应匹配到收盘价数据")
+        assert loader._resolve_filepath('001000') == os.path.join(tmp, 'stocks', 'x-001000.csv')
+        assert loader._resolve_filepath('600000') == os.path.join(tmp, 'stocks', '股票0-600000.csv')
+        assert loader._resolve_filepath('zz2505') == os.path.join(tmp, 'features', 'zz2505_测试.csv')
+        assert loader._resolve_filepath('002130') == os.path.join(tmp, '分钟-002130.csv')
+        assert len(loader.load_stock_data('001000', '1d')) > 0
+        # 之后新增的完整代码文件能被找到
+        _write_minute_csv(os.path.join(tmp, 'stocks', 'y-001.csv'), seed=4)
+        _touch_later(os.path.join(tmp, 'stocks'))
+        assert loader._resolve_filepath('001') == os.path.join(tmp, 'stocks', 'y-001.csv')
+    print("✅ 只按完整代码查找数据文件")
+
+
+if __name__ == "__main__":
+    test_cache_invalidated_on_source_mtime()
+    test_invalidate_scoped_to_symbol_prefix()
+    test_end_date_cut_matches_cut_before_aggregation()
+    test_resolve_requires_exact_symbol()
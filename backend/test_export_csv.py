@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+测试导出CSV与原逐行 DictWriter 实现的输出逐字节一致（不需要启动服务）
+"""
+
+import sys
+sys.path.append('.')
+
+import asyncio
+import csv
+import tempfile
+from pathlib import Path
+
+from app.api import backtest
+
+
+def _reference_export(path: Path, rows):
+    """原实现的写法：逐行字典 + csv.DictWriter，utf-8-sig"""
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    return path.read_bytes()
+
+
+def _fmt(value, spec):
+    """原实现的单值格式化：None 输出空字符串"""
+    return f"{value:{spec}}" if value is not None else ''
+
+
+def test_export_csv_matches_previous_format():
+    """导出CSV与原逐行 DictWriter 实现逐字节一致（含空值、负数、前导0代码与中文）"""
+    print("🔍 测试导出CSV格式...")
+    best = [
+        {'symbol': '000001', 'name': '平安银行', 'score': 0.123456, 'return': 12.345, 'maxDrawdown': -3.2,
+         'volatility': 1.005, 'sharpeRatio': 1.5, 'trendSlope': 0.0001234, 'volumeScore': 0.5,
+         'startPrice': 10.0, 'endPrice': 11.235, 'days': 20},
+        {'symbol': '600000', 'name': '浦发,银行', 'score': None, 'return': -0.004, 'maxDrawdown': None,
+         'volatility': None, 'sharpeRatio': -2.0, 'trendSlope': None, 'volumeScore': None,
+         'startPrice': 7.1, 'endPrice': None, 'days': 0},
+    ]
+    screened = [
+        {'code': '002130', 'name': '沃尔核材', 'directions': {'1d': 'bull', '1w': 'bear'},
+         'volumeInfo': {'ratio': 1.55, 'last': 12345.0, 'avg': 8000.125},
+         'maInfo': {'short': 5, 'long': 20, 'maShort': 10.005, 'maLong': 9.5, 'relation': 'above'},
+         'positionInfo': {'percentile': 35.5, 'currentPrice': 10.2, 'minPrice': 8.0, 'maxPrice': 15.0}},
+        {'code': '600000', 'name': '浦发银行', 'directions': {'1d': 'bull'},
+         'maInfo': {'short': 5, 'long': 20, 'maShort': 7.0, 'maLong': 7.5, 'relation': 'below'}},
+    ]
+    saved_dirs = backtest.PROJECT_ROOT, backtest.DATA_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        backtest.PROJECT_ROOT, backtest.DATA_DIR = root, root / 'data'
+        try:
+            _check_exports(root, best, screened)
+        finally:
+            backtest.PROJECT_ROOT, backtest.DATA_DIR = saved_dirs
+    print("✅ 导出CSV与原格式一致")
+
+
+def _check_exports(root: Path, best, screened):
+    """调用两个导出接口，与原实现写出的文件逐字节比较"""
+    out = asyncio.run(backtest.export_best_stocks_to_csv({'results': best, 'startDate': '2024-01-01', 'topN': 2, 'sortMethod': 'score'}))
+    rows = [{
+        '排名': i,
+        '股票代码': f'="{r["symbol"]}"',
+        '股票名称': r['name'],
+        '综合评分': _fmt(r['score'], '.4f'),
+        '区间收益(%)': _fmt(r['return'], '.2f'),
+        '最大回撤(%)': _fmt(r['maxDrawdown'], '.2f'),
+        '波动率(%)': _fmt(r['volatility'], '.2f'),
+        'Sharpe比率': _fmt(r['sharpeRatio'], '.4f'),
+        '趋势斜率': _fmt(r['trendSlope'], '.6f'),
+        '成交量健康度': _fmt(r['volumeScore'], '.4f'),
+        '起始价格': _fmt(r['startPrice'], '.2f'),
+        '结束价格': _fmt(r['endPrice'], '.2f'),
+        '交易日数': r['days'],
+    } for i, r in enumerate(best, 1)]
+    assert (root / out['filepath']).read_bytes() == _reference_export(root / 'best_ref.csv', rows)
+
+    out = asyncio.run(backtest.export_screening_results_to_csv({'results': screened, 'endDate': '2024-06-03'}))
+    rows = []
+    for r in screened:
+        v, m, p = r.get('volumeInfo') or {}, r.get('maInfo') or {}, r.get('positionInfo') or {}
+        rows.append({
+            '股票代码': f'="{r["code"]}"',
+            '股票名称': r['name'],
+            '日线MACD方向': r['directions'].get('1d', 'neutral'),
+            '周线MACD方向': r['directions'].get('1w', 'neutral'),
+            '放量倍数': _fmt(v.get('ratio'), '.2f'),
+            '最后一天成交量': _fmt(v.get('last'), '.2f'),
+            '均量': _fmt(v.get('avg'), '.2f'),
+            '短期均线周期': m.get('short', ''),
+            '长期均线周期': m.get('long', ''),
+            '短期均线值': _fmt(m.get('maShort'), '.2f'),
+            '长期均线值': _fmt(m.get('maLong'), '.2f'),
+            '均线关系': ('上方' if m.get('relation') == 'above' else '下方') if m else '',
+            '价格位置百分位': _fmt(p.get('percentile'), '.2f'),
+            '当前价格': _fmt(p.get('currentPrice'), '.2f'),
+            '最低价': _fmt(p.get('minPrice'), '.2f'),
+            '最高价': _fmt(p.get('maxPrice'), '.2f'),
+        })
+    assert (root / out['filepath']).read_bytes() == _reference_export(root / 'screen_ref.csv', rows)
+
+
+if __name__ == "__main__":
+    test_export_csv_matches_previous_format()
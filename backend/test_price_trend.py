@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+测试价格走势分析与原逐行实现的输出一致（合成数据，不需要启动服务）
+"""
+
+import sys
+sys.path.append('.')
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.api import backtest
+from app.data_loader import StockDataLoader
+
+START, END = '2024-03-04', '2024-03-29'
+
+
+def _reference_price_trend(loader, symbols, start_date_str: str, end_date_str: str):
+    """
+    原实现（逐只股票 DataFrame 排序筛选、逐行 iloc 取值、逐日字典汇总）的移植，作为比较基准
+
+    股票按首次出现的顺序处理（与现在的去重顺序相同，汇总中的浮点累加顺序一致）
+    """
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+    results = []
+    errors = []
+    for symbol in dict.fromkeys(symbols):
+        try:
+            df = loader.load_stock_data(symbol, '1d')
+            if df is None or df.empty:
+                errors.append({"symbol": symbol, "error": "数据为空"})
+                continue
+            time_col = 'timestamp'
+            df[time_col] = pd.to_datetime(df[time_col], errors='coerce')
+            df = df.sort_values(time_col, ascending=False).reset_index(drop=True)
+            df_filtered = df[df[time_col] <= pd.Timestamp(end_date)].copy()
+            df_filtered = df_filtered[df_filtered[time_col] >= pd.Timestamp(start_date)].copy()
+            if df_filtered.empty:
+                errors.append({"symbol": symbol, "error": f"在日期范围 {start_date_str} 至 {end_date_str} 内没有数据"})
+                continue
+            base_date = start_date - timedelta(days=1)
+            base_df = df[df[time_col] <= pd.Timestamp(base_date)].copy()
+            if base_df.empty:
+                errors.append({"symbol": symbol, "error": f"无法获取基准价格（{base_date.strftime('%Y-%m-%d')}及之前的数据）"})
+                continue
+            base_price = float(base_df.iloc[0]['close']) if pd.notna(base_df.iloc[0]['close']) else None
+            if base_price is None:
+                errors.append({"symbol": symbol, "error": "无法获取基准价格"})
+                continue
+            range_days = df_filtered.sort_values(time_col, ascending=True).reset_index(drop=True)
+
+            days_data = []
+            for idx in range(len(range_days)):
+                row = range_days.iloc[idx]
+                day_num = idx + 1
+                close_price = float(row['close']) if pd.notna(row['close']) else None
+                if close_price is None:
+                    continue
+                change = round(close_price - base_price, 2)
+                change_percent = round((change / base_price * 100), 2) if base_price > 0 else 0
+                daily_change = None
+                daily_change_percent = None
+                if idx > 0:
+                    prev_close = float(range_days.iloc[idx - 1]['close']) if pd.notna(range_days.iloc[idx - 1]['close']) else None
+                    if prev_close is not None:
+                        daily_change = round(close_price - prev_close, 2)
+                        daily_change_percent = round((daily_change / prev_close * 100), 2) if prev_close > 0 else 0
+                else:
+                    daily_change = round(close_price - base_price, 2)
+                    daily_change_percent = round((daily_change / base_price * 100), 2) if base_price > 0 else 0
+                days_data.append({
+                    "day": day_num,
+                    "date": row[time_col].strftime('%Y-%m-%d'),
+                    "close": round(close_price, 2),
+                    "change": change,
+                    "changePercent": change_percent,
+                    "dailyChange": daily_change,
+                    "dailyChangePercent": daily_change_percent
+                })
+
+            stock_name = symbol
+            for e in loader.list_symbols():
+                if isinstance(e, dict) and e.get('symbol') == symbol:
+                    stock_name = e.get('name', symbol)
+                    break
+            results.append({"symbol": symbol, "name": stock_name, "days": days_data, "basePrice": round(base_price, 2)})
+        except FileNotFoundError:
+            errors.append({"symbol": symbol, "error": "数据文件不存在"})
+
+    summary = None
+    if results:
+        max_days = max(len(r['days']) for r in results)
+        day_returns = {i: [] for i in range(1, max_days + 1)}
+        day_rise_counts = {i: 0 for i in range(1, max_days + 1)}
+        day_fall_counts = {i: 0 for i in range(1, max_days + 1)}
+        consecutive_rise_counts = {i: 0 for i in range(1, max_days + 1)}
+        best_hold_days = []
+        for result in results:
+            days = result['days']
+            if not days:
+                continue
+            max_return_day = 1
+            max_return = days[0].get('changePercent', 0)
+            max_consecutive_rise = 0
+            current_consecutive_rise = 0
+            for day_data in days:
+                day_num = day_data['day']
+                change_percent = day_data.get('changePercent', 0)
+                daily_change_percent = day_data.get('dailyChangePercent', 0)
+                if day_num in day_returns:
+                    day_returns[day_num].append(change_percent)
+                if change_percent > 0:
+                    if day_num in day_rise_counts:
+                        day_rise_counts[day_num] += 1
+                elif change_percent < 0:
+                    if day_num in day_fall_counts:
+                        day_fall_counts[day_num] += 1
+                if daily_change_percent is not None:
+                    if daily_change_percent > 0:
+                        current_consecutive_rise += 1
+                        max_consecutive_rise = max(max_consecutive_rise, current_consecutive_rise)
+                    else:
+                        current_consecutive_rise = 0
+                if change_percent > max_return:
+                    max_return = change_percent
+                    max_return_day = day_num
+            best_hold_days.append(max_return_day)
+            if 0 < max_consecutive_rise <= max_days:
+                consecutive_rise_counts[max_consecutive_rise] += 1
+
+        day_stats = {}
+        for day_num in sorted(day_returns):
+            returns = day_returns[day_num]
+            if returns:
+                avg_return = sum(returns) / len(returns)
+                rise_count = sum(1 for r in returns if r > 0)
+                fall_count = sum(1 for r in returns if r < 0)
+                sorted_returns = sorted(returns)
+                median_return = sorted_returns[len(sorted_returns) // 2]
+                if len(sorted_returns) % 2 == 0:
+                    median_return = (sorted_returns[len(sorted_returns) // 2 - 1] + sorted_returns[len(sorted_returns) // 2]) / 2
+                variance = sum((r - avg_return) ** 2 for r in returns) / len(returns)
+                day_stats[f"day{day_num}"] = {
+                    "avg": round(avg_return, 2),
+                    "riseCount": rise_count,
+                    "fallCount": fall_count,
+                    "flatCount": len(returns) - rise_count - fall_count,
+                    "riseRatio": round(rise_count / len(returns) * 100, 1),
+                    "max": round(max(returns), 2),
+                    "min": round(min(returns), 2),
+                    "median": round(median_return, 2),
+                    "stdDev": round(variance ** 0.5, 2)
+                }
+            else:
+                day_stats[f"day{day_num}"] = {"avg": 0.0, "riseCount": 0, "fallCount": 0, "flatCount": 0, "riseRatio": 0.0,
+                                              "max": 0.0, "min": 0.0, "median": 0.0, "stdDev": 0.0}
+        best_hold_day_stats = {}
+        for day in range(1, max_days + 1):
+            count = best_hold_days.count(day)
+            if count > 0:
+                best_hold_day_stats[day] = count
+        hold_day_avg_returns = {}
+        for day_num in range(1, max_days + 1):
+            if day_returns[day_num]:
+                hold_day_avg_returns[day_num] = round(sum(day_returns[day_num]) / len(day_returns[day_num]), 2)
+        summary = {
+            "dayStats": day_stats,
+            "day1RiseCount": day_rise_counts.get(1, 0),
+            "day2RiseCount": consecutive_rise_counts.get(2, 0),
+            "totalStocks": len(results),
+            "dayRiseCounts": day_rise_counts,
+            "dayFallCounts": day_fall_counts,
+            "consecutiveRiseCounts": consecutive_rise_counts,
+            "bestHoldDayStats": best_hold_day_stats,
+            "holdDayAvgReturns": hold_day_avg_returns
+        }
+    return {"results": results, "errors": errors, "summary": summary}
+
+
+class _FrameLoader:
+    """
+    由内存中的日线数据构造的加载器（收盘价可含 NaN；加载器读 CSV 时会丢弃含 NaN 的行，
+    这里用来覆盖区间内、区间第一天与基准日收盘价缺失的情形）
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def load_stock_data(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        if symbol not in self.frames:
+            raise FileNotFoundError(symbol)
+        return self.frames[symbol].copy()
+
+    def load_close_arrays(self, symbol: str, timeframe: str):
+        df = self.load_stock_data(symbol, timeframe)
+        return {'close': df['close'].to_numpy(dtype=np.float64),
+                'timestamp': df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)}
+
+    def list_symbols(self):
+        return [{'symbol': s, 'name': f'股票{s}'} for s in self.frames]
+
+
+def _random_frame(rng: np.random.Generator, start: str, periods: int, nan_ratio: float = 0.0) -> pd.DataFrame:
+    """生成日线数据（时间为当日零点），含平盘日；nan_ratio 为收盘价置为 NaN 的比例"""
+    ts = pd.bdate_range(start, periods=periods)
+    steps = rng.normal(0, 0.15, periods)
+    steps[rng.random(periods) < 0.15] = 0.0
+    close = np.round(np.abs(10 + np.cumsum(steps)), 2)
+    close[rng.random(periods) < nan_ratio] = np.nan
+    return pd.DataFrame({'timestamp': ts, 'close': close})
+
+
+def _compare(loader, symbols):
+    """以同一加载器分别调用接口与原实现，结果逐项相同"""
+    saved = backtest.data_loader
+    backtest.data_loader = loader
+    try:
+        out = asyncio.run(backtest.analyze_price_trend({'symbols': list(symbols), 'startDate': START, 'endDate': END}))
+    finally:
+        backtest.data_loader = saved
+    expected = _reference_price_trend(loader, symbols, START, END)
+    assert out['errors'] == expected['errors']
+    assert [r['symbol'] for r in out['results']] == [r['symbol'] for r in expected['results']]
+    for got, exp in zip(out['results'], expected['results']):
+        assert got == exp, got['symbol']
+    for key in ('dayStats', 'bestHoldDayStats', 'consecutiveRiseCounts'):
+        assert out['summary'][key] == expected['summary'][key], key
+    assert out['summary'] == expected['summary']
+    return out
+
+
+def test_matches_row_by_row_with_nan_closes():
+    """收盘价含 NaN（区间内、区间第一天、基准日、连续缺失）与零价格时，days 与汇总统计与原实现相同"""
+    print("🔍 测试价格走势（含缺失收盘价）...")
+    rng = np.random.default_rng(0)
+    frames = {f'{600000 + i:06d}': _random_frame(rng, '2024-01-02', 80, nan_ratio=0.1) for i in range(40)}
+    first_day = frames['600000']['timestamp'].searchsorted(pd.Timestamp(START))
+    frames['600000'].loc[first_day, 'close'] = np.nan
+    frames['600001'].loc[first_day - 1, 'close'] = np.nan
+    frames['600002'].loc[first_day + 3:first_day + 6, 'close'] = np.nan
+    frames['600003'].loc[first_day + 2, 'close'] = 0.0
+    # 区间中途才有数据、区间前已停牌
+    frames['600004'] = _random_frame(rng, '2024-03-18', 20)
+    frames['600005'] = _random_frame(rng, '2023-12-01', 30)
+    frames['600006'] = frames['600006'].iloc[:first_day + 5].reset_index(drop=True)
+    symbols = list(frames) + ['600000', '999999']
+    out = _compare(_FrameLoader(frames), symbols)
+    assert any(d is None for r in out['results'] for d in (x['dailyChange'] for x in r['days']))
+    print("✅ 含缺失收盘价时与原实现一致")
+
+
+def test_matches_row_by_row_from_csv():
+    """由CSV经加载器读取（含空收盘价的行）时，与原实现在同一加载器上的结果相同"""
+    print("🔍 测试价格走势（CSV）...")
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'stocks'))
+        symbols = []
+        for i in range(12):
+            code = f'{300000 + i:06d}'
+            df = _random_frame(rng, '2024-01-02', 70, nan_ratio=0.05)
+            close = df['close'].fillna(10.0).to_numpy()
+            pd.DataFrame({
+                'timestamps': df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+                'open': close, 'high': close + 0.05, 'low': close - 0.05, 'close': df['close'],
+                'volume': 1000.0, 'amount': 1.0e4,
+            }).to_csv(os.path.join(tmp, 'stocks', f'股票{i}-{code}.csv'), index=False)
+            symbols.append(code)
+        _compare(StockDataLoader(data_dir=tmp), symbols)
+    print("✅ CSV数据与原实现一致")
+
+
+if __name__ == "__main__":
+    test_matches_row_by_row_with_nan_closes()
+    test_matches_row_by_row_from_csv()
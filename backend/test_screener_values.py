@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+测试筛选指标数值与 pandas 参考实现一致（不需要启动服务）
+"""
+
+import sys
+sys.path.append('.')
+
+import numpy as np
+import pandas as pd
+
+from app.indicators import macd_numba
+from app.indicators.macd_numba import macd_last, macd_panel, macd_first_rise
+
+FAST, SLOW, SIGNAL = 12, 26, 9
+
+
+def _random_closes(rng: np.random.Generator, n: int) -> np.ndarray:
+    """生成保留两位小数的随机收盘价序列"""
+    return np.round(np.abs(20 + np.cumsum(rng.normal(0, 0.5, n))), 2)
+
+
+def _pandas_macd(closes: np.ndarray):
+    """参考实现：与筛选器原先的 pandas ewm 写法相同，返回 (dif, hist)"""
+    s = pd.Series(closes)
+    dif = s.ewm(span=FAST, adjust=False).mean() - s.ewm(span=SLOW, adjust=False).mean()
+    dea = dif.ewm(span=SIGNAL, adjust=False).mean()
+    return dif.to_numpy(), (dif - dea).to_numpy()
+
+
+def _pandas_first_rise(closes: np.ndarray) -> bool:
+    """参考实现：最近一次柱状图绿转红之后每根K线收盘价都严格上涨，且转红之后至少还有一根K线"""
+    if len(closes) < 3:
+        return False
+    _, hist = _pandas_macd(closes)
+    cross = -1
+    for i in range(1, len(hist)):
+        if hist[i - 1] <= 0 and hist[i] > 0:
+            cross = i
+    if cross < 0 or cross >= len(closes) - 1:
+        return False
+    return all(closes[i] > closes[i - 1] for i in range(cross + 1, len(closes)))
+
+
+def test_macd_matches_pandas():
+    """MACD 末值（单只与面板）逐位等于 pandas ewm 的结果；JIT 版本与回退实现都检查"""
+    print("🔍 测试MACD末值...")
+    rng = np.random.default_rng(1)
+    last_impls = [macd_last, macd_numba._macd_last_loop, macd_numba._macd_last_pandas]
+    panel_impls = [macd_panel, macd_numba._macd_panel_loop, macd_numba._macd_panel_numpy]
+    rows = []
+    for n in (1, 2, 3, 30, 120, 400):
+        for _ in range(20):
+            closes = _random_closes(rng, n)
+            # 含平盘（相邻收盘价相同）的情形
+            closes[n // 2:n // 2 + 3] = closes[n // 2]
+            dif, hist = _pandas_macd(closes)
+            expected = (hist[-1], hist[-2] if n > 1 else np.nan, dif[-1])
+            for impl in last_impls:
+                got = impl(closes, FAST, SLOW, SIGNAL)
+                np.testing.assert_array_equal(np.array(got, dtype=np.float64), np.array(expected), err_msg=impl.__name__)
+            rows.append((closes, expected))
+    # 面板：右对齐、左侧以 NaN 填充，另加一行全为 NaN
+    width = max(len(c) for c, _ in rows)
+    panel = np.full((len(rows) + 1, width), np.nan)
+    for r, (closes, _) in enumerate(rows):
+        panel[r, width - len(closes):] = closes
+    expected = np.array([e for _, e in rows] + [(np.nan, np.nan, np.nan)])
+    for impl in panel_impls:
+        got = np.column_stack(impl(panel, FAST, SLOW, SIGNAL))
+        np.testing.assert_array_equal(got, expected, err_msg=getattr(impl, '__name__', str(impl)))
+    print("✅ MACD末值与 pandas 一致")
+
+
+def test_macd_first_rise_matches_pandas():
+    """第一次主升段判断与按定义逐根检查的 pandas 参考实现一致"""
+    print("🔍 测试第一次主升段...")
+    rng = np.random.default_rng(2)
+    impls = [macd_first_rise, macd_numba._macd_first_rise_loop, macd_numba._macd_first_rise_pandas]
+    hits = 0
+    for _ in range(400):
+        closes = _random_closes(rng, int(rng.integers(2, 80)))
+        if rng.random() < 0.5:
+            # 末尾拼接一段连续上涨，制造满足条件的样本
+            closes = np.concatenate([closes, closes[-1] + np.cumsum(rng.uniform(0.01, 0.3, int(rng.integers(1, 8))))])
+        expected = _pandas_first_rise(closes)
+        hits += expected
+        for impl in impls:
+            assert bool(impl(closes, FAST, SLOW, SIGNAL)) == expected, impl.__name__
+    assert hits > 0
+    print("✅ 第一次主升段与 pandas 一致")
+
+
+if __name__ == "__main__":
+    test_macd_matches_pandas()
+    test_macd_first_rise_matches_pandas()
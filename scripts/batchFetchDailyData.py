@@ -36,7 +36,7 @@ def batch_fetch_daily_data(
         limit: 限制获取数量，用于测试
     
     Returns:
-        dict: 统计信息 {ok: int, fail: int, total: int, errors: list}
+        dict: 统计信息 {ok: int, fail: int, total: int, errors: list, updated: list}
     """
     # 定位项目根目录
     script_dir = Path(__file__).resolve().parent
@@ -103,6 +103,7 @@ def batch_fetch_daily_data(
     ok_count = 0
     fail_count = 0
     errors = []
+    updated = []  # 成功更新的股票代码（供后端按股票失效缓存）
     last_login_time = datetime.now()
     login_interval = timedelta(minutes=30)  # 每30分钟检查一次登录状态
     
@@ -269,6 +270,7 @@ def batch_fetch_daily_data(
                     
                     print(f"✓ 成功 ({len(df)} 条, 最后: {last_date})")
                     ok_count += 1
+                    updated.append(code)
                 except Exception as e:
                     raise e
                 finally:
@@ -290,7 +292,8 @@ def batch_fetch_daily_data(
         'ok': ok_count,
         'fail': fail_count,
         'total': len(stocks),
-        'errors': errors[:50]  # 只返回前50个错误
+        'errors': errors[:50],  # 只返回前50个错误
+        'updated': updated
     }
     
     print(f"\n[批量获取] 完成: 成功 {ok_count}, 失败 {fail_count}, 总计 {len(stocks)}")